@@ -0,0 +1,107 @@
+import os
+import asyncio
+from signals import SCREENS
+
+# --- Configuration --- #
+ALERT_RATE = float(os.getenv('ALERT_RATE', 20))  # Messages per second, below Telegram's ~30/s limit
+MAX_SYMBOLS = 30                                  # Symbols listed per signal in one message
+
+SCREEN_LABELS = {
+    "rsi_oversold": "RSI 30'un altına indi",
+    "rsi_overbought": "RSI 70'in üstüne çıktı",
+    "adx_strong": "ADX 45'i aştı",
+    "stoch_cross_up": "Stoch K, D'yi yukarı kesti",
+    "stoch_cross_down": "Stoch K, D'yi aşağı kesti",
+    "macd_above_signal": "MACD sinyalin üstüne çıktı",
+    "macd_below_signal": "MACD sinyalin altına indi",
+}
+
+
+def detect_changes(previous, current):
+    """Symbols that entered each screen between two snapshots of the same timeframe
+
+    previous/current are (df, SignalIndex) pairs; returns {screen: [symbols]}.
+    Only symbols present in both snapshots are compared: one missing from a
+    partial or failed previous cycle has not "entered" anything.
+    """
+    previous_df, previous_index = previous
+    current_df, current_index = current
+    known = set(previous_df['symbol'])
+    changes = {}
+    for name in current_index.buckets:
+        before = previous_index.bucket(name)
+        if before is None:
+            continue  # The previous snapshot could not evaluate this screen
+        before = set(previous_df['symbol'].iloc[before])
+        entered = [symbol for symbol in current_df['symbol'].iloc[current_index.bucket(name)]
+                   if symbol in known and symbol not in before]
+        if entered:
+            changes[name] = entered
+    return changes
+
+
+def format_alert(timeframe, changes):
+    lines = [f"🔔 **{timeframe} yeni sinyaller**"]
+    for name, symbols in changes.items():
+        shown = ", ".join(symbols[:MAX_SYMBOLS])
+        more = f" (+{len(symbols) - MAX_SYMBOLS})" if len(symbols) > MAX_SYMBOLS else ""
+        lines.append(f"\n*{SCREEN_LABELS.get(name, name)}*\n{shown}{more}")
+    return "\n".join(lines)
+
+
+class AlertDispatcher:
+    """Per-chat signal subscriptions with one batched message per chat and cycle
+
+    send: coroutine send(chat_id, text); it may raise to signal a failed delivery.
+    """
+
+    def __init__(self, send, rate=ALERT_RATE):
+        self.send = send
+        self.rate = rate
+        self.subscriptions = {}  # (timeframe, screen) -> set of chat ids
+        self.queue = None
+        self.sent = 0
+        self.failed = 0
+
+    def get_queue(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        return self.queue
+
+    def subscribe(self, chat_id, timeframe, screen):
+        if screen not in SCREENS:
+            raise ValueError(f"Bilinmeyen sinyal: {screen}")
+        self.subscriptions.setdefault((timeframe, screen), set()).add(chat_id)
+
+    def unsubscribe(self, chat_id, timeframe=None, screen=None):
+        """Remove matching subscriptions; None matches everything"""
+        for (tf, name), chats in list(self.subscriptions.items()):
+            if (timeframe is None or tf == timeframe) and (screen is None or name == screen):
+                chats.discard(chat_id)
+                if not chats:
+                    del self.subscriptions[(tf, name)]
+
+    def subscriptions_of(self, chat_id):
+        return sorted(key for key, chats in self.subscriptions.items() if chat_id in chats)
+
+    def on_snapshot(self, timeframe, previous, current):
+        """SnapshotBus callback: diff the snapshots and queue one message per subscribed chat"""
+        per_chat = {}
+        for name, symbols in detect_changes(previous, current).items():
+            for chat_id in self.subscriptions.get((timeframe, name), ()):
+                per_chat.setdefault(chat_id, {})[name] = symbols
+        for chat_id, changes in per_chat.items():
+            self.get_queue().put_nowait((chat_id, format_alert(timeframe, changes)))
+
+    async def run(self):
+        """Deliver queued alerts, paced to `rate` messages per second"""
+        queue = self.get_queue()
+        while True:
+            chat_id, text = await queue.get()
+            try:
+                await self.send(chat_id, text)
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Alarm gönderilemedi ({chat_id}): {e}")
+            await asyncio.sleep(1 / self.rate)
@@ -0,0 +1,208 @@
+import os
+import time
+import asyncio
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+from store import atomic_write, to_table
+from query import QueryError
+
+# --- Configuration --- #
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join(os.getcwd(), 'archive'))
+ARCHIVE_ENABLED = os.getenv('ARCHIVE_SNAPSHOTS', '1') == '1'
+COMPRESSION = "zstd"
+SYMBOLS_PER_GROUP = 8  # Symbols per row group of a compacted day, the unit a symbol filter can skip
+
+# Layout: {ARCHIVE_DIR}/timeframe={tf}/date={YYYY-MM-DD}/
+#   part-{published_ms}.parquet  one file per published cycle of the current day
+#   day.parquet                  all cycles of a closed day, sorted by symbol and time
+DAY_FILE = "day.parquet"
+TIMESTAMP = pa.timestamp("ms", tz="UTC")
+
+# Per-timeframe lock held by compaction and by reads, which run in executor
+# threads: compaction deletes the part files a read may have just listed
+locks = {}
+
+
+def lock(timeframe):
+    return locks.setdefault(timeframe, threading.Lock())
+
+
+def day_of(ms):
+    return time.strftime("%Y-%m-%d", time.gmtime(ms / 1000))
+
+
+def partition_dir(timeframe, day, directory=None):
+    return os.path.join(directory or ARCHIVE_DIR, f"timeframe={timeframe}", f"date={day}")
+
+
+def to_ms(at):
+    """Milliseconds since the epoch from epoch ms, a datetime or text; naive times are UTC"""
+    if isinstance(at, (int, float)):
+        return int(at)
+    stamp = pd.Timestamp(at)
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize("UTC")
+    return int(stamp.timestamp() * 1000)
+
+
+def parse_time(text, now=None):
+    """Absolute time ('2024-05-01T12:00', UTC unless an offset is given) or relative ('-2h', '-3d')"""
+    if text.startswith("-"):
+        return int((now or time.time()) * 1000 - pd.Timedelta(text[1:]).total_seconds() * 1000)
+    return to_ms(text)
+
+
+def append(df, timeframe, published_at=None, directory=None):
+    """Archive one published snapshot as a new file; existing cycles are never rewritten"""
+    ms = int((published_at or time.time()) * 1000)
+    table = to_table(df)
+    table = table.append_column("published_at", pa.array([ms] * len(table), TIMESTAMP))
+    folder = partition_dir(timeframe, day_of(ms), directory)
+    os.makedirs(folder, exist_ok=True)
+    atomic_write(os.path.join(folder, f"part-{ms}.parquet"),
+                 lambda tmp: pq.write_table(table, tmp, compression=COMPRESSION))
+    return ms
+
+
+def compact(timeframe, day, directory=None):
+    """Merge a closed day's cycle files into one file sorted by symbol, then drop them
+
+    Every row group then covers a handful of symbols, so series reads skip
+    nearly the whole day by row group statistics.
+    """
+    with lock(timeframe):
+        found = parts(timeframe, day, directory)
+        if not found:
+            return
+        table = ds.dataset(day_files(timeframe, day, directory), format="parquet").to_table()
+        table = table.sort_by([("symbol", "ascending"), ("published_at", "ascending")])
+        cycles = len(pc.unique(table["published_at"]))
+        atomic_write(os.path.join(partition_dir(timeframe, day, directory), DAY_FILE),
+                     lambda tmp: pq.write_table(table, tmp, compression=COMPRESSION,
+                                                row_group_size=SYMBOLS_PER_GROUP * cycles))
+        for _, path in found:
+            os.remove(path)
+
+
+def compact_closed(timeframe, directory=None, today=None):
+    """Compact every day before today that still has per-cycle files"""
+    today = today or day_of(time.time() * 1000)
+    for day in days(timeframe, directory):
+        if day < today and parts(timeframe, day, directory):
+            compact(timeframe, day, directory)
+
+
+def archive_cycle(df, timeframe, directory=None):
+    ms = append(df, timeframe, directory=directory)
+    compact_closed(timeframe, directory, today=day_of(ms))
+
+
+async def record(df, timeframe, directory=None):
+    """Archive a snapshot off the event loop, unless archiving is switched off"""
+    if ARCHIVE_ENABLED:
+        await asyncio.get_running_loop().run_in_executor(None, archive_cycle, df, timeframe, directory)
+
+
+def days(timeframe, directory=None):
+    """Archived day partitions of a timeframe, oldest first"""
+    root = os.path.join(directory or ARCHIVE_DIR, f"timeframe={timeframe}")
+    if not os.path.isdir(root):
+        return []
+    return sorted(d[len("date="):] for d in os.listdir(root) if d.startswith("date="))
+
+
+def parts(timeframe, day, directory=None):
+    """Per-cycle files of one day as a sorted list of (published_ms, path)"""
+    folder = partition_dir(timeframe, day, directory)
+    return sorted((int(name[len("part-"):-len(".parquet")]), os.path.join(folder, name))
+                  for name in os.listdir(folder) if name.startswith("part-") and name.endswith(".parquet"))
+
+
+def day_files(timeframe, day, directory=None):
+    """Files holding a day's cycles: the compacted file, if any, and the remaining parts"""
+    compacted = os.path.join(partition_dir(timeframe, day, directory), DAY_FILE)
+    files = [compacted] if os.path.exists(compacted) else []
+    return files + [path for _, path in parts(timeframe, day, directory)]
+
+
+def cycles(timeframe, day, directory=None):
+    """Every cycle of one day as a sorted list of (published_ms, path)"""
+    found = parts(timeframe, day, directory)
+    compacted = os.path.join(partition_dir(timeframe, day, directory), DAY_FILE)
+    if os.path.exists(compacted):
+        published = pq.read_table(compacted, columns=["published_at"])["published_at"]
+        found += [(stamp, compacted) for stamp in pc.unique(published.cast(pa.int64())).to_pylist()]
+    return sorted(found)
+
+
+def cycle_at(timeframe, at, directory=None):
+    """(published_ms, path) of the last cycle published at or before `at`, None if there is none
+
+    Partitions are listed newest first and only until a match is found.
+    """
+    ms = to_ms(at)
+    for day in reversed(days(timeframe, directory)):
+        if day > day_of(ms):
+            continue
+        found = [cycle for cycle in cycles(timeframe, day, directory) if cycle[0] <= ms]
+        if found:
+            return found[-1]
+    return None
+
+
+def snapshot_at(timeframe, at, columns=None, plan=None, directory=None):
+    """The snapshot as it was published at `at`
+
+    Only `columns` (plus the ones the query plan needs) are read, and the
+    plan's predicate is evaluated by the Parquet scan, so row groups that
+    cannot match are skipped. Returns (published_ms, DataFrame) or None.
+    """
+    with lock(timeframe):
+        found = cycle_at(timeframe, at, directory)
+        if found is None:
+            return None
+        stamp, path = found
+        dataset = ds.dataset(path, format="parquet")
+        missing = set(plan.columns) - set(dataset.schema.names) if plan is not None else set()
+        if missing:
+            raise QueryError(f"Bu zaman aralığında olmayan sütun: {', '.join(sorted(missing))}")
+        if columns is not None:
+            wanted = set(columns) | (set(plan.columns) if plan is not None else set())
+            columns = [name for name in dataset.schema.names if name in wanted]
+        condition = pc.field("published_at") == pa.scalar(stamp, TIMESTAMP)
+        if plan is not None:
+            condition = condition & plan.expression()
+        table = dataset.to_table(columns=columns, filter=condition)
+    return stamp, table.to_pandas()
+
+
+def series(timeframe, symbol, columns, start=None, end=None, directory=None):
+    """One symbol's values across archived cycles, oldest first
+
+    Day partitions outside [start, end] are never opened, and the symbol
+    filter skips row groups by their min/max statistics.
+    """
+    start_ms = to_ms(start) if start is not None else None
+    end_ms = to_ms(end) if end is not None else None
+    with lock(timeframe):
+        paths = [
+            path
+            for day in days(timeframe, directory)
+            if (start_ms is None or day >= day_of(start_ms)) and (end_ms is None or day <= day_of(end_ms))
+            for path in day_files(timeframe, day, directory)
+        ]
+        if not paths:
+            return pd.DataFrame(columns=["published_at", *columns])
+        dataset = ds.dataset(paths, format="parquet")
+        columns = [name for name in columns if name in dataset.schema.names]
+        condition = pc.field("symbol") == symbol
+        if start_ms is not None:
+            condition = condition & (pc.field("published_at") >= pa.scalar(start_ms, TIMESTAMP))
+        if end_ms is not None:
+            condition = condition & (pc.field("published_at") <= pa.scalar(end_ms, TIMESTAMP))
+        table = dataset.to_table(columns=["published_at", *columns], filter=condition)
+    return table.to_pandas().sort_values("published_at").reset_index(drop=True)
@@ -0,0 +1,243 @@
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+import asyncio
+import json
+import socket
+import multiprocessing
+import numpy as np
+import pandas as pd
+import store
+from aiohttp import web
+from schema import SCANNER_COLUMNS, ColumnBuffer
+from fetcher import IndicatorFetcher, coverage_summary
+from sharded import ShardedFetcher
+from transport import AsyncTransport
+from ratelimit import Limiters
+
+
+def synthetic_frame(rows):
+    """Indicator table with the scanner.py schema and random values"""
+    rng = np.random.default_rng(0)
+    data = {"symbol": [f"SYM{i}USDT" for i in range(rows)]}
+    for field in SCANNER_COLUMNS:
+        data[field.name] = rng.random(rows) * 100
+    return pd.DataFrame(data)
+
+
+def timed(func, repeat):
+    """Median wall time of `repeat` calls in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def bench_storage(rows=300, repeat=5):
+    """Compare snapshot write/read latency of the Arrow store with the xlsx path"""
+    df = synthetic_frame(rows)
+    with tempfile.TemporaryDirectory() as directory:
+        xlsx = os.path.join(directory, "indicators_5m.xlsx")
+        results = {
+            "xlsx write": timed(lambda: df.to_excel(xlsx, index=False), repeat),
+            "xlsx read": timed(lambda: pd.read_excel(xlsx), repeat),
+            "arrow write": timed(lambda: store.write_snapshot(df, "5m", directory), repeat),
+            "arrow read": timed(lambda: store.read_snapshot("5m", directory=directory), repeat),
+            "arrow read (4 cols)": timed(lambda: store.read_snapshot(
+                "5m", ["symbol", "close", "rsi", "adx"], directory), repeat),
+        }
+    print(f"Snapshot storage, {rows} satır x {df.shape[1]} sütun (medyan ms)")
+    for name, ms in results.items():
+        print(f"  {name:<22}{ms:>10.2f}")
+    return results
+
+
+def scanner_response(rows):
+    """Fake scanner `data` payload with the full scanner.py column list"""
+    rng = np.random.default_rng(0)
+    values = rng.random((rows, len(SCANNER_COLUMNS))) * 100
+    return [{"s": f"BINANCE:SYM{i}USDT", "d": values[i].tolist()} for i in range(rows)]
+
+
+def convert_dicts(data):
+    """Previous conversion: one dict per symbol, then DataFrame.from_dict"""
+    rows = []
+    for item in data:
+        row = {"symbol": item["s"].split(":", 1)[-1]}
+        for field, value in zip(SCANNER_COLUMNS, item["d"]):
+            row[field.name] = value
+        rows.append(row)
+    return pd.DataFrame.from_dict(rows)
+
+
+def convert_columns(data):
+    """Current conversion: fill preallocated typed columns"""
+    buffer = ColumnBuffer(SCANNER_COLUMNS, len(data))
+    buffer.fill(0, [item["s"].split(":", 1)[-1] for item in data], [item["d"] for item in data])
+    return buffer.to_frame()
+
+
+def peak_memory(func):
+    """Peak traced allocation of one call in MB"""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def bench_conversion(rows=300, timeframes=5, repeat=5):
+    """Compare dict-per-row and column-array conversion for the full universe on all timeframes"""
+    data = scanner_response(rows)
+    results = {}
+    for name, convert in (("dict rows", convert_dicts), ("column arrays", convert_columns)):
+        run = lambda: [convert(data) for _ in range(timeframes)]
+        results[name] = (timed(run, repeat), peak_memory(run))
+    print(f"Dönüştürme, {rows} sembol x {timeframes} aralık (medyan ms / tepe MB)")
+    for name, (ms, mb) in results.items():
+        print(f"  {name:<22}{ms:>10.2f}{mb:>10.2f}")
+    return results
+
+
+async def answer_scan(request):
+    """Random values for every requested ticker and column"""
+    body = json.loads(await request.text())
+    rng = np.random.default_rng(len(body["symbols"]["tickers"]))
+    values = (rng.random((len(body["symbols"]["tickers"]), len(body["columns"]))) * 100).tolist()
+    data = [{"s": ticker, "d": row} for ticker, row in zip(body["symbols"]["tickers"], values)]
+    return web.json_response({"data": data, "totalCount": len(data)})
+
+
+def stub_app(latency=0.0):
+    """Local stand-in for the TradingView scanner endpoint"""
+    async def scan(request):
+        await asyncio.sleep(latency)
+        return await answer_scan(request)
+
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_post("/scan", scan)
+    return app
+
+
+def throttled_app(limit=8, error_rate=0.0, retry_after=1):
+    """Scanner stub that answers 429 above `limit` requests per second and fails some with 503"""
+    recent = []
+    rng = np.random.default_rng(0)
+
+    async def throttled(request):
+        now = time.monotonic()
+        recent[:] = [t for t in recent if now - t < 1]
+        if len(recent) >= limit:
+            return web.Response(status=429, headers={"Retry-After": str(retry_after)})
+        recent.append(now)
+        if rng.random() < error_rate:
+            return web.Response(status=503)
+        return await answer_scan(request)
+
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_post("/scan", throttled)
+    return app
+
+
+def serve_stub(app_factory, port, kwargs):
+    web.run_app(app_factory(**kwargs), host="127.0.0.1", port=port, print=None)
+
+
+def start_stub(app_factory, port, timeout=10, **kwargs):
+    """Run a stub app in its own process so it does not share the benchmark's CPU
+
+    Raises RuntimeError if the process exits (port in use, import error) or
+    is not accepting connections within `timeout` seconds.
+    """
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve_stub, args=(app_factory, port, kwargs), daemon=True)
+    process.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            pass
+        if not process.is_alive():
+            raise RuntimeError(f"Stub sunucusu kapandı (port {port}, çıkış kodu {process.exitcode})")
+        if time.monotonic() > deadline:
+            process.terminate()
+            process.join()
+            raise RuntimeError(f"Stub sunucusu {timeout} sn içinde başlamadı (port {port}, çıkış kodu {process.exitcode})")
+        time.sleep(0.05)
+
+
+def bench_sharding(rows=1000, workers=(1, 2, 4), timeframes=("5m", "15m", "1h", "4h", "1d"), port=8781):
+    """Full-universe scan time on all timeframes, in-process versus sharded across processes"""
+    stub = start_stub(stub_app, port, latency=0.05)
+    url = f"http://127.0.0.1:{port}/scan"
+    symbols = [f"SYM{i}USDT" for i in range(rows)]
+
+    async def scan(fetcher):
+        start = time.perf_counter()
+        await asyncio.gather(*[fetcher.fetch(symbols, timeframe) for timeframe in timeframes])
+        return (time.perf_counter() - start) * 1000
+
+    async def run():
+        results = {}
+        for count in workers:
+            if count == 1:
+                transport = AsyncTransport()
+                results[count] = await scan(IndicatorFetcher(transport, chunk_size=100, url=url))
+                await transport.close()
+            else:
+                fetcher = ShardedFetcher(count, chunk_size=100, url=url)
+                await scan(fetcher)  # Warm up: spawn the pool
+                results[count] = await scan(fetcher)
+                fetcher.close()
+        return results
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        stub.terminate()
+    print(f"Sharding, {rows} sembol x {len(timeframes)} aralık (ms)")
+    for count, ms in results.items():
+        print(f"  {count} işlem{'':<15}{ms:>10.2f}  x{results[workers[0]] / ms:.2f}")
+    return results
+
+
+def bench_throttling(rows=600, chunk_size=10, limit=8, error_rate=0.05, port=8782):
+    """Sustained throughput against a stub that throttles above `limit` req/s and drops some requests"""
+    stub = start_stub(throttled_app, port, limit=limit, error_rate=error_rate)
+    url = f"http://127.0.0.1:{port}/scan"
+    symbols = [f"SYM{i}USDT" for i in range(rows)]
+
+    async def run():
+        # Start well above the stub's limit so the limiter has to find it
+        limiters = Limiters(rates={f"127.0.0.1:{port}": (limit * 3, limit * 4)})
+        transport = AsyncTransport(limiters=limiters)
+        start = time.perf_counter()
+        df = await IndicatorFetcher(transport, chunk_size=chunk_size, url=url).fetch(symbols, "1h")
+        elapsed = time.perf_counter() - start
+        await transport.close()
+        return df, elapsed, limiters.stats()[f"127.0.0.1:{port}"]
+
+    try:
+        df, elapsed, stat = asyncio.run(run())
+    finally:
+        stub.terminate()
+    chunks = -(-rows // chunk_size)
+    print(f"Kısıtlama, {chunks} istek, sunucu sınırı {limit} istek/sn, %{error_rate * 100:.0f} hata")
+    print(f"  süre {elapsed:.2f} sn, {len(df) / elapsed:.0f} sembol/sn, {stat['requests']} deneme")
+    print(f"  {stat['throttled']} x 429, {stat['errors']} x 5xx, son hız {stat['rate']} istek/sn, devre {stat['breaker']}")
+    print(f"  kapsam: {coverage_summary(df.attrs['coverage'])}")
+    return stat
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    bench_storage(rows)
+    bench_conversion(rows)
+    bench_sharding(max(rows, 1000))
+    bench_throttling()
@@ -0,0 +1,227 @@
+import os
+import json
+import asyncio
+import numpy as np
+from transport import AsyncTransport
+from schema import SCANNER_COLUMNS, ColumnBuffer
+from indicators import IndicatorEngine, monthly_pivot_source, HISTORY
+from klines import CandleStore, kline_source, PERIOD_MS
+import metrics
+
+# --- Configuration --- #
+SCAN_URL = os.getenv('TV_SCAN_URL', 'https://scanner.tradingview.com/crypto/scan')
+EXCHANGE = "BINANCE"
+CHUNK_SIZE = 200
+
+# TradingView interval suffixes (same table tradingview_ta uses, 1d has no suffix)
+INTERVAL_SUFFIX = {
+    "1m": "|1",
+    "5m": "|5",
+    "15m": "|15",
+    "30m": "|30",
+    "1h": "|60",
+    "2h": "|120",
+    "4h": "|240",
+    "1d": "",
+    "1W": "|1W",
+    "1M": "|1M",
+}
+
+
+def chunked(items, size):
+    """Split a list into consecutive chunks of at most `size` items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def coverage_report(symbols, received, failed):
+    """What a snapshot is missing: requested/received counts and {symbol: reason}
+
+    Symbols that failed but still have a row (served from older data) are listed too.
+    """
+    received = set(received)
+    report = {symbol: failed.get(symbol, "veri yok") for symbol in symbols if symbol not in received}
+    report.update({symbol: f"{reason} (eski veri)" for symbol, reason in failed.items() if symbol in received})
+    return {"requested": len(symbols), "received": len(received), "failed": report}
+
+
+def merge_coverage(reports):
+    """Combine the coverage reports of several shards"""
+    merged = {"requested": 0, "received": 0, "failed": {}}
+    for report in reports:
+        merged["requested"] += report["requested"]
+        merged["received"] += report["received"]
+        merged["failed"].update(report["failed"])
+    return merged
+
+
+def coverage_summary(report, limit=3):
+    """One line such as '297/300 sembol, eksik: HTTP 429 x2, veri yok x1'"""
+    reasons = {}
+    for reason in report["failed"].values():
+        reasons[reason] = reasons.get(reason, 0) + 1
+    line = f"{report['received']}/{report['requested']} sembol"
+    if reasons:
+        top = sorted(reasons.items(), key=lambda item: -item[1])[:limit]
+        line += ", eksik: " + ", ".join(f"{reason} x{count}" for reason, count in top)
+    return line
+
+
+def error_reason(error):
+    return getattr(error, "reason", None) or type(error).__name__
+
+
+class IndicatorFetcher:
+    """Fetch TradingView indicators for many symbols per scanner request"""
+
+    def __init__(self, transport=None, columns=SCANNER_COLUMNS, chunk_size=CHUNK_SIZE,
+                 url=SCAN_URL, exchange=EXCHANGE):
+        self.transport = transport or AsyncTransport()
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.url = url
+        self.exchange = exchange
+
+    def build_payload(self, symbols, interval):
+        """Build the scanner request body for one chunk of symbols"""
+        suffix = INTERVAL_SUFFIX[interval]
+        return {
+            "symbols": {
+                "tickers": [f"{self.exchange}:{symbol}" for symbol in symbols],
+                "query": {"types": []},
+            },
+            "columns": [field.key + suffix for field in self.columns],
+        }
+
+    async def fetch_chunk(self, symbols, interval):
+        """Request one chunk and return the raw `data` list; the transport handles retries"""
+        payload = json.dumps(self.build_payload(symbols, interval))
+        result = await self.transport.post_json(self.url, payload)
+        return result.get("data") or []
+
+    def parse(self, data):
+        """Split scanner response rows into symbols and value rows"""
+        symbols, values = [], []
+        for item in data:
+            row = item.get("d")
+            if not row or len(row) != len(self.columns):
+                continue
+            symbols.append(item["s"].split(":", 1)[-1])
+            values.append(row)
+        return symbols, values
+
+    async def fetch(self, symbols, interval):
+        """Fetch indicators for all symbols in concurrent chunks and return a DataFrame
+
+        df.attrs["coverage"] lists the symbols that are missing and why.
+        """
+        symbols = list(symbols)
+        chunks = chunked(symbols, self.chunk_size)
+        # Every chunk writes straight into its own slice of the preallocated columns
+        buffer = ColumnBuffer(self.columns, len(symbols))
+        failed = {}
+
+        async def fetch_into(offset, chunk):
+            try:
+                with metrics.span("chunk", timeframe=interval):
+                    data = await self.fetch_chunk(chunk, interval)
+            except Exception as e:
+                metrics.log(f"{interval} {len(chunk)} sembollük paket alınamadı: {error_reason(e)}")
+                failed.update(dict.fromkeys(chunk, error_reason(e)))
+                return
+            with metrics.span("parse", timeframe=interval):
+                names, values = self.parse(data)
+                if names:
+                    buffer.fill(offset, names, values)
+
+        await asyncio.gather(*[fetch_into(i * self.chunk_size, chunk) for i, chunk in enumerate(chunks)])
+        with metrics.span("convert", timeframe=interval):
+            df = buffer.to_frame()
+        df.attrs["coverage"] = coverage_report(symbols, df["symbol"], failed)
+        return df
+
+
+class KlineIndicatorFetcher:
+    """Compute the scanner columns locally from Binance klines instead of TradingView
+
+    Candles come from the shared CandleStore, which downloads only the base
+    resolution and resamples every timeframe from it. The first cycle of a
+    timeframe loads up to HISTORY candles per symbol into an IndicatorEngine;
+    later cycles feed it only the candles that closed since. A changed symbol
+    list or a gap in the engine's candles reloads the history.
+    """
+
+    def __init__(self, transport=None, columns=SCANNER_COLUMNS, history=HISTORY, candles=None):
+        self.transport = transport or AsyncTransport()
+        self.columns = columns
+        self.history = history
+        self.candles = candles or CandleStore(kline_source(self.transport))
+        self.engines = {}   # interval -> IndicatorEngine
+        self.needs_pivots = any(field.key.startswith("Pivot.M.") for field in columns)
+
+    def collect(self, symbols, interval, after=None):
+        """Candles of every symbol aligned on open time: (open_times, (5, symbols, time) OHLCV arrays)"""
+        records = {}
+        for symbol in symbols:
+            rows = self.candles.candles(symbol, interval)
+            records[symbol] = rows if after is None else rows[rows["open_time"] > after]
+        times = np.unique(np.concatenate([r["open_time"] for r in records.values()] or [np.empty(0, np.int64)]))
+        if after is None:
+            times = times[-self.history:]
+        arrays = np.full((5, len(symbols), len(times)), np.nan)
+        for row_index, symbol in enumerate(symbols):
+            rows = records[symbol]
+            rows = rows[np.isin(rows["open_time"], times)]
+            positions = np.searchsorted(times, rows["open_time"])
+            for i, name in enumerate(("open", "high", "low", "close", "volume")):
+                arrays[i, row_index, positions] = rows[name]
+        return times, arrays
+
+    def load(self, symbols, interval):
+        times, arrays = self.collect(symbols, interval)
+        engine = IndicatorEngine(symbols)
+        engine.load(*arrays, open_times=times)
+        engine.last_open_time = int(times[-1]) if len(times) else None
+        return engine
+
+    def advance(self, engine, interval):
+        """Feed candles closed since the last cycle; False if they do not connect to the engine's history"""
+        if engine.last_open_time is None:
+            return False
+        times, arrays = self.collect(engine.symbols, interval, after=engine.last_open_time)
+        if len(times) and times[0] != engine.last_open_time + PERIOD_MS[interval]:
+            return False
+        for i, t in enumerate(times):
+            engine.update(*arrays[:, :, i], open_time=int(t))
+        return True
+
+    def prepare(self, symbols, interval):
+        """The interval's engine, advanced to the latest stored candle or reloaded"""
+        engine = self.engines.get(interval)
+        if engine is None or set(engine.symbols) != set(symbols) or not self.advance(engine, interval):
+            engine = self.engines[interval] = self.load(symbols, interval)
+        if self.needs_pivots:
+            times, (open_, high, low, close, _) = self.collect(symbols, "1d")
+            engine.set_pivot_source(*monthly_pivot_source(times, open_, high, low, close))
+        return engine
+
+    def convert(self, engine):
+        df = engine.snapshot(self.columns)
+        if "close" in df:
+            # Symbols without candles (delisted, failed requests) are left out like unfilled scanner rows
+            df = df[df["close"].notna()].reset_index(drop=True)
+        return df
+
+    async def fetch(self, symbols, interval):
+        """Same contract as IndicatorFetcher.fetch: one row per symbol with data"""
+        symbols = list(symbols)
+        loop = asyncio.get_running_loop()
+        # Timeframes closing together share one download of the base resolution
+        with metrics.span("candles", timeframe=interval):
+            failed = await self.candles.sync(symbols)
+        # History loads and candle reads take seconds for a large universe: keep them off the event loop
+        with metrics.span("indicators", timeframe=interval):
+            engine = await loop.run_in_executor(None, self.prepare, symbols, interval)
+        with metrics.span("convert", timeframe=interval):
+            df = await loop.run_in_executor(None, self.convert, engine)
+        df.attrs["coverage"] = coverage_report(symbols, df["symbol"], failed)
+        return df
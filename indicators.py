@@ -0,0 +1,464 @@
+import sys
+import json
+import warnings
+import numpy as np
+import pandas as pd
+from schema import SCANNER_COLUMNS
+
+# Candles kept per symbol for window-based indicators (SMA200 plus one previous bar)
+WINDOW = 210
+# Candles to load on start so EMA200 and the Wilder averages have converged
+HISTORY = 500
+
+# TradingView key -> scanner.py column name, so any field list (e.g. BOT_COLUMNS) can be served
+SCANNER_NAMES = {field.key: field.name for field in SCANNER_COLUMNS}
+
+
+class MovingAverage:
+    """Exponential average over a vector of symbols, updated one candle at a time
+
+    Follows Pine: EMA is seeded with the first value, RMA (Wilder) with the SMA of
+    the first `length` values. NaN inputs are skipped per symbol, so symbols with a
+    shorter history simply warm up later.
+    """
+
+    def __init__(self, size, length, wilder=False):
+        self.length = length
+        self.alpha = 1 / length if wilder else 2 / (length + 1)
+        self.wilder = wilder
+        self.count = np.zeros(size, dtype=np.int64)
+        self.total = np.zeros(size)
+        self.value = np.full(size, np.nan)
+
+    def update(self, x):
+        valid = ~np.isnan(x)
+        self.count += valid
+        if self.wilder:
+            seeding = valid & (self.count <= self.length)
+            self.total[seeding] += x[seeding]
+            seeded = valid & (self.count == self.length)
+            self.value[seeded] = self.total[seeded] / self.length
+            running = valid & (self.count > self.length)
+        else:
+            first = valid & (self.count == 1)
+            self.value[first] = x[first]
+            running = valid & (self.count > 1)
+        self.value[running] += self.alpha * (x[running] - self.value[running])
+        return self.value
+
+
+def window(buf, length, offset=0):
+    """Last `length` columns of a (symbols, time) buffer, `offset` bars back"""
+    end = buf.shape[1] - offset
+    return buf[:, end - length:end]
+
+
+def sma(buf, length, offset=0):
+    return window(buf, length, offset).mean(axis=1)
+
+
+def highest(buf, length, offset=0):
+    return window(buf, length, offset).max(axis=1)
+
+
+def lowest(buf, length, offset=0):
+    return window(buf, length, offset).min(axis=1)
+
+
+def wma(buf, length, offset=0):
+    weights = np.arange(1, length + 1, dtype=float)
+    return window(buf, length, offset) @ weights / weights.sum()
+
+
+def divide(a, b):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b == 0, np.nan, a / b)
+
+
+def rating(buy, sell):
+    """TradingView style rating: 1 buy, -1 sell, 0 neutral"""
+    return np.where(buy, 1.0, np.where(sell, -1.0, 0.0))
+
+
+def ma_rating(ma, close):
+    return np.where(np.isnan(ma), np.nan, rating(ma < close, ma > close))
+
+
+class IndicatorEngine:
+    """Vectorized indicator state for many symbols, fed one candle (per symbol) at a time
+
+    load() replays a history, update() adds one closed candle in O(window) per
+    symbol, and snapshot() returns a DataFrame with the scanner.py column names.
+    """
+
+    def __init__(self, symbols, window=WINDOW):
+        self.symbols = list(symbols)
+        size = len(self.symbols)
+        self.bars = 0
+        self.last_open_time = None
+        self.buffers = {name: np.full((size, window), np.nan)
+                        for name in ("open", "high", "low", "close", "volume", "rsi")}
+        self.emas = {length: MovingAverage(size, length) for length in (5, 10, 20, 30, 50, 100, 200)}
+        self.ema12, self.ema26, self.ema13 = (MovingAverage(size, n) for n in (12, 26, 13))
+        self.macd_signal = MovingAverage(size, 9)
+        self.rsi_up, self.rsi_down = MovingAverage(size, 14, True), MovingAverage(size, 14, True)
+        self.tr, self.plus_dm, self.minus_dm = (MovingAverage(size, 14, True) for _ in range(3))
+        self.adx = MovingAverage(size, 14, True)
+        self.previous = {}   # recursive outputs of the previous bar, for the [1] columns
+        self.current = {}
+        self.psar = PSAR(size)
+        self.pivot_source = None
+
+    def shift(self, name, value):
+        buf = self.buffers[name]
+        buf[:, :-1] = buf[:, 1:]
+        buf[:, -1] = value
+
+    def update(self, open_, high, low, close, volume, open_time=None):
+        """Add one closed candle; every argument is an array with one value per symbol"""
+        # Copies: the buffers are shifted in place below
+        prev_close = self.buffers["close"][:, -1].copy()
+        prev_high = self.buffers["high"][:, -1].copy()
+        prev_low = self.buffers["low"][:, -1].copy()
+        for name, value in (("open", open_), ("high", high), ("low", low), ("close", close), ("volume", volume)):
+            self.shift(name, np.asarray(value, dtype=float))
+        close = self.buffers["close"][:, -1]
+        high = self.buffers["high"][:, -1]
+        low = self.buffers["low"][:, -1]
+
+        for average in self.emas.values():
+            average.update(close)
+        macd = self.ema12.update(close) - self.ema26.update(close)
+        self.macd_signal.update(macd)
+        self.ema13.update(close)
+
+        # RSI (Wilder)
+        change = close - prev_close
+        up = self.rsi_up.update(np.where(np.isnan(change), np.nan, np.maximum(change, 0)))
+        down = self.rsi_down.update(np.where(np.isnan(change), np.nan, np.maximum(-change, 0)))
+        rsi = np.where(down == 0, 100.0, np.where(up == 0, 0.0, 100 - 100 / (1 + divide(up, down))))
+        rsi[np.isnan(up) | np.isnan(down)] = np.nan
+        self.shift("rsi", rsi)
+
+        # DMI / ADX
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        move_up, move_down = high - prev_high, prev_low - low
+        plus = np.where(np.isnan(move_up), np.nan, np.where((move_up > move_down) & (move_up > 0), move_up, 0.0))
+        minus = np.where(np.isnan(move_down), np.nan, np.where((move_down > move_up) & (move_down > 0), move_down, 0.0))
+        smoothed_tr = self.tr.update(np.where(np.isnan(prev_close), np.nan, true_range))
+        plus_di = 100 * divide(self.plus_dm.update(plus), smoothed_tr)
+        minus_di = 100 * divide(self.minus_dm.update(minus), smoothed_tr)
+        total = plus_di + minus_di
+        adx = self.adx.update(100 * np.abs(plus_di - minus_di) / np.where(total == 0, 1, total))
+
+        self.psar.update(high, low, close, prev_high, prev_low, self.buffers["high"][:, -3], self.buffers["low"][:, -3])
+
+        self.previous = self.current
+        self.current = {
+            "macd": macd.copy(), "signal": self.macd_signal.value.copy(),
+            "adx": adx.copy(), "adx+di": plus_di, "adx-di": minus_di,
+            "bbpower": high - self.ema13.value + low - self.ema13.value,
+        }
+        self.bars += 1
+        self.last_open_time = open_time
+
+    def load(self, open_, high, low, close, volume, open_times=None):
+        """Replay a (symbols, time) history; shorter histories are left-padded with NaN"""
+        for t in range(np.shape(close)[1]):
+            self.update(open_[:, t], high[:, t], low[:, t], close[:, t], volume[:, t],
+                        None if open_times is None else open_times[t])
+
+    def set_pivot_source(self, high, low, close, open_):
+        """High/low/close/open of the previous pivot period (a month for the Pivot.M columns)"""
+        self.pivot_source = tuple(np.asarray(x, dtype=float) for x in (high, low, close, open_))
+
+    def stochastic(self, source_high, source_low, source_close, offset):
+        """Raw %K of a buffer `offset` bars back"""
+        hh, ll = highest(source_high, 14, offset), lowest(source_low, 14, offset)
+        return 100 * divide(source_close[:, -1 - offset] - ll, hh - ll)
+
+    def snapshot(self, columns=SCANNER_COLUMNS):
+        """Latest values as a DataFrame; fields are matched on their TradingView key"""
+        b = self.buffers
+        o, h, l, c, v, rsi_buf = b["open"], b["high"], b["low"], b["close"], b["volume"], b["rsi"]
+        out = {}
+        close, prev_close = c[:, -1], c[:, -2]
+        out.update(open=o[:, -1], high=h[:, -1], low=l[:, -1], close=close, volume=v[:, -1])
+        out["change"] = 100 * divide(close - prev_close, prev_close)
+        for length, average in self.emas.items():
+            out[f"ema{length}"] = average.value.copy()
+            out[f"sma{length}"] = sma(c, length)
+        out["rsi"], out["rsi[1]"] = rsi_buf[:, -1], rsi_buf[:, -2]
+
+        # Stoch 14,3,3: K is SMA3 of raw %K, D is SMA3 of K
+        raw_k = np.column_stack([self.stochastic(h, l, c, k) for k in range(5, -1, -1)])
+        k_line = np.column_stack([raw_k[:, i:i + 3].mean(axis=1) for i in range(4)])
+        out["stochk"], out["stochk[1]"] = k_line[:, -1], k_line[:, -2]
+        out["stochd"], out["stochd[1]"] = k_line[:, 1:].mean(axis=1), k_line[:, :3].mean(axis=1)
+
+        # CCI20 on hlc3
+        tp = (h + l + c) / 3
+        for key, k in (("cci20", 0), ("cci20[1]", 1)):
+            mean = sma(tp, 20, k)
+            deviation = np.abs(window(tp, 20, k) - mean[:, None]).mean(axis=1)
+            out[key] = divide(tp[:, -1 - k] - mean, 0.015 * deviation)
+
+        missing = np.full(len(self.symbols), np.nan)
+        for key in ("adx", "adx+di", "adx-di", "macd", "signal", "bbpower"):
+            out[key] = self.current.get(key, missing)
+        out["adx+di[1]"] = self.previous.get("adx+di", missing)
+        out["adx-di[1]"] = self.previous.get("adx-di", missing)
+
+        hl2 = (h + l) / 2
+        for key, k in (("ao", 0), ("ao[1]", 1), ("ao[2]", 2)):
+            out[key] = sma(hl2, 5, k) - sma(hl2, 34, k)
+        out["mom"], out["mom[1]"] = close - c[:, -11], prev_close - c[:, -12]
+
+        # Stoch RSI 3,3,14,14
+        stoch_rsi = np.column_stack([self.stochastic(rsi_buf, rsi_buf, rsi_buf, k) for k in range(4, -1, -1)])
+        stoch_rsi_k = np.column_stack([stoch_rsi[:, i:i + 3].mean(axis=1) for i in range(3)])
+        out["stochrsik"] = stoch_rsi_k[:, -1]
+        stoch_rsi_d = stoch_rsi_k.mean(axis=1)
+
+        out["wr"] = -100 * divide(highest(h, 14) - close, highest(h, 14) - lowest(l, 14))
+        wr_prev = -100 * divide(highest(h, 14, 1) - prev_close, highest(h, 14, 1) - lowest(l, 14, 1))
+
+        # Ultimate oscillator 7,14,28
+        low_or_close = np.fmin(window(l, 28), window(c, 28, 1))
+        buying = window(c, 28) - low_or_close
+        ranges = np.fmax(window(h, 28), window(c, 28, 1)) - low_or_close
+        averages = [divide(buying[:, -n:].sum(axis=1), ranges[:, -n:].sum(axis=1)) for n in (7, 14, 28)]
+        out["uo"] = 100 * (4 * averages[0] + 2 * averages[1] + averages[2]) / 7
+
+        out["ichimokubline"] = (highest(h, 26) + lowest(l, 26)) / 2
+        out["vwma"] = divide(sma(c * v, 20), sma(v, 20))
+        hull_raw = np.column_stack([2 * wma(c, 4, k) - wma(c, 9, k) for k in range(2, -1, -1)])
+        out["hullma9"] = wma(hull_raw, 3)
+        basis, deviation = sma(c, 20), window(c, 20).std(axis=1)
+        out["bblower"], out["bbupper"] = basis - 2 * deviation, basis + 2 * deviation
+        out["psar"] = self.psar.value.copy()
+        out.update(self.pivots())
+
+        out.update(self.ratings(out, stoch_rsi_d, wr_prev))
+        data = {"symbol": self.symbols}
+        for field in columns:
+            value = out.get(SCANNER_NAMES.get(field.key), missing)
+            data[field.name] = np.asarray(value, dtype=field.dtype)
+        return pd.DataFrame(data)
+
+    def ratings(self, out, stoch_rsi_d, wr_prev):
+        """Rec.* and Recommend.* following TradingView's technical rating rules"""
+        b = self.buffers
+        close, prev_close = out["close"], b["close"][:, -2]
+        uptrend, downtrend = close > out["sma50"], close < out["sma50"]
+        rec = {}
+
+        # Ichimoku: base < price, conversion crossed price upward, lead1 > price and lead1 > lead2
+        h, l = b["high"], b["low"]
+        conversion = (highest(h, 9) + lowest(l, 9)) / 2
+        conversion_prev = (highest(h, 9, 1) + lowest(l, 9, 1)) / 2
+        lead1 = ((highest(h, 9, 26) + lowest(l, 9, 26)) / 2 + (highest(h, 26, 26) + lowest(l, 26, 26)) / 2) / 2
+        lead2 = (highest(h, 52, 26) + lowest(l, 52, 26)) / 2
+        base = out["ichimokubline"]
+        rec["recichimoku"] = rating(
+            (base < close) & (conversion_prev < prev_close) & (conversion > close) & (lead1 > close) & (lead1 > lead2),
+            (base > close) & (conversion_prev > prev_close) & (conversion < close) & (lead1 < close) & (lead1 < lead2))
+        rec["rec.vwma"] = ma_rating(out["vwma"], close)
+        rec["rechullma9"] = ma_rating(out["hullma9"], close)
+        k, d = out["stochrsik"], stoch_rsi_d
+        rec["recstochrsi"] = rating(downtrend & (k < 20) & (d < 20) & (k > d), uptrend & (k > 80) & (d > 80) & (k < d))
+        rec["recwr"] = rating((out["wr"] < -80) & (out["wr"] > wr_prev), (out["wr"] > -20) & (out["wr"] < wr_prev))
+        bbp, bbp_prev = out["bbpower"], self.previous.get("bbpower", np.full(len(close), np.nan))
+        rec["recbbpower"] = rating(uptrend & (bbp < 0) & (bbp > bbp_prev), downtrend & (bbp > 0) & (bbp < bbp_prev))
+        rec["recuo"] = rating(out["uo"] > 70, out["uo"] < 30)
+
+        ma_ratings = [ma_rating(out[f"{kind}{n}"], close) for kind in ("ema", "sma") for n in (10, 20, 30, 50, 100, 200)]
+        ma_ratings += [rec["recichimoku"], rec["rec.vwma"], rec["rechullma9"]]
+        oscillators = [
+            rating((out["rsi"] < 30) & (out["rsi[1]"] < out["rsi"]), (out["rsi"] > 70) & (out["rsi[1]"] > out["rsi"])),
+            rating((out["stochk"] < 20) & (out["stochd"] < 20) & (out["stochk"] > out["stochd"])
+                   & (out["stochk[1]"] < out["stochd[1]"]),
+                   (out["stochk"] > 80) & (out["stochd"] > 80) & (out["stochk"] < out["stochd"])
+                   & (out["stochk[1]"] > out["stochd[1]"])),
+            rating((out["cci20"] < -100) & (out["cci20"] > out["cci20[1]"]),
+                   (out["cci20"] > 100) & (out["cci20"] < out["cci20[1]"])),
+            rating((out["adx"] > 20) & (out["adx+di[1]"] < out["adx-di[1]"]) & (out["adx+di"] > out["adx-di"]),
+                   (out["adx"] > 20) & (out["adx+di[1]"] > out["adx-di[1]"]) & (out["adx+di"] < out["adx-di"])),
+            rating(((out["ao"] > 0) & (out["ao[1]"] < 0))
+                   | ((out["ao"] > 0) & (out["ao[1]"] > 0) & (out["ao"] > out["ao[1]"]) & (out["ao[2]"] > out["ao[1]"])),
+                   ((out["ao"] < 0) & (out["ao[1]"] > 0))
+                   | ((out["ao"] < 0) & (out["ao[1]"] < 0) & (out["ao"] < out["ao[1]"]) & (out["ao[2]"] < out["ao[1]"]))),
+            rating(out["mom"] > out["mom[1]"], out["mom"] < out["mom[1]"]),
+            rating(out["macd"] > out["signal"], out["macd"] < out["signal"]),
+            rec["recstochrsi"], rec["recwr"], rec["recbbpower"], rec["recuo"],
+        ]
+        with warnings.catch_warnings():
+            # Symbols still warming up have no ratings at all
+            warnings.simplefilter("ignore", RuntimeWarning)
+            rec["recommendma"] = np.nanmean(np.column_stack(ma_ratings), axis=1)
+            rec["recommendother"] = np.nanmean(np.column_stack(oscillators), axis=1)
+        rec["recommendall"] = (rec["recommendma"] + rec["recommendother"]) / 2
+        return rec
+
+    def pivots(self):
+        """Classic, Fibonacci, Camarilla, Woodie and DeMark pivots of the previous pivot period"""
+        if self.pivot_source is None:
+            return {}
+        h, l, c, o = self.pivot_source
+        span = h - l
+        p = (h + l + c) / 3
+        out = {
+            "pivotmclassicmiddle": p, "pivotmclassicr1": 2 * p - l, "pivotmclassics1": 2 * p - h,
+            "pivotmclassicr2": p + span, "pivotmclassics2": p - span,
+            "pivotmclassicr3": p + 2 * span, "pivotmclassics3": p - 2 * span,
+            "pivotmfibonaccimiddle": p,
+            "pivotmcamarillamiddle": p,
+        }
+        for level, ratio in ((1, 0.382), (2, 0.618), (3, 1.0)):
+            out[f"pivotmfibonaccir{level}"] = p + ratio * span
+            out[f"pivotmfibonaccis{level}"] = p - ratio * span
+        for level, divisor in ((1, 12), (2, 6), (3, 4)):
+            out[f"pivotmcamarillar{level}"] = c + 1.1 * span / divisor
+            out[f"pivotmcamarillas{level}"] = c - 1.1 * span / divisor
+        w = (h + l + 2 * c) / 4
+        out.update({
+            "pivotmwoodiemiddle": w, "pivotmwoodier1": 2 * w - l, "pivotmwoodies1": 2 * w - h,
+            "pivotmwoodier2": w + span, "pivotmwoodies2": w - span,
+            "pivotmwoodier3": h + 2 * (w - l), "pivotmwoodies3": l - 2 * (h - w),
+        })
+        x = np.where(c < o, h + 2 * l + c, np.where(c > o, 2 * h + l + c, h + l + 2 * c))
+        out.update({"pivotmdemarkmiddle": x / 4, "pivotmdemarkr1": x / 2 - l, "pivotmdemarks1": x / 2 - h})
+        return out
+
+
+class PSAR:
+    """Parabolic SAR (0.02, 0.02, 0.2) with Pine's ta.sar state machine, per symbol"""
+
+    def __init__(self, size, start=0.02, increment=0.02, maximum=0.2):
+        self.start, self.increment, self.maximum = start, increment, maximum
+        self.bars = np.zeros(size, dtype=np.int64)
+        self.value = np.full(size, np.nan)
+        self.extreme = np.full(size, np.nan)
+        self.acceleration = np.full(size, np.nan)
+        self.below = np.zeros(size, dtype=bool)
+        self.prev_close = np.full(size, np.nan)
+
+    def update(self, high, low, close, high1, low1, high2, low2):
+        valid = ~np.isnan(close)
+        self.bars += valid
+        first = valid & (self.bars == 2)
+        rising = close > self.prev_close
+        self.below = np.where(first, rising, self.below)
+        self.extreme = np.where(first, np.where(rising, high, low), self.extreme)
+        self.value = np.where(first, np.where(rising, low1, high1), self.value)
+        self.acceleration = np.where(first, self.start, self.acceleration)
+        active = valid & (self.bars >= 2)
+
+        result = np.where(active, self.value + self.acceleration * (self.extreme - self.value), self.value)
+        flip_down = active & self.below & (result > low)
+        flip_up = active & ~self.below & (result < high)
+        new_trend = first | flip_down | flip_up
+        result = np.where(flip_down, np.fmax(high, self.extreme), np.where(flip_up, np.fmin(low, self.extreme), result))
+        self.extreme = np.where(flip_down, low, np.where(flip_up, high, self.extreme))
+        self.acceleration = np.where(flip_down | flip_up, self.start, self.acceleration)
+        self.below = np.where(flip_down, False, np.where(flip_up, True, self.below))
+
+        extend_up = active & ~new_trend & self.below & (high > self.extreme)
+        extend_down = active & ~new_trend & ~self.below & (low < self.extreme)
+        extended = extend_up | extend_down
+        self.extreme = np.where(extend_up, high, np.where(extend_down, low, self.extreme))
+        self.acceleration = np.where(extended, np.fmin(self.acceleration + self.increment, self.maximum),
+                                     self.acceleration)
+
+        later = self.bars > 2
+        clamped_below = np.fmin(result, np.where(later, np.fmin(low1, low2), low1))
+        clamped_above = np.fmax(result, np.where(later, np.fmax(high1, high2), high1))
+        self.value = np.where(active, np.where(self.below, clamped_below, clamped_above), self.value)
+        self.prev_close = np.where(valid, close, self.prev_close)
+
+
+def monthly_pivot_source(open_times, open_, high, low, close):
+    """Previous calendar month's high/low/close/open from (symbols, time) daily candles"""
+    months = pd.to_datetime(np.asarray(open_times), unit="ms").to_period("M")
+    previous = months[-1] - 1
+    in_month = np.asarray(months == previous)
+    if not in_month.any():
+        nan = np.full(np.shape(close)[0], np.nan)
+        return nan, nan, nan, nan
+    idx = np.flatnonzero(in_month)
+    return (high[:, idx].max(axis=1), low[:, idx].min(axis=1), close[:, idx[-1]], open_[:, idx[0]])
+
+
+# Agreement expected with TradingView per column: (tolerance, scale, share of symbols that must agree).
+# scale "value" compares relative to the recorded value; "close" compares relative to the symbol's close,
+# for price-unit oscillators that cross zero. Rec.* are -1/0/1 votes and must match exactly; one flipped
+# vote moves Recommend.MA by 1/15 and Recommend.Other by 1/11, so those get an absolute band instead.
+DEFAULT_TOLERANCE = (1e-3, "value", 0.95)
+TOLERANCES = {
+    **{name: (1e-3, "close", 0.95) for name in
+       ("macd", "signal", "ao", "ao[1]", "mom", "mom[1]", "bbpower")},
+    **{name: (0, "value", 0.8) for name in
+       ("recstochrsi", "recwr", "recbbpower", "recuo", "recichimoku", "rec.vwma", "rechullma9")},
+    "recommendma": (0.15, None, 0.8),
+    "recommendother": (0.2, None, 0.8),
+    "recommendall": (0.15, None, 0.8),
+    "psar": (1e-3, "value", 0.9),  # Depends on where the trend history starts
+}
+
+
+def compare(computed, reference, tolerances=TOLERANCES):
+    """Per-column agreement between a computed snapshot and recorded TradingView values"""
+    merged = computed.merge(reference, on="symbol", suffixes=("", "_tv"))
+    close = merged["close"].to_numpy(dtype=float)
+    rows = []
+    for field in SCANNER_COLUMNS:
+        if f"{field.name}_tv" not in merged:
+            continue
+        tolerance, scale, share = tolerances.get(field.name, DEFAULT_TOLERANCE)
+        ours = merged[field.name].to_numpy(dtype=float)
+        theirs = merged[f"{field.name}_tv"].to_numpy(dtype=float)
+        both = ~np.isnan(ours) & ~np.isnan(theirs)
+        error = np.abs(ours[both] - theirs[both])
+        if scale is not None:
+            error = error / np.maximum(np.abs(close[both] if scale == "close" else theirs[both]), 1e-12)
+        matched = int((error <= tolerance).sum())
+        rows.append({
+            "column": field.name,
+            "compared": int(both.sum()),
+            "matched": matched,
+            "max_error": float(error.max()) if len(error) else np.nan,
+            "ok": bool(matched >= share * both.sum()),
+        })
+    return pd.DataFrame(rows)
+
+
+def validate_fixture(path, tolerances=TOLERANCES):
+    """Check the engine against a recorded fixture (see replay.py record-tv)
+
+    Fixture layout: {"timeframe": "1h", "symbols": {"BTCUSDT": {"klines": [[open_time, o, h, l, c, v], ...],
+    "daily": [...], "indicators": {<TradingView key>: value, ...}}}}; all symbols share the same candle
+    times, and the last candle is the one the indicator values belong to. "daily" candles are optional
+    and feed the monthly pivots.
+    """
+    with open(path) as f:
+        fixture = json.load(f)
+    symbols = list(fixture["symbols"])
+    klines = np.array([fixture["symbols"][s]["klines"] for s in symbols], dtype=float)
+    engine = IndicatorEngine(symbols)
+    engine.load(*(klines[:, :, i] for i in range(1, 6)), open_times=klines[0, :, 0])
+    if all("daily" in fixture["symbols"][s] for s in symbols):
+        daily = np.array([fixture["symbols"][s]["daily"] for s in symbols], dtype=float)
+        engine.set_pivot_source(*monthly_pivot_source(daily[0, :, 0].astype(np.int64),
+                                                      *(daily[:, :, i] for i in range(1, 5))))
+    reference = pd.DataFrame([
+        dict({"symbol": s}, **{SCANNER_NAMES[k]: v for k, v in fixture["symbols"][s]["indicators"].items()
+                               if k in SCANNER_NAMES})
+        for s in symbols
+    ])
+    return compare(engine.snapshot(), reference, tolerances)
+
+
+if __name__ == "__main__":
+    report = validate_fixture(sys.argv[1])
+    print(report.to_string(index=False))
+    sys.exit(0 if report["ok"].all() else 1)
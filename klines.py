@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import asyncio
+import numpy as np
+from store import atomic_write
+import metrics
+
+# --- Configuration --- #
+KLINE_DIR = os.getenv('KLINE_DIR', os.path.join(os.getcwd(), 'klines'))
+KLINES_URL = os.getenv('BINANCE_KLINES_URL', 'https://fapi.binance.com/fapi/v1/klines')
+PAGE_LIMIT = 1500  # Binance futures klines per request
+# Directory of recorded klines ({symbol}_{interval}.json); when set, candles come from it instead of the exchange
+KLINE_FIXTURES = os.getenv('KLINE_FIXTURES')
+
+# One candle on disk: open time (ms) and OHLCV, 48 bytes
+RECORD = np.dtype([("open_time", "<i8"), ("open", "<f8"), ("high", "<f8"),
+                   ("low", "<f8"), ("close", "<f8"), ("volume", "<f8")])
+
+PERIOD_MS = {
+    "5m": 5 * 60 * 1000,
+    "15m": 15 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "4h": 4 * 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000,
+}
+
+# Stored resolutions and the candles kept for each (15 days of 5m, 250 days of 1h).
+# Only BASE is downloaded every cycle; 1h is rolled up from it.
+BASE = "5m"
+SERIES = {"5m": 4320, "1h": 6000}
+# Timeframe -> stored resolution it is resampled from
+SOURCES = {"5m": "5m", "15m": "5m", "1h": "1h", "4h": "1h", "1d": "1h"}
+
+
+def to_records(rows):
+    """Binance kline rows ([open_time, "o", "h", "l", "c", "v", ...]) as RECORD array"""
+    records = np.empty(len(rows), dtype=RECORD)
+    for i, row in enumerate(rows):
+        records[i] = (int(row[0]), *(float(x) for x in row[1:6]))
+    return records
+
+
+def find_gaps(times, period):
+    """Missing open-time ranges [(first missing, last missing)] inside a sorted series"""
+    times = np.asarray(times)
+    breaks = np.flatnonzero(np.diff(times) > period)
+    return [(int(times[i]) + period, int(times[i + 1]) - period) for i in breaks]
+
+
+def resample(records, period, base_period):
+    """Aggregate candles into `period` buckets; incomplete buckets at either end are left out"""
+    if not len(records):
+        return records[:0]
+    buckets = records["open_time"] // period * period
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(records)] - 1
+    out = np.empty(len(starts), dtype=RECORD)
+    out["open_time"] = buckets[starts]
+    out["open"] = records["open"][starts]
+    out["high"] = np.maximum.reduceat(records["high"], starts)
+    out["low"] = np.minimum.reduceat(records["low"], starts)
+    out["close"] = records["close"][ends]
+    out["volume"] = np.add.reduceat(records["volume"], starts)
+    if records["open_time"][-1] != out["open_time"][-1] + period - base_period:
+        out = out[:-1]
+    if len(out) and records["open_time"][0] != out["open_time"][0]:
+        out = out[1:]
+    return out
+
+
+def merge(*parts):
+    """Sorted union of record arrays; later parts win on duplicate open times"""
+    records = np.concatenate(parts)[::-1]
+    _, first = np.unique(records["open_time"], return_index=True)
+    return records[first]
+
+
+class BinanceKlineSource:
+    """Closed candles from the Binance futures klines endpoint, paged by start time"""
+
+    def __init__(self, transport, url=KLINES_URL):
+        self.transport = transport
+        self.url = url
+        self.requests = 0
+
+    async def get(self, params):
+        # Rate limiting and retries happen in the transport
+        self.requests += 1
+        return await self.transport.get_json(self.url, params)
+
+    async def klines(self, symbol, interval, start, end):
+        """Candles with start <= open_time <= end"""
+        pages, period = [], PERIOD_MS[interval]
+        while start <= end:
+            rows = await self.get({"symbol": symbol, "interval": interval, "startTime": start,
+                                   "endTime": end, "limit": PAGE_LIMIT})
+            if not rows:
+                break
+            # Parsing a full page is a Python loop over 1500 rows; the event loop is shared with the bot
+            pages.append(await asyncio.get_running_loop().run_in_executor(None, to_records, rows))
+            start = int(rows[-1][0]) + period
+        return merge(*pages) if pages else np.empty(0, dtype=RECORD)
+
+
+class FixtureKlineSource:
+    """Candles from recorded files ({directory}/{symbol}_{interval}.json, Binance row format)
+
+    Used to backfill or replay without touching the exchange.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.loaded = {}
+        self.requests = 0
+
+    @staticmethod
+    def read(path):
+        with open(path) as f:
+            return to_records(json.load(f))
+
+    async def klines(self, symbol, interval, start, end):
+        self.requests += 1
+        key = (symbol, interval)
+        if key not in self.loaded:
+            path = os.path.join(self.directory, f"{symbol}_{interval}.json")
+            self.loaded[key] = await asyncio.get_running_loop().run_in_executor(None, self.read, path)
+        records = self.loaded[key]
+        times = records["open_time"]
+        return records[(times >= start) & (times <= end)]
+
+
+def kline_source(transport):
+    """The configured candle source: recorded fixtures if KLINE_FIXTURES is set, else Binance"""
+    if KLINE_FIXTURES:
+        return FixtureKlineSource(KLINE_FIXTURES)
+    return BinanceKlineSource(transport)
+
+
+class CandleStore:
+    """Per-symbol append-only candle files, read through memory maps
+
+    Every stored resolution keeps a bounded rolling window: new candles are
+    appended, and the file is rewritten down to the window once it grows to
+    twice that size. Timeframes are resampled from the stored resolutions, so
+    one download of the base resolution serves all of them.
+    """
+
+    def __init__(self, source, directory=KLINE_DIR, series=SERIES, base=BASE):
+        self.source = source
+        self.directory = directory
+        self.series = series
+        self.base = base
+        self.lock = None
+        self.backfills = 0
+        self.unfillable = set()  # (symbol, resolution, start) gaps the source had no candles for
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, symbol, resolution):
+        return os.path.join(self.directory, f"{symbol}_{resolution}.bin")
+
+    def read(self, symbol, resolution):
+        """Stored candles (read-only memory map; empty if nothing is stored yet)"""
+        path = self.path(symbol, resolution)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size < RECORD.itemsize:
+            return np.empty(0, dtype=RECORD)
+        # Map whole records only; an append in progress can leave a partial one at the end
+        return np.memmap(path, dtype=RECORD, mode="r", shape=(size // RECORD.itemsize,))
+
+    def last_time(self, symbol, resolution):
+        path = self.path(symbol, resolution)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size < RECORD.itemsize:
+            return None
+        with open(path, "rb") as f:
+            f.seek(size - size % RECORD.itemsize - RECORD.itemsize)
+            return int(np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)["open_time"][0])
+
+    def append(self, symbol, resolution, records):
+        if not len(records):
+            return
+        with open(self.path(symbol, resolution), "ab") as f:
+            f.write(np.ascontiguousarray(records, dtype=RECORD).tobytes())
+        window = self.series[resolution]
+        if os.path.getsize(self.path(symbol, resolution)) > 2 * window * RECORD.itemsize:
+            self.rewrite(symbol, resolution, self.read(symbol, resolution))
+
+    def rewrite(self, symbol, resolution, records):
+        """Replace a file with the last window of `records` (compaction and gap repair)"""
+        keep = np.array(records[-self.series[resolution]:])
+        atomic_write(self.path(symbol, resolution), lambda tmp: keep.tofile(tmp))
+
+    def gaps(self, symbol, resolution):
+        return find_gaps(self.read(symbol, resolution)["open_time"], PERIOD_MS[resolution])
+
+    def store(self, symbol, resolution, fetched):
+        """Merge downloaded candles into the stored series"""
+        stored = self.read(symbol, resolution)
+        if len(stored) and len(fetched) and fetched["open_time"][0] <= stored["open_time"][-1]:
+            self.rewrite(symbol, resolution, merge(np.array(stored), fetched))
+        else:
+            self.append(symbol, resolution, fetched)
+
+    async def backfill(self, symbol, resolution, start, end):
+        """Download [start, end] from the source and merge it into the stored series"""
+        self.backfills += 1
+        fetched = await self.source.klines(symbol, resolution, start, end)
+        await asyncio.get_running_loop().run_in_executor(None, self.store, symbol, resolution, fetched)
+        return len(fetched)
+
+    async def repair(self, symbol, resolution):
+        """Backfill gaps inside the stored window; gaps the source cannot fill are not retried"""
+        gaps = await asyncio.get_running_loop().run_in_executor(None, self.gaps, symbol, resolution)
+        for start, end in gaps:
+            if (symbol, resolution, start) in self.unfillable:
+                continue
+            if not await self.backfill(symbol, resolution, start, end):
+                self.unfillable.add((symbol, resolution, start))
+
+    def last_closed(self, resolution, now):
+        """Open time of the newest candle that has closed at `now` (ms)"""
+        period = PERIOD_MS[resolution]
+        return now // period * period - period
+
+    def roll_up(self, symbol, resolution, now):
+        """Update a resolution from what is already stored; the start of the range still to download, or None"""
+        period, window = PERIOD_MS[resolution], self.series[resolution]
+        target = self.last_closed(resolution, now)
+        last = self.last_time(symbol, resolution)
+        oldest = target - (window - 1) * period
+        if last is not None and last >= target:
+            return None
+        if resolution != self.base and last is not None:
+            # Roll up from the base series; download only what it cannot cover
+            rolled = resample(self.read(symbol, self.base), period, PERIOD_MS[self.base])
+            rolled = rolled[rolled["open_time"] > last]
+            if len(rolled) and rolled["open_time"][0] == last + period:
+                self.append(symbol, resolution, rolled)
+                return None
+        return oldest if last is None or last < oldest else last + period
+
+    async def sync_symbol(self, symbol, now):
+        loop = asyncio.get_running_loop()
+        for resolution in [self.base] + [r for r in self.series if r != self.base]:
+            # File reads, resampling and appends run off the event loop, which the bot shares
+            start = await loop.run_in_executor(None, self.roll_up, symbol, resolution, now)
+            if start is None:
+                continue
+            await self.backfill(symbol, resolution, start, self.last_closed(resolution, now))
+            await self.repair(symbol, resolution)
+
+    async def sync(self, symbols, now=None):
+        """Bring every symbol up to the last closed candle; a no-op when nothing new has closed
+
+        Concurrent callers (timeframes closing together) wait for one sync
+        instead of downloading the same candles again. Returns {symbol: reason}
+        for symbols that could not be updated.
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        now = int(time.time() * 1000) if now is None else now
+        async with self.lock:
+            results = await asyncio.gather(*[self.sync_symbol(s, now) for s in symbols],
+                                           return_exceptions=True)
+        failed = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                failed[symbol] = getattr(result, "reason", None) or type(result).__name__
+        if failed:
+            metrics.log(f"{len(failed)} sembolün mumları güncellenemedi: {next(iter(failed.values()))}")
+        return failed
+
+    def candles(self, symbol, interval):
+        """Closed candles of a timeframe, resampled from its stored resolution"""
+        resolution = SOURCES[interval]
+        records = self.read(symbol, resolution)
+        if interval == resolution:
+            return np.array(records)
+        return resample(records, PERIOD_MS[interval], PERIOD_MS[resolution])
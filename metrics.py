@@ -0,0 +1,189 @@
+import os
+import time
+import bisect
+from contextlib import contextmanager
+from aiohttp import web
+
+# --- Configuration --- #
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')  # Local only; put a proxy in front to expose it
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))     # 0 disables the endpoint
+HOT_LOGGING = os.getenv('HOT_LOOP_LOGGING', '1') == '1'  # Per-cycle and per-chunk progress lines
+SPAN_LOGGING = os.getenv('SPAN_LOGGING', '0') == '1'     # One structured line per finished span
+PREFIX = "tgscanner_"
+# Latency buckets in seconds, from a fast command to a slow full-universe cycle
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def lines(self):
+        raise NotImplementedError
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.lines()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def lines(self):
+        return [f"{self.name}{format_labels(self.labels, key)} {value}" for key, value in self.values.items()]
+
+
+class Gauge(Metric):
+    """Last set value per label set, or values computed at scrape time by `function`"""
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), function=None):
+        super().__init__(name, help, labels)
+        self.values = {}
+        self.function = function  # () -> {label tuple: value}
+
+    def set(self, value, **labels):
+        self.values[self.key(labels)] = value
+
+    def lines(self):
+        values = self.function() if self.function is not None else self.values
+        return [f"{self.name}{format_labels(self.labels, key)} {value}"
+                for key, value in values.items() if value is not None]
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count per label set, like a Prometheus client histogram"""
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label tuple -> [per-bucket counts (+Inf last), sum, count]
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def lines(self):
+        lines = []
+        for key, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Metrics of one process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=(), function=None):
+        return self.register(Gauge(name, help, labels, function))
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+STAGES = registry.histogram("stage_seconds", "Duration of one pipeline stage", ("stage", "timeframe"))
+CYCLES = registry.histogram("cycle_seconds", "Duration of a full scan cycle", ("timeframe",))
+CYCLE_RESULTS = registry.counter("cycles_total", "Finished scan cycles by result", ("timeframe", "result"))
+SKIPPED = registry.counter("cycles_skipped_total", "Candle closes skipped because a scan was still running",
+                           ("timeframe",))
+LAG = registry.gauge("publish_lag_seconds", "Candle close to snapshot publish, last cycle", ("timeframe",))
+FRESHNESS = registry.gauge("snapshot_age_seconds", "Seconds since the snapshot was last published", ("timeframe",))
+COMMANDS = registry.histogram("command_seconds", "Bot command handling time", ("command",))
+
+
+def log(message):
+    """Progress output from the scan loop; HOT_LOOP_LOGGING=0 silences it"""
+    if HOT_LOGGING:
+        print(message)
+
+
+@contextmanager
+def span(stage, **labels):
+    """Time a pipeline stage into the stage histogram; failed stages are timed too"""
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGES.observe(elapsed, stage=stage, **labels)
+        if SPAN_LOGGING and HOT_LOGGING:
+            fields = " ".join(f"{name}={value}" for name, value in labels.items())
+            print(f"span stage={stage} {fields} status={status} seconds={elapsed:.4f}")
+
+
+def track_freshness(published_at):
+    """Serve snapshot age from published_at() -> {timeframe: unix time or None}"""
+    def ages():
+        now = time.time()
+        return {(timeframe,): round(now - at, 3) for timeframe, at in published_at().items() if at is not None}
+    FRESHNESS.function = ages
+
+
+async def serve(port=METRICS_PORT, host=METRICS_HOST, registry=registry):
+    """Start the /metrics endpoint on the running loop; returns the runner (None if disabled)"""
+    if not port:
+        return None
+
+    async def handle(request):
+        return web.Response(body=registry.render().encode(),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,406 @@
+import re
+import operator
+from functools import lru_cache
+import numpy as np
+import pyarrow.compute as pc
+from schema import SCANNER_COLUMNS, BOT_COLUMNS
+
+# --- Limits --- #
+MAX_LENGTH = 300  # characters of query text
+MAX_NODES = 60    # operands + operators in the parsed expression
+MAX_DEPTH = 12    # nesting depth
+CACHE_SIZE = 256  # compiled plans kept in the LRU cache
+
+STRING_COLUMNS = {"symbol", "timeframe"}
+COLUMNS = {field.name for field in SCANNER_COLUMNS + BOT_COLUMNS} | STRING_COLUMNS
+# Longest names first so `adx+di[1]` wins over `adx+di` and `adx`
+COLUMN_NAMES = sorted(COLUMNS, key=len, reverse=True)
+
+KEYWORDS = {"and": "and", "&": "and", "&&": "and", "or": "or", "|": "or", "||": "or", "not": "not", "~": "not"}
+COMPARISONS = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "==": operator.eq, "=": operator.eq, "!=": operator.ne,
+}
+ARITHMETIC = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}
+ARROW_ARITHMETIC = {"+": pc.add, "-": pc.subtract, "*": pc.multiply, "/": pc.divide}
+
+NUMBER_RE = re.compile(r"\d+(\.\d*)?([e][+-]?\d+)?|\.\d+")
+STRING_RE = re.compile(r"'([^']*)'|\"([^\"]*)\"")
+WORD_RE = re.compile(r"[a-z_][a-z0-9_.]*(\[\d+\])?")
+SYMBOL_RE = re.compile(r"<=|>=|==|!=|&&|\|\||[<>=&|~+\-*/()]")
+NAME_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789_.[")
+
+
+class QueryError(ValueError):
+    """Raised for queries that do not parse, use unknown columns or exceed the limits"""
+
+
+def tokenize(text):
+    """Split query text into (kind, value) tokens; column names are matched against the schema"""
+    if len(text) > MAX_LENGTH:
+        raise QueryError(f"Sorgu çok uzun (en fazla {MAX_LENGTH} karakter)")
+    tokens = []
+    i = 0
+    # Lowercase per character so positions line up with the original text
+    lowered = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+    while i < len(text):
+        if text[i].isspace():
+            i += 1
+            continue
+        match = STRING_RE.match(text, i)
+        if match:
+            tokens.append(("str", match.group(1) if match.group(1) is not None else match.group(2)))
+            i = match.end()
+            continue
+        match = NUMBER_RE.match(lowered, i)
+        if match:
+            tokens.append(("num", float(match.group())))
+            i = match.end()
+            continue
+        column = next((name for name in COLUMN_NAMES if lowered.startswith(name, i)
+                       and (i + len(name) == len(text) or lowered[i + len(name)] not in NAME_CHARS)), None)
+        if column:
+            tokens.append(("col", column))
+            i += len(column)
+            continue
+        match = WORD_RE.match(lowered, i)
+        if match:
+            word = match.group()
+            if word not in KEYWORDS:
+                raise QueryError(f"Bilinmeyen sütun: {word}")
+            tokens.append(("kw", KEYWORDS[word]))
+            i = match.end()
+            continue
+        match = SYMBOL_RE.match(text, i)
+        if match:
+            symbol = match.group()
+            tokens.append(("kw", KEYWORDS[symbol]) if symbol in KEYWORDS else ("op", symbol))
+            i = match.end()
+            continue
+        raise QueryError(f"Beklenmeyen karakter: {text[i]}")
+    if not tokens:
+        raise QueryError("Boş sorgu")
+    return tokens
+
+
+def normalize(text):
+    """Canonical form of a query, used as the plan cache key"""
+    parts = []
+    for kind, value in tokenize(text):
+        if kind == "str":
+            parts.append(repr(value))
+        elif kind == "num":
+            parts.append(repr(value))
+        else:
+            parts.append(value)
+    return " ".join(parts)
+
+
+class Parser:
+    """Recursive descent parser producing a tree of NumPy closures"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.nodes = 0
+        self.columns = set()
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def count(self, depth):
+        self.nodes += 1
+        if self.nodes > MAX_NODES:
+            raise QueryError(f"Sorgu çok karmaşık (en fazla {MAX_NODES} öğe)")
+        if depth > MAX_DEPTH:
+            raise QueryError(f"Sorgu çok iç içe (en fazla {MAX_DEPTH} seviye)")
+
+    def parse(self):
+        kind, fn = self.parse_or(0)
+        if self.pos != len(self.tokens):
+            raise QueryError(f"Beklenmeyen ifade: {self.peek()[1]}")
+        if kind != "bool":
+            raise QueryError("Sorgu bir koşul olmalı (ör: rsi < 30)")
+        return fn
+
+    def parse_or(self, depth):
+        kind, fn = self.parse_and(depth)
+        while self.peek() == ("kw", "or"):
+            self.take()
+            self.count(depth)
+            fn = self.logical(np.logical_or, (kind, fn), self.parse_and(depth))
+            kind = "bool"
+        return kind, fn
+
+    def parse_and(self, depth):
+        kind, fn = self.parse_not(depth)
+        while self.peek() == ("kw", "and"):
+            self.take()
+            self.count(depth)
+            fn = self.logical(np.logical_and, (kind, fn), self.parse_not(depth))
+            kind = "bool"
+        return kind, fn
+
+    def logical(self, func, left, right):
+        if left[0] != "bool" or right[0] != "bool":
+            raise QueryError("and/or yalnızca koşulları bağlayabilir")
+        left_fn, right_fn = left[1], right[1]
+        return lambda col: func(left_fn(col), right_fn(col))
+
+    def parse_not(self, depth):
+        if self.peek() == ("kw", "not"):
+            self.take()
+            self.count(depth)
+            kind, fn = self.parse_not(depth + 1)
+            if kind != "bool":
+                raise QueryError("not yalnızca koşullara uygulanabilir")
+            return "bool", self.negate(fn)
+        return self.parse_comparison(depth)
+
+    def parse_comparison(self, depth):
+        left = self.parse_sum(depth)
+        terms = []
+        while self.peek()[0] == "op" and self.peek()[1] in COMPARISONS:
+            op = self.take()[1]
+            self.count(depth)
+            right = self.parse_sum(depth)
+            terms.append(self.compare(op, left, right))
+            left = right
+        if not terms:
+            return left
+        # Chained comparisons (20 < rsi < 30) mean all pairs hold
+        fn = terms[0]
+        for term in terms[1:]:
+            fn = self.both(fn, term)
+        return "bool", fn
+
+    def negate(self, fn):
+        return lambda col: np.logical_not(fn(col))
+
+    def both(self, left_fn, right_fn):
+        return lambda col: np.logical_and(left_fn(col), right_fn(col))
+
+    def compare(self, op, left, right):
+        if left[0] == "bool" or right[0] == "bool":
+            raise QueryError("Koşullar karşılaştırılamaz")
+        if left[0] != right[0]:
+            raise QueryError("Metin ve sayı karşılaştırılamaz")
+        if left[0] == "str" and op not in ("==", "=", "!="):
+            raise QueryError("Metinler yalnızca == veya != ile karşılaştırılabilir")
+        func, left_fn, right_fn = COMPARISONS[op], left[1], right[1]
+        # NaN != x is true in NumPy; treat it like every other comparison on a missing value
+        numeric_ne = left[0] == "num" and op == "!="
+
+        def evaluate(col):
+            left_value, right_value = left_fn(col), right_fn(col)
+            with np.errstate(invalid="ignore"):
+                result = np.asarray(func(left_value, right_value), dtype=bool)
+            if numeric_ne:
+                result = result & ~(np.isnan(left_value) | np.isnan(right_value))
+            return result
+        return evaluate
+
+    def parse_sum(self, depth):
+        kind, fn = self.parse_product(depth)
+        while self.peek()[0] == "op" and self.peek()[1] in ("+", "-"):
+            op = self.take()[1]
+            self.count(depth)
+            fn = self.arithmetic(op, (kind, fn), self.parse_product(depth))
+            kind = "num"
+        return kind, fn
+
+    def parse_product(self, depth):
+        kind, fn = self.parse_unary(depth)
+        while self.peek()[0] == "op" and self.peek()[1] in ("*", "/"):
+            op = self.take()[1]
+            self.count(depth)
+            fn = self.arithmetic(op, (kind, fn), self.parse_unary(depth))
+            kind = "num"
+        return kind, fn
+
+    def arithmetic(self, op, left, right):
+        if left[0] != "num" or right[0] != "num":
+            raise QueryError("Aritmetik yalnızca sayısal sütunlarla yapılabilir")
+        func, left_fn, right_fn = ARITHMETIC[op], left[1], right[1]
+
+        def evaluate(col):
+            with np.errstate(all="ignore"):
+                return func(left_fn(col), right_fn(col))
+        return evaluate
+
+    def parse_unary(self, depth):
+        if self.peek() == ("op", "-"):
+            self.take()
+            self.count(depth)
+            kind, fn = self.parse_unary(depth + 1)
+            if kind != "num":
+                raise QueryError("Eksi işareti yalnızca sayılara uygulanabilir")
+            return "num", self.negative(fn)
+        return self.parse_atom(depth)
+
+    def negative(self, fn):
+        return lambda col: np.negative(fn(col))
+
+    def constant(self, value):
+        return lambda col: value
+
+    def column(self, name):
+        return lambda col: col(name)
+
+    def parse_atom(self, depth):
+        kind, value = self.take()
+        self.count(depth)
+        if kind in ("num", "str"):
+            return kind, self.constant(value)
+        if kind == "col":
+            self.columns.add(value)
+            return ("str" if value in STRING_COLUMNS else "num"), self.column(value)
+        if (kind, value) == ("op", "("):
+            result = self.parse_or(depth + 1)
+            if self.take() != ("op", ")"):
+                raise QueryError("Kapanmayan parantez")
+            return result
+        raise QueryError(f"Beklenmeyen ifade: {value}" if kind else "Sorgu eksik")
+
+
+class ArrowParser(Parser):
+    """Same grammar, producing a pyarrow.compute expression for scans that filter while reading
+
+    Comparisons on missing values are false, as with NumPy's NaN, so `not`
+    keeps the rows the in-memory mask would keep.
+    """
+
+    def logical(self, func, left, right):
+        if left[0] != "bool" or right[0] != "bool":
+            raise QueryError("and/or yalnızca koşulları bağlayabilir")
+        return left[1] & right[1] if func is np.logical_and else left[1] | right[1]
+
+    def compare(self, op, left, right):
+        if left[0] == "bool" or right[0] == "bool":
+            raise QueryError("Koşullar karşılaştırılamaz")
+        if left[0] != right[0]:
+            raise QueryError("Metin ve sayı karşılaştırılamaz")
+        if left[0] == "str" and op not in ("==", "=", "!="):
+            raise QueryError("Metinler yalnızca == veya != ile karşılaştırılabilir")
+        return pc.coalesce(COMPARISONS[op](left[1], right[1]), False)
+
+    def arithmetic(self, op, left, right):
+        if left[0] != "num" or right[0] != "num":
+            raise QueryError("Aritmetik yalnızca sayısal sütunlarla yapılabilir")
+        return ARROW_ARITHMETIC[op](left[1], right[1])
+
+    def negate(self, fn):
+        return pc.invert(fn)
+
+    def both(self, left_fn, right_fn):
+        return left_fn & right_fn
+
+    def negative(self, fn):
+        return pc.negate(fn)
+
+    def constant(self, value):
+        return pc.scalar(value)
+
+    def column(self, name):
+        return pc.field(name)
+
+
+# Comparisons a single-column range can express, and their mirror image for `const <op> col`
+LOWER = {">": False, ">=": True}  # -> whether the bound is inclusive
+UPPER = {"<": False, "<=": True}
+FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "=": "=="}
+
+
+def range_of(tokens):
+    """(column, low, high, low_inclusive, high_inclusive) for `col <op> const`, `const <op> col`
+    and `const <op> col <op> const` on a numeric column; None for any other query
+    """
+    items, i = [], 0
+    while i < len(tokens):
+        # Fold a unary minus into the number it negates
+        if tokens[i] == ("op", "-") and i + 1 < len(tokens) and tokens[i + 1][0] == "num":
+            items.append(("num", -tokens[i + 1][1]))
+            i += 2
+        else:
+            items.append(tokens[i])
+            i += 1
+    kinds = [kind if kind != "op" or value in FLIPPED else None for kind, value in items]
+    if kinds == ["col", "op", "num"]:
+        comparisons = [(items[1][1], items[2][1])]
+    elif kinds == ["num", "op", "col"]:
+        comparisons = [(FLIPPED[items[1][1]], items[0][1])]
+    elif kinds == ["num", "op", "col", "op", "num"] and items[1][1] in UPPER and items[3][1] in UPPER:
+        comparisons = [(FLIPPED[items[1][1]], items[0][1]), (items[3][1], items[4][1])]
+    else:
+        return None
+    column = next(value for kind, value in items if kind == "col")
+    if column in STRING_COLUMNS:
+        return None
+    low = high = None
+    low_inclusive = high_inclusive = True
+    for op, value in comparisons:
+        if op in ("==", "="):
+            low = high = value
+        elif op in LOWER:
+            low, low_inclusive = value, LOWER[op]
+        else:
+            high, high_inclusive = value, UPPER[op]
+    return column, low, high, low_inclusive, high_inclusive
+
+
+class QueryPlan:
+    """Compiled query: evaluates to a boolean row mask over a snapshot
+
+    A single-column range (`rsi < 30`, `20 < rsi <= 40`) can instead be answered
+    by binary search on a snapshot's SignalIndex.
+    """
+
+    def __init__(self, text, fn, columns, range=None):
+        self.text = text
+        self.fn = fn
+        self.columns = frozenset(columns)
+        self.range = range
+        self._expression = None
+
+    def expression(self):
+        """The query as a pyarrow.compute expression, built on first use"""
+        if self._expression is None:
+            self._expression = ArrowParser(tokenize(self.text)).parse()
+        return self._expression
+
+    def mask(self, df):
+        missing = self.columns - set(df.columns)
+        if missing:
+            raise QueryError(f"Bu zaman aralığında olmayan sütun: {', '.join(sorted(missing))}")
+        arrays = {}
+
+        def col(name):
+            if name not in arrays:
+                values = df[name].to_numpy()
+                arrays[name] = values if name in STRING_COLUMNS else values.astype(float)
+            return arrays[name]
+        return np.broadcast_to(self.fn(col), (len(df),))
+
+    def rows(self, df, index=None):
+        """Positional indices of matching rows; `index` is the SignalIndex of this same df"""
+        if self.range is not None and index is not None and self.range[0] in index.sorted:
+            return index.range(*self.range)
+        return np.flatnonzero(self.mask(df))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_normalized(text):
+    tokens = tokenize(text)
+    parser = Parser(tokens)
+    return QueryPlan(text, parser.parse(), parser.columns, range_of(tokens))
+
+
+def compile_query(text):
+    """Parse a query once; identical queries (after normalization) share one cached plan"""
+    return compile_normalized(normalize(text))
+
@@ -0,0 +1,205 @@
+import os
+import time
+import random
+import asyncio
+from urllib.parse import urlsplit
+
+# --- Configuration --- #
+# Starting and ceiling request rates (per second) for each upstream host
+RATES = {
+    "scanner.tradingview.com": (4, 10),
+    "fapi.binance.com": (15, 30),
+}
+DEFAULT_RATE = (float(os.getenv('UPSTREAM_RATE', 10)), float(os.getenv('UPSTREAM_MAX_RATE', 20)))
+MIN_RATE = 0.5          # Never slow an endpoint below this
+INCREASE = 0.2          # Rate added per successful request (additive increase)
+DECREASE = 0.5          # Rate multiplier on a throttling response (multiplicative decrease)
+BREAKER_THRESHOLD = 5   # Consecutive failures that open the circuit
+BREAKER_COOLDOWN = 30   # Seconds before a probe request is let through again
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30
+
+# Responses that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = {418, 429}
+RETRY_STATUSES = THROTTLE_STATUSES | {500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """A request that failed after retries; `reason` is a short label for coverage reports"""
+
+    def __init__(self, reason, status=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, host):
+        super().__init__(f"devre açık ({host})")
+
+
+def backoff(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full-jitter exponential backoff: a uniform delay up to base * 2**attempt"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Token bucket whose rate follows AIMD: +INCREASE per success, xDECREASE when throttled"""
+
+    def __init__(self, rate, max_rate, min_rate=MIN_RATE):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.lock = None
+
+    def refill(self, now):
+        # Burst capacity of one second's worth of requests
+        self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        # Waiters queue on the lock so tokens are handed out in arrival order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def reward(self):
+        self.rate = min(self.max_rate, self.rate + INCREASE)
+
+    def penalize(self, retry_after=None):
+        """Cut the rate; honour Retry-After by pausing the whole endpoint
+
+        Responses to a burst that was already in flight arrive together; they
+        count as one signal, so the rate is cut at most once per second.
+        """
+        now = time.monotonic()
+        if now - self.decreased_at >= 1:
+            self.rate = max(self.min_rate, self.rate * DECREASE)
+            self.decreased_at = now
+        self.tokens = min(self.tokens, 0.0)
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+
+
+class CircuitBreaker:
+    """Stop calling an endpoint after repeated failures; one probe is allowed after the cooldown
+
+    While the probe is out, other callers wait for its outcome instead of
+    failing at once. success() and failure() end the probe; a probe that ends
+    any other way (e.g. cancelled) must call settle() itself.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.probe_done = None
+        self.opened = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        """Whether a request may go out now; in half-open state the first caller becomes the probe"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.probing:
+            self.probing = True
+            self.probe_done = asyncio.Event()
+            return True
+        return False
+
+    async def admit(self):
+        """Like allow(), but wait for a running probe instead of refusing while it is out"""
+        while not self.allow():
+            if not self.probing:
+                return False
+            await self.probe_done.wait()
+        return True
+
+    def settle(self, probe=None):
+        """End the probe and wake its waiters; without success() or failure() it stays half-open
+
+        probe: the probe_done event the caller was admitted with; a stale one is ignored.
+        """
+        if self.probing and probe in (None, self.probe_done):
+            self.probing = False
+            self.probe_done.set()
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.settle()
+
+    def failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            if self.opened_at is None or self.probing:
+                self.opened += 1
+            self.opened_at = time.monotonic()
+            self.settle()
+
+
+class Endpoint:
+    """Limiter, breaker and counters of one upstream host"""
+
+    def __init__(self, host, rate, max_rate):
+        self.host = host
+        self.bucket = TokenBucket(rate, max_rate)
+        self.breaker = CircuitBreaker()
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def stats(self):
+        return {
+            "rate": round(self.bucket.rate, 2),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "breaker": self.breaker.state,
+        }
+
+
+class Limiters:
+    """One Endpoint per upstream host, created on first use
+
+    Limits are per host because upstream quotas (e.g. Binance request weight)
+    are counted per IP, not per path. `scale` divides them between processes.
+    """
+
+    def __init__(self, rates=RATES, default=DEFAULT_RATE, scale=1.0):
+        self.rates = rates
+        self.default = default
+        self.scale = scale
+        self.endpoints = {}
+
+    def get(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.endpoints:
+            rate, max_rate = self.rates.get(host, self.default)
+            self.endpoints[host] = Endpoint(host, rate * self.scale, max_rate * self.scale)
+        return self.endpoints[host]
+
+    def stats(self):
+        return {host: endpoint.stats() for host, endpoint in self.endpoints.items()}
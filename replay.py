@@ -0,0 +1,452 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from aiohttp import web
+from benchmark import start_stub
+from schema import SCANNER_COLUMNS, BOT_COLUMNS
+from fetcher import IndicatorFetcher, chunked
+from transport import AsyncTransport
+from universe import SymbolUniverse, TICKER_URL, EXCHANGE_INFO_URL
+from klines import BinanceKlineSource, PERIOD_MS
+from indicators import HISTORY
+
+# --- Configuration --- #
+FIXTURE_DIR = os.getenv('BENCH_FIXTURES', os.path.join(os.getcwd(), 'fixtures'))
+SIZES = (100, 300, 1000)
+TIMEFRAMES = {"5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400}
+CYCLES = 3           # Measured cycles per scenario, after one cold cycle that also loads the universe
+COMMAND_REPEAT = 100  # Calls per bot command; p99 needs about this many
+PORT = 8790
+TOKEN = "123456:replay"  # Any well-formed token; the Bot API is the local stub
+# Allowed growth over the baseline before a metric counts as a regression
+TOLERANCE = {"cycle_ms": 0.25, "cold_ms": 0.25, "requests": 0.05, "peak_rss_mb": 0.15, "p50_ms": 0.3, "p99_ms": 1.0}
+NOISE_MS = 2.0       # Timing differences below this are never reported
+VALIDATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'fixtures')
+VALIDATION_SYMBOLS = 30  # Symbols recorded for indicator validation
+PIVOT_DAYS = 62          # Daily candles that always cover the previous calendar month
+
+# Recorded columns cover both the scanner's and the bot's column sets
+RECORDED_COLUMNS = SCANNER_COLUMNS + [f for f in BOT_COLUMNS if f.key not in {c.key for c in SCANNER_COLUMNS}]
+
+# Fixture layout ({directory}/...):
+#   ticker_24hr.json    Binance futures ticker/24hr list
+#   exchange_info.json  Binance exchangeInfo, symbols only
+#   scan_{tf}.json      {"columns": [...], "data": [{"s": "BINANCE:XUSDT", "d": [...]}]} per timeframe
+
+
+def save(directory, name, data):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{name}.json"), "w") as f:
+        json.dump(data, f)
+
+
+def load(directory, name):
+    with open(os.path.join(directory, f"{name}.json")) as f:
+        return json.load(f)
+
+
+async def record(directory=FIXTURE_DIR, limit=max(SIZES)):
+    """Save live upstream responses for the `limit` most liquid symbols as fixtures"""
+    transport = AsyncTransport()
+    try:
+        tickers, exchange_info = await asyncio.gather(transport.get_json(TICKER_URL),
+                                                      transport.get_json(EXCHANGE_INFO_URL))
+        symbols = SymbolUniverse(transport).select(tickers, exchange_info)[:limit]
+        kept = set(symbols)
+        save(directory, "ticker_24hr", [item for item in tickers if item["symbol"] in kept])
+        save(directory, "exchange_info", {"symbols": [item for item in exchange_info["symbols"]
+                                                       if item["symbol"] in kept]})
+        fetcher = IndicatorFetcher(transport, columns=RECORDED_COLUMNS)
+        for timeframe in TIMEFRAMES:
+            chunks = await asyncio.gather(*[fetcher.fetch_chunk(chunk, timeframe)
+                                            for chunk in chunked(symbols, fetcher.chunk_size)])
+            save(directory, f"scan_{timeframe}", {"columns": fetcher.build_payload([], timeframe)["columns"],
+                                                  "data": [row for chunk in chunks for row in chunk]})
+    finally:
+        await transport.close()
+    print(f"{len(symbols)} sembolün yanıtları kaydedildi: {directory}")
+
+
+def kline_rows(records):
+    return [[int(row["open_time"]), *(float(row[name]) for name in ("open", "high", "low", "close", "volume"))]
+            for row in records]
+
+
+async def record_validation(path=None, timeframe="1h", limit=VALIDATION_SYMBOLS, now=None):
+    """Save Binance klines and TradingView values of the same candle as an indicators.py fixture
+
+    The scanner's unsuffixed values belong to the forming candle, so the klines run
+    up to that candle and are fetched again after the scanner answered; a symbol
+    is kept only if its candle did not move in between. TradingView is asked for
+    the perpetual (BINANCE:XUSDT.P), the market the klines come from.
+    """
+    path = path or os.path.join(VALIDATION_DIR, f"tradingview_{timeframe}.json")
+    transport = AsyncTransport()
+    try:
+        tickers, exchange_info = await asyncio.gather(transport.get_json(TICKER_URL),
+                                                      transport.get_json(EXCHANGE_INFO_URL))
+        symbols = SymbolUniverse(transport).select(tickers, exchange_info)[:limit]
+        source = BinanceKlineSource(transport)
+        period, day = PERIOD_MS[timeframe], PERIOD_MS["1d"]
+        now = int((now or time.time()) * 1000)
+        forming = now // period * period
+        daily = await asyncio.gather(*[source.klines(symbol, "1d", (now // day - PIVOT_DAYS) * day, now)
+                                       for symbol in symbols])
+        before = await asyncio.gather(*[source.klines(symbol, timeframe, forming - (HISTORY - 1) * period, now)
+                                        for symbol in symbols])
+        fetcher = IndicatorFetcher(transport, columns=SCANNER_COLUMNS)
+        rows = await fetcher.fetch_chunk([f"{symbol}.P" for symbol in symbols], timeframe)
+        after = await asyncio.gather(*[source.klines(symbol, timeframe, forming, now + period)
+                                       for symbol in symbols])
+    finally:
+        await transport.close()
+    keys = [field.key for field in SCANNER_COLUMNS]
+    values = {row["s"].split(":")[-1][:-len(".P")]: row["d"] for row in rows}
+    kept = {}
+    for symbol, candles, last, days in zip(symbols, before, after, daily):
+        if symbol not in values or len(candles) != HISTORY or candles[-1]["open_time"] != forming:
+            continue
+        # Open time and OHLC must not have moved while the scanner answered; volume always does
+        if len(last) != 1 or kline_rows(candles[-1:])[0][:5] != kline_rows(last)[0][:5]:
+            continue
+        kept[symbol] = {"klines": kline_rows(candles), "daily": kline_rows(days),
+                        "indicators": dict(zip(keys, values[symbol]))}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"timeframe": timeframe, "recorded_at": now, "source": "tradingview", "symbols": kept}, f)
+    print(f"{len(kept)}/{len(symbols)} sembolün mumları ve TradingView değerleri kaydedildi: {path}")
+
+
+def synthesize(directory=FIXTURE_DIR, rows=max(SIZES), seed=0):
+    """Deterministic fixtures in the recorded format, for running without a recording"""
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYM{i}USDT" for i in range(rows)]
+    save(directory, "ticker_24hr", [{"symbol": symbol, "quoteVolume": str(1e9 / (i + 1)),
+                                     "lastPrice": str(round(rng.uniform(0.01, 1000), 4))}
+                                    for i, symbol in enumerate(symbols)])
+    save(directory, "exchange_info", {"symbols": [{"symbol": symbol, "quoteAsset": "USDT", "status": "TRADING",
+                                                   "contractType": "PERPETUAL"} for symbol in symbols]})
+    fetcher = IndicatorFetcher(columns=RECORDED_COLUMNS)
+    for timeframe in TIMEFRAMES:
+        values = np.empty((rows, len(RECORDED_COLUMNS)))
+        for i, field in enumerate(RECORDED_COLUMNS):
+            if field.key.startswith("Rec."):
+                values[:, i] = rng.integers(-1, 2, rows)
+            elif field.key.startswith("Recommend."):
+                values[:, i] = rng.uniform(-1, 1, rows)
+            else:
+                values[:, i] = rng.uniform(0, 100, rows)
+        save(directory, f"scan_{timeframe}", {"columns": fetcher.build_payload([], timeframe)["columns"],
+                                              "data": [{"s": f"BINANCE:{symbol}", "d": row.tolist()}
+                                                       for symbol, row in zip(symbols, values)]})
+    print(f"{rows} sembollük sentetik fikstür yazıldı: {directory}")
+
+
+def ranked_symbols(directory):
+    tickers = load(directory, "ticker_24hr")
+    return [item["symbol"] for item in sorted(tickers, key=lambda item: -float(item.get("quoteVolume") or 0))]
+
+
+def replay_app(directory, latency=0.0, error_rate=0.0, seed=0):
+    """Stub for Binance, the TradingView scanner and the Telegram Bot API, answering from fixtures
+
+    /{size}/ticker/24hr serves the `size` most liquid symbols, so one server
+    covers every universe size. Upstream routes wait `latency` seconds and
+    fail with 503 at `error_rate`; Bot API calls are answered immediately.
+    """
+    tickers = sorted(load(directory, "ticker_24hr"), key=lambda item: -float(item.get("quoteVolume") or 0))
+    exchange_info = load(directory, "exchange_info")
+    columns = {}  # requested column name -> (ticker -> recorded row, position in that row)
+    for timeframe in TIMEFRAMES:
+        scan = load(directory, f"scan_{timeframe}")
+        rows = {item["s"]: item["d"] for item in scan["data"]}
+        for position, name in enumerate(scan["columns"]):
+            columns[name] = (rows, position)
+    rng = np.random.default_rng(seed)
+    message_ids = iter(range(1, 1 << 62))
+
+    async def upstream(answer):
+        await asyncio.sleep(latency)
+        if error_rate and rng.random() < error_rate:
+            return web.Response(status=503)
+        return web.json_response(answer())
+
+    async def ticker(request):
+        return await upstream(lambda: tickers[:int(request.match_info["size"])])
+
+    async def info(request):
+        return await upstream(lambda: exchange_info)
+
+    async def scan(request):
+        body = json.loads(await request.text())
+        sources = [columns.get(name, ({}, 0)) for name in body["columns"]]
+
+        def answer():
+            data = []
+            for symbol in body["symbols"]["tickers"]:
+                if symbol in sources[0][0]:
+                    data.append({"s": symbol, "d": [rows[symbol][i] if symbol in rows else None
+                                                    for rows, i in sources]})
+            return {"data": data, "totalCount": len(data)}
+        return await upstream(answer)
+
+    async def telegram(request):
+        form = await request.post()
+        if request.match_info["method"] in ("sendMessage", "editMessageText"):
+            chat_id = int(form.get("chat_id", 0))
+            return web.json_response({"ok": True, "result": {
+                "message_id": next(message_ids), "date": int(time.time()), "text": form.get("text", ""),
+                "chat": {"id": chat_id, "type": "private"}}})
+        return web.json_response({"ok": True, "result": True})
+
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_get("/{size}/ticker/24hr", ticker)
+    app.router.add_get("/{size}/exchangeInfo", info)
+    app.router.add_post("/scan", scan)
+    app.router.add_post("/bot{token}/{method}", telegram)
+    return app
+
+
+def scenario_env(port, size, work):
+    base = f"http://127.0.0.1:{port}"
+    return {
+        "BINANCE_TICKER_URL": f"{base}/{size}/ticker/24hr",
+        "BINANCE_EXCHANGE_INFO_URL": f"{base}/{size}/exchangeInfo",
+        "TV_SCAN_URL": f"{base}/scan",
+        "TELEGRAM_API_URL": base,
+        "TELEGRAM_BOT_TOKEN": TOKEN,
+        "SNAPSHOT_DIR": work,
+        "ARCHIVE_DIR": os.path.join(work, "archive"),
+        "METRICS_PORT": "0",
+        "HOT_LOOP_LOGGING": "0",
+        # The stub's latency stands in for upstream; bench_throttling covers the rate limiter itself
+        "UPSTREAM_RATE": "10000",
+        "UPSTREAM_MAX_RATE": "10000",
+    }
+
+
+@contextmanager
+def environment(values):
+    """Set environment variables for processes started inside the block"""
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def sent(transport):
+    return sum(endpoint.requests for endpoint in transport.limiters.endpoints.values())
+
+
+async def measure_cycles(scan, transport, cycles):
+    """Run all timeframes together `cycles + 1` times; the first, cold cycle is reported separately"""
+    timings, requests = [], []
+    for _ in range(cycles + 1):
+        before = sent(transport)
+        start = time.perf_counter()
+        await asyncio.gather(*[scan(timeframe) for timeframe in TIMEFRAMES])
+        timings.append((time.perf_counter() - start) * 1000)
+        requests.append(sent(transport) - before)
+    return {
+        "cold_ms": timings[0],
+        "cycle_ms": float(np.median(timings[1:])),
+        "requests": float(np.mean(requests[1:])),
+    }
+
+
+def run_updater(cycles):
+    """Scenario process: scanner.py's MultiIntervalUpdater publishing every timeframe"""
+    from scanner import MultiIntervalUpdater
+
+    async def run():
+        updater = MultiIntervalUpdater(TIMEFRAMES)
+        try:
+            return await measure_cycles(updater.fetch_data, updater.transport, cycles)
+        finally:
+            await updater.transport.close()
+
+    result = asyncio.run(run())
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_service(cycles, repeat, symbol):
+    """Scenario process: sonbot's scan pipeline publishing to the bus, then its handlers called directly"""
+    from aiogram import Bot, types
+    import sonbot
+
+    Bot.set_current(sonbot.bot)
+    user = {"id": 1, "is_bot": False, "first_name": "replay"}
+    chat = {"id": 1, "type": "private"}
+
+    def message(text):
+        return types.Message.to_object({"message_id": 1, "date": int(time.time()), "text": text,
+                                        "chat": chat, "from": user})
+
+    def callback(data):
+        return types.CallbackQuery.to_object({"id": "1", "chat_instance": "1", "data": data, "from": user,
+                                              "message": {"message_id": 1, "date": int(time.time()), "chat": chat}})
+
+    commands = {
+        "rsi": (sonbot.rsi_command, lambda: message("/rsi")),
+        "adx": (sonbot.adx_command, lambda: message("/adx")),
+        "sorgu": (sonbot.custom_query, lambda: message("/sorgu rsi < 40 and adx > 20")),
+        "sayfa": (sonbot.pagination_callback, lambda: callback("page_1")),
+        "seri": (sonbot.series_command, lambda: message(f"/seri {symbol}")),
+        "durum": (sonbot.status_command, lambda: message("/durum")),
+    }
+
+    async def run():
+        result = {}
+        try:
+            result["service"] = await measure_cycles(sonbot.updater.fetch_data, sonbot.transport, cycles)
+            for name, (handler, update) in commands.items():
+                samples = []
+                for _ in range(repeat):
+                    event = update()
+                    start = time.perf_counter()
+                    await handler(event)
+                    samples.append((time.perf_counter() - start) * 1000)
+                result[name] = {"p50_ms": float(np.percentile(samples, 50)),
+                                "p99_ms": float(np.percentile(samples, 99))}
+        finally:
+            await sonbot.transport.close()
+            await (await sonbot.bot.get_session()).close()
+        return result
+
+    result = asyncio.run(run())
+    result["service"]["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def in_process(env, func, *args):
+    """Run one scenario in a fresh process, so peak RSS and module state belong to it alone"""
+    with environment(env):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            return pool.submit(func, *args).result()
+
+
+def run_suite(directory=FIXTURE_DIR, sizes=SIZES, latency=0.05, error_rate=0.0, cycles=CYCLES,
+              repeat=COMMAND_REPEAT, port=PORT):
+    """Measure every scenario at every universe size; returns flat {"scenario/size/metric": value}"""
+    stub = start_stub(replay_app, port, directory=directory, latency=latency, error_rate=error_rate)
+    symbol = ranked_symbols(directory)[0]
+    results = {}
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as work:
+                env = scenario_env(port, size, work)
+                for metric, value in in_process(env, run_updater, cycles).items():
+                    results[f"updater/{size}/{metric}"] = value
+                service = in_process(env, run_service, cycles, repeat, symbol)
+                for metric, value in service.pop("service").items():
+                    results[f"service/{size}/{metric}"] = value
+                for command, stats in service.items():
+                    for metric, value in stats.items():
+                        results[f"command/{size}/{command}/{metric}"] = value
+    finally:
+        stub.terminate()
+    return results
+
+
+def report(results, settings):
+    print(f"Replay, gecikme {settings['latency'] * 1000:.0f} ms, hata %{settings['error_rate'] * 100:.0f}, "
+          f"{settings['cycles']} döngü")
+    print(f"  {'senaryo':<10}{'sembol':>8}{'döngü ms':>12}{'soğuk ms':>12}{'istek/döngü':>14}{'tepe RSS MB':>14}")
+    for scenario in ("updater", "service"):
+        for size in settings["sizes"]:
+            key = f"{scenario}/{size}"
+            print(f"  {scenario:<10}{size:>8}{results[key + '/cycle_ms']:>12.1f}{results[key + '/cold_ms']:>12.1f}"
+                  f"{results[key + '/requests']:>14.1f}{results[key + '/peak_rss_mb']:>14.1f}")
+    print(f"  {'komut':<10}{'sembol':>8}{'p50 ms':>12}{'p99 ms':>12}")
+    for size in settings["sizes"]:
+        for key in sorted(k for k in results if k.startswith(f"command/{size}/") and k.endswith("/p50_ms")):
+            command = key.split("/")[2]
+            print(f"  {command:<10}{size:>8}{results[key]:>12.2f}{results[key[:-6] + 'p99_ms']:>12.2f}")
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Metrics worse than the baseline by more than their tolerance: [(key, baseline, current)]"""
+    regressions = []
+    for key, value in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        metric = key.rsplit("/", 1)[-1]
+        if metric.endswith("_ms") and value - previous < NOISE_MS:
+            continue
+        if value > previous * (1 + tolerance.get(metric, 0.25)):
+            regressions.append((key, previous, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kayıtlı yanıtlarla çevrimdışı performans testi")
+    parser.add_argument("command", choices=["record", "record-tv", "synth", "run"])
+    parser.add_argument("--dir", default=FIXTURE_DIR, help="fikstür dizini")
+    parser.add_argument("--rows", type=int, default=max(SIZES), help="synth: sembol sayısı")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--latency", type=float, default=0.05, help="upstream gecikmesi (sn)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cycles", type=int, default=CYCLES)
+    parser.add_argument("--repeat", type=int, default=COMMAND_REPEAT)
+    parser.add_argument("--timeframe", default="1h", help="record-tv: doğrulanacak zaman aralığı")
+    parser.add_argument("--out", help="record-tv: fikstür dosyası (varsayılan tests/fixtures altında)")
+    parser.add_argument("--save", help="sonuçların yazılacağı JSON")
+    parser.add_argument("--baseline", help="karşılaştırılacak önceki sonuç JSON'u")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record(args.dir))
+        return 0
+    if args.command == "record-tv":
+        asyncio.run(record_validation(args.out, args.timeframe))
+        return 0
+    if args.command == "synth":
+        synthesize(args.dir, args.rows)
+        return 0
+
+    settings = {"sizes": [int(size) for size in args.sizes.split(",")], "latency": args.latency,
+                "error_rate": args.error_rate, "cycles": args.cycles, "repeat": args.repeat}
+    if not os.path.exists(os.path.join(args.dir, "ticker_24hr.json")):
+        # No recording: a fixed-seed synthetic set keeps runs comparable
+        synthesize(args.dir, max(settings["sizes"]))
+    results = run_suite(args.dir, settings["sizes"], args.latency, args.error_rate, args.cycles, args.repeat)
+    report(results, settings)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["settings"] != settings:
+            print("⚠️ Temel ölçüm farklı ayarlarla alınmış, karşılaştırma yanıltıcı olabilir")
+        regressions = compare(results, baseline["results"])
+        for key, previous, value in regressions:
+            print(f"❌ Gerileme {key}: {previous:.2f} -> {value:.2f}")
+        if regressions:
+            return 1
+        print("✅ Temel ölçüme göre gerileme yok")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
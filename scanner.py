@@ -1,78 +1,110 @@
-import asyncio
-from datetime import datetime
-import requests
-import pandas as pd
-import os
-from tradingview_ta import TA_Handler, Interval
-
-class MultiIntervalUpdater:
-    def __init__(self, intervals):
-        """
-        intervals: Çalışma aralıklarının listesi (saniye cinsinden).
-        """
-        self.intervals = intervals  # Çalışma aralıkları
-        self.current_directory = os.getcwd()  # Dosya konumunu alır
-
-    async def fetch_data(self, interval, interval_name):
-        """
-        Verileri çeker ve işleme alır.
-        interval: Çalışma aralığı
-        interval_name: TradingView interval adı (ör: INTERVAL_15_MINUTES)
-        """
-        while True:
-            now = datetime.now()
-            zaman = now.strftime("%d-%m-%y %H:%M:%S")
-            print(f"{interval_name} Güncelleme başladı: {zaman}")
-            url = "https://fapi.binance.com/fapi/v1/ticker/24hr"
-            try:
-                r = requests.get(url)
-                result = r.json()
-            except Exception as e:
-                print(f"{interval_name} Veri çekilirken hata oluştu: {e}")
-                await asyncio.sleep(interval)
-                continue
-            symbols = []
-            df = pd.DataFrame(result)
-            for i in df['symbol']:
-                symbols.append(i)
-            data = []
-            for i in symbols:
-                handler = TA_Handler(symbol=i, screener="crypto", exchange="BINANCE", interval=interval_name)
-                try:
-                    ta = handler.get_indicators()
-                    data.append({"symbol":i,"recommendother":ta['Recommend.Other'],"recommendall":ta['Recommend.All'],"recommendma":ta['Recommend.MA'],"rsi":ta['RSI'],"rsi[1]":ta['RSI[1]'],"stochk":ta['Stoch.K'],"stochd":ta['Stoch.D'],"stochk[1]":ta['Stoch.K[1]'],"stochd[1]":ta['Stoch.D[1]'],"cci20":ta['CCI20'],"cci20[1]":ta['CCI20[1]'],"adx":ta['ADX'],"adx+di":ta['ADX+DI'],"adx-di":ta['ADX-DI'],"adx+di[1]":ta['ADX+DI[1]'],"adx-di[1]":ta['ADX-DI[1]'],"ao":ta['AO'],"ao[1]":ta['AO[1]'],"mom":ta['Mom'],"mom[1]":ta['Mom[1]'],"macd":ta['MACD.macd'],"signal":ta['MACD.signal'],"recstochrsi":ta['Rec.Stoch.RSI'],"stochrsik":ta['Stoch.RSI.K'],"recwr":ta['Rec.WR'],"wr":ta['W.R'],"recbbpower":ta['Rec.BBPower'],"bbpower":ta['BBPower'],"recuo":ta['Rec.UO'],"uo":ta['UO'],"close":ta['close'],"ema5":ta['EMA5'],"sma5":ta['SMA5'],"ema10":ta['EMA10'],"sma10":ta['SMA10'],"ema20":ta['EMA20'],"sma20":ta['SMA20'],"ema30":ta['EMA30'],"sma30":ta['SMA30'],"ema50":ta['EMA50'],"sma50":ta['SMA50'],"ema100":ta['EMA100'],"sma100":ta['SMA100'],"ema200":ta['EMA200'],"sma200":ta['SMA200'],"recichimoku":ta['Rec.Ichimoku'],"ichimokubline":ta['Ichimoku.BLine'],"rec.vwma":ta['Rec.VWMA'],"vwma":ta['VWMA'],"rechullma9":ta['Rec.HullMA9'],"hullma9":ta['HullMA9'],"pivotmclassics3":ta['Pivot.M.Classic.S3'],"pivotmclassics2":ta['Pivot.M.Classic.S2'],"pivotmclassics1":ta['Pivot.M.Classic.S1'],"pivotmclassicmiddle":ta['Pivot.M.Classic.Middle'],"pivotmclassicr1":ta['Pivot.M.Classic.R1'],"pivotmclassicr2":ta['Pivot.M.Classic.R2'],"pivotmclassicr3":ta['Pivot.M.Classic.R3'],"pivotmfibonaccis3":ta['Pivot.M.Fibonacci.S3'],"pivotmfibonaccis2":ta['Pivot.M.Fibonacci.S2'],"pivotmfibonaccis1":ta['Pivot.M.Fibonacci.S1'],"pivotmfibonaccimiddle":ta['Pivot.M.Fibonacci.Middle'],"pivotmfibonaccir1":ta['Pivot.M.Fibonacci.R1'],"pivotmfibonaccir2":ta['Pivot.M.Fibonacci.R2'],"pivotmfibonaccir3":ta['Pivot.M.Fibonacci.R3'],"pivotmcamarillas3":ta['Pivot.M.Camarilla.S3'],"pivotmcamarillas2":ta['Pivot.M.Camarilla.S2'],"pivotmcamarillas1":ta['Pivot.M.Camarilla.S1'],"pivotmcamarillamiddle":ta['Pivot.M.Camarilla.Middle'],"pivotmcamarillar1":ta['Pivot.M.Camarilla.R1'],"pivotmcamarillar2":ta['Pivot.M.Camarilla.R2'],"pivotmcamarillar3":ta['Pivot.M.Camarilla.R3'],"pivotmwoodies3":ta['Pivot.M.Woodie.S3'],"pivotmwoodies2":ta['Pivot.M.Woodie.S2'],"pivotmwoodies1":ta['Pivot.M.Woodie.S1'],"pivotmwoodiemiddle":ta['Pivot.M.Woodie.Middle'],"pivotmwoodier1":ta['Pivot.M.Woodie.R1'],"pivotmwoodier2":ta['Pivot.M.Woodie.R2'],"pivotmwoodier3":ta['Pivot.M.Woodie.R3'],"pivotmdemarks1":ta['Pivot.M.Demark.S1'],"pivotmdemarkmiddle":ta['Pivot.M.Demark.Middle'],"pivotmdemarkr1":ta['Pivot.M.Demark.R1'],"open":ta['open'],"psar":ta['P.SAR'],   "bblower":ta['BB.lower'],"bbupper":ta['BB.upper'],"ao[2]":ta['AO[2]'],"volume":ta['volume'],"change":ta['change'],"low":ta['low'],"high":ta['high']})
-                    print(data)
-                except Exception as e:
-                    continue
-            df = pd.DataFrame.from_dict(data)
-            file_path = os.path.join(self.current_directory, f"indicators_{interval_name}.xlsx")
-            df.to_excel(file_path, index=False)
-            print(f"{interval_name} Güncelleme tamamlandı: {zaman}")
-            await asyncio.sleep(interval)
-
-    async def run(self):
-        """
-        Belirtilen tüm aralıklar için güncelleme görevlerini başlatır.
-        """
-        tasks = []
-        for interval_name, interval_seconds in self.intervals.items():
-            tasks.append(asyncio.create_task(self.fetch_data(interval_seconds, interval_name)))
-        await asyncio.gather(*tasks)
-
-# Örnek kullanım
-if __name__ == "__main__":
-    # Aralıklar ve süreler (saniye cinsinden)
-    intervals = {
-        Interval.INTERVAL_5_MINUTES: 5 * 60,
-        Interval.INTERVAL_15_MINUTES: 15 * 60,
-        Interval.INTERVAL_1_HOUR: 60 * 60,
-        Interval.INTERVAL_4_HOURS: 4 * 60 * 60,
-        Interval.INTERVAL_1_DAY: 24 * 60 * 60,
-    }
-
-    updater = MultiIntervalUpdater(intervals)
-
-    try:
-        asyncio.run(updater.run())
-    except KeyboardInterrupt:
-        print("Program durduruldu.")
+import os
+import asyncio
+from datetime import datetime
+from tradingview_ta import Interval
+from fetcher import IndicatorFetcher, KlineIndicatorFetcher, coverage_summary
+from sharded import ShardedFetcher
+from universe import SymbolUniverse
+from scheduler import CandleScheduler
+from transport import AsyncTransport
+import store
+import archive
+import metrics
+
+# --- Configuration --- #
+# Bu orandan az sembol gelen döngü yayınlanmaz, önceki snapshot geçerli kalır
+MIN_COVERAGE = float(os.getenv('MIN_COVERAGE', 0.5))
+
+
+class CoverageError(Exception):
+    """Döngü yayınlanamayacak kadar eksik veri getirdi"""
+
+
+class MultiIntervalUpdater:
+    def __init__(self, intervals, chunk_size=200, concurrency=8, excel_export=store.EXCEL_EXPORT, workers=1,
+                 source="tradingview", bus=None):
+        """
+        intervals: Çalışma aralıklarının listesi (saniye cinsinden).
+        chunk_size: Tek TradingView isteğinde sorgulanacak sembol sayısı.
+        concurrency: Aynı anda açık olabilecek en fazla HTTP isteği.
+        excel_export: True ise snapshot'ın yanına indicators_{interval}.xlsx de yazılır.
+        workers: 1'den büyükse semboller bu kadar işleme bölünüp paralel taranır.
+        source: "tradingview" (uzak tarayıcı) veya "local" (Binance mumlarından yerel hesaplama).
+        bus: store.SnapshotBus verilirse her snapshot aynı işlemdeki okuyuculara (bot) da yayınlanır.
+        """
+        self.intervals = intervals  # Çalışma aralıkları
+        self.current_directory = store.SNAPSHOT_DIR  # Snapshot dizini (varsayılan: çalışma dizini)
+        self.transport = AsyncTransport(concurrency=concurrency)  # Ortak HTTP oturumu
+        if source == "local":
+            # Göstergeler mumlardan hesaplanır, sonraki döngülerde yalnızca yeni mum eklenir
+            self.fetcher = KlineIndicatorFetcher(self.transport)
+        elif workers > 1:
+            # Her işlem kendi async döngüsüyle bir parçayı çeker, sonuçlar paylaşımlı bellekte birleşir
+            self.fetcher = ShardedFetcher(workers, chunk_size=chunk_size, concurrency=concurrency)
+        else:
+            self.fetcher = IndicatorFetcher(self.transport, chunk_size=chunk_size)  # Toplu gösterge çekici
+        self.universe = SymbolUniverse(self.transport)  # Tüm aralıkların paylaştığı sembol listesi
+        self.excel_export = excel_export
+        self.bus = bus
+        self.scheduler = CandleScheduler(intervals, self.fetch_data)  # Mum kapanışına hizalı zamanlayıcı
+
+    async def fetch_data(self, interval_name):
+        """
+        Tek bir tarama döngüsü: verileri çeker ve snapshot olarak yayınlar.
+        interval_name: TradingView interval adı (ör: INTERVAL_15_MINUTES)
+        """
+        now = datetime.now()
+        zaman = now.strftime("%d-%m-%y %H:%M:%S")
+        metrics.log(f"{interval_name} Güncelleme başladı: {zaman}")
+        symbols = await self.universe.symbols()  # Hata olursa zamanlayıcı döngüyü hatalı sayar
+        with metrics.span("fetch", timeframe=interval_name):
+            df = await self.fetcher.fetch(symbols, interval_name)
+        coverage = df.attrs['coverage']
+        if coverage['received'] == 0 or coverage['received'] < MIN_COVERAGE * coverage['requested']:
+            # Kesinti sırasında son sağlam snapshot ve sürümü korunur; zamanlayıcı döngüyü hatalı sayar
+            raise CoverageError(f"yetersiz kapsam, yayınlanmadı ({coverage_summary(coverage)})")
+        if self.bus is not None:
+            self.bus.publish(interval_name, df)  # Bot yeni sürümü diske yazılmasını beklemeden görür
+        # Arrow snapshot atomik olarak yazılır, Excel isteğe bağlı yan çıktıdır
+        with metrics.span("persist", timeframe=interval_name):
+            await store.publish(df, interval_name, excel=self.excel_export, directory=self.current_directory)
+        with metrics.span("archive", timeframe=interval_name):
+            await archive.record(df, interval_name)  # Her döngü gün bölümlü Parquet arşivine eklenir
+        # Eksik semboller ve nedenleri snapshot ile birlikte yayınlanır
+        metrics.log(f"{interval_name} Güncelleme tamamlandı: {zaman} ({coverage_summary(coverage)})")
+
+    async def run(self):
+        """
+        Her aralığı kendi mum kapanışında, tüm aralıklar eşzamanlı olacak şekilde çalıştırır.
+        """
+        # Aşama süreleri, döngü süreleri ve snapshot yaşı yerel /metrics ucunda yayınlanır
+        metrics.track_freshness(lambda: {interval: store.published_at(interval, self.current_directory)
+                                         for interval in self.intervals})
+        server = await metrics.serve()
+        try:
+            await self.scheduler.run()
+        finally:
+            if server is not None:
+                await server.cleanup()
+            await self.transport.close()
+            if isinstance(self.fetcher, ShardedFetcher):
+                self.fetcher.close()
+
+# Örnek kullanım
+if __name__ == "__main__":
+    # Aralıklar ve süreler (saniye cinsinden)
+    intervals = {
+        Interval.INTERVAL_5_MINUTES: 5 * 60,
+        Interval.INTERVAL_15_MINUTES: 15 * 60,
+        Interval.INTERVAL_1_HOUR: 60 * 60,
+        Interval.INTERVAL_4_HOURS: 4 * 60 * 60,
+        Interval.INTERVAL_1_DAY: 24 * 60 * 60,
+    }
+
+    updater = MultiIntervalUpdater(intervals, workers=int(os.getenv('SCAN_WORKERS', 1)),
+                                   source=os.getenv('INDICATOR_SOURCE', 'tradingview'))
+
+    try:
+        asyncio.run(updater.run())
+    except KeyboardInterrupt:
+        print("Program durduruldu.")
@@ -0,0 +1,100 @@
+import time
+import asyncio
+import metrics
+
+# Seconds to wait after a candle closes so TradingView has the closed bar
+SETTLE_DELAY = 5
+
+
+def next_close(now, period):
+    """Next candle close after `now`; closes are aligned to the UTC epoch like Binance candles"""
+    return (int(now // period) + 1) * period
+
+
+class CandleScheduler:
+    """Run job(timeframe) right after every candle close, all timeframes concurrently
+
+    trigger() runs an extra cycle on demand; it shares the per-timeframe slot
+    with scheduled cycles, so a timeframe never has two scans in flight.
+    """
+
+    def __init__(self, periods, job, settle_delay=SETTLE_DELAY):
+        """
+        periods: {timeframe: candle length in seconds}
+        job: coroutine function called with the timeframe name
+        """
+        self.periods = periods
+        self.job = job
+        self.settle_delay = settle_delay
+        self.running = False
+        self.current = {}  # timeframe -> (task of the latest cycle, started by the schedule)
+
+    async def run_cycle(self, timeframe, close_time):
+        started = time.perf_counter()
+        try:
+            await self.job(timeframe)
+        except Exception as e:
+            print(f"{timeframe} döngü hatası: {e}")
+            metrics.CYCLE_RESULTS.inc(timeframe=timeframe, result="error")
+            return
+        finally:
+            metrics.CYCLES.observe(time.perf_counter() - started, timeframe=timeframe)
+        metrics.CYCLE_RESULTS.inc(timeframe=timeframe, result="ok")
+        if close_time is None:
+            return  # On-demand cycle, not tied to a candle close
+        lag = time.time() - close_time
+        metrics.LAG.set(round(lag, 3), timeframe=timeframe)
+        metrics.log(f"{timeframe} mum kapanışından yayına gecikme: {lag:.1f} sn")
+
+    def is_running(self, timeframe):
+        entry = self.current.get(timeframe)
+        return entry is not None and not entry[0].done()
+
+    def start(self, timeframe, close_time, scheduled=True):
+        task = asyncio.create_task(self.run_cycle(timeframe, close_time))
+        self.current[timeframe] = (task, scheduled)
+        return task
+
+    def trigger(self, timeframe):
+        """Start an on-demand cycle, or join the one already running; returns its task
+
+        The task never raises: a failed cycle is logged and counted like a scheduled one.
+        """
+        if self.is_running(timeframe):
+            return self.current[timeframe][0]
+        return self.start(timeframe, None, scheduled=False)
+
+    def next_run(self, timeframe):
+        """Unix time the next scheduled cycle of the timeframe starts"""
+        return next_close(time.time(), self.periods[timeframe]) + self.settle_delay
+
+    async def run_timeframe(self, timeframe, period, immediate):
+        if immediate:
+            # Scan the last closed candle right away instead of waiting for the next boundary
+            self.start(timeframe, next_close(time.time(), period) - period)
+        while self.running:
+            close_time = next_close(time.time(), period)
+            await asyncio.sleep(max(0, close_time + self.settle_delay - time.time()))
+            if not self.running:
+                break
+            if self.is_running(timeframe):
+                task, scheduled = self.current[timeframe]
+                if scheduled:
+                    # The previous scan is still running: skip this boundary instead of stacking work
+                    metrics.SKIPPED.inc(timeframe=timeframe)
+                    print(f"{timeframe} önceki tarama sürüyor, döngü atlandı")
+                    continue
+                # An on-demand cycle predates the close; the closed candle still gets its own scan
+                await task
+            self.start(timeframe, close_time)
+        if timeframe in self.current:
+            await self.current[timeframe][0]
+
+    async def run(self, immediate=True):
+        """Start all timeframes; with immediate=True every timeframe is scanned once at startup"""
+        self.running = True
+        await asyncio.gather(*[self.run_timeframe(timeframe, period, immediate)
+                               for timeframe, period in self.periods.items()])
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,155 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# One indicator column: name in our tables, TradingView key, storage dtype
+Field = namedtuple("Field", ["name", "key", "dtype"])
+
+# Bounded oscillators and recommendations fit float32; prices, volumes and
+# price-scaled indicators stay float64 so sub-cent coins keep their precision
+F32 = np.float32
+F64 = np.float64
+
+# Columns in the order scanner.py writes them
+SCANNER_COLUMNS = [
+    Field("recommendother", "Recommend.Other", F32),
+    Field("recommendall", "Recommend.All", F32),
+    Field("recommendma", "Recommend.MA", F32),
+    Field("rsi", "RSI", F32),
+    Field("rsi[1]", "RSI[1]", F32),
+    Field("stochk", "Stoch.K", F32),
+    Field("stochd", "Stoch.D", F32),
+    Field("stochk[1]", "Stoch.K[1]", F32),
+    Field("stochd[1]", "Stoch.D[1]", F32),
+    Field("cci20", "CCI20", F32),
+    Field("cci20[1]", "CCI20[1]", F32),
+    Field("adx", "ADX", F32),
+    Field("adx+di", "ADX+DI", F32),
+    Field("adx-di", "ADX-DI", F32),
+    Field("adx+di[1]", "ADX+DI[1]", F32),
+    Field("adx-di[1]", "ADX-DI[1]", F32),
+    Field("ao", "AO", F64),
+    Field("ao[1]", "AO[1]", F64),
+    Field("mom", "Mom", F64),
+    Field("mom[1]", "Mom[1]", F64),
+    Field("macd", "MACD.macd", F64),
+    Field("signal", "MACD.signal", F64),
+    Field("recstochrsi", "Rec.Stoch.RSI", F32),
+    Field("stochrsik", "Stoch.RSI.K", F32),
+    Field("recwr", "Rec.WR", F32),
+    Field("wr", "W.R", F32),
+    Field("recbbpower", "Rec.BBPower", F32),
+    Field("bbpower", "BBPower", F64),
+    Field("recuo", "Rec.UO", F32),
+    Field("uo", "UO", F32),
+    Field("close", "close", F64),
+    Field("ema5", "EMA5", F64),
+    Field("sma5", "SMA5", F64),
+    Field("ema10", "EMA10", F64),
+    Field("sma10", "SMA10", F64),
+    Field("ema20", "EMA20", F64),
+    Field("sma20", "SMA20", F64),
+    Field("ema30", "EMA30", F64),
+    Field("sma30", "SMA30", F64),
+    Field("ema50", "EMA50", F64),
+    Field("sma50", "SMA50", F64),
+    Field("ema100", "EMA100", F64),
+    Field("sma100", "SMA100", F64),
+    Field("ema200", "EMA200", F64),
+    Field("sma200", "SMA200", F64),
+    Field("recichimoku", "Rec.Ichimoku", F32),
+    Field("ichimokubline", "Ichimoku.BLine", F64),
+    Field("rec.vwma", "Rec.VWMA", F32),
+    Field("vwma", "VWMA", F64),
+    Field("rechullma9", "Rec.HullMA9", F32),
+    Field("hullma9", "HullMA9", F64),
+    Field("pivotmclassics3", "Pivot.M.Classic.S3", F64),
+    Field("pivotmclassics2", "Pivot.M.Classic.S2", F64),
+    Field("pivotmclassics1", "Pivot.M.Classic.S1", F64),
+    Field("pivotmclassicmiddle", "Pivot.M.Classic.Middle", F64),
+    Field("pivotmclassicr1", "Pivot.M.Classic.R1", F64),
+    Field("pivotmclassicr2", "Pivot.M.Classic.R2", F64),
+    Field("pivotmclassicr3", "Pivot.M.Classic.R3", F64),
+    Field("pivotmfibonaccis3", "Pivot.M.Fibonacci.S3", F64),
+    Field("pivotmfibonaccis2", "Pivot.M.Fibonacci.S2", F64),
+    Field("pivotmfibonaccis1", "Pivot.M.Fibonacci.S1", F64),
+    Field("pivotmfibonaccimiddle", "Pivot.M.Fibonacci.Middle", F64),
+    Field("pivotmfibonaccir1", "Pivot.M.Fibonacci.R1", F64),
+    Field("pivotmfibonaccir2", "Pivot.M.Fibonacci.R2", F64),
+    Field("pivotmfibonaccir3", "Pivot.M.Fibonacci.R3", F64),
+    Field("pivotmcamarillas3", "Pivot.M.Camarilla.S3", F64),
+    Field("pivotmcamarillas2", "Pivot.M.Camarilla.S2", F64),
+    Field("pivotmcamarillas1", "Pivot.M.Camarilla.S1", F64),
+    Field("pivotmcamarillamiddle", "Pivot.M.Camarilla.Middle", F64),
+    Field("pivotmcamarillar1", "Pivot.M.Camarilla.R1", F64),
+    Field("pivotmcamarillar2", "Pivot.M.Camarilla.R2", F64),
+    Field("pivotmcamarillar3", "Pivot.M.Camarilla.R3", F64),
+    Field("pivotmwoodies3", "Pivot.M.Woodie.S3", F64),
+    Field("pivotmwoodies2", "Pivot.M.Woodie.S2", F64),
+    Field("pivotmwoodies1", "Pivot.M.Woodie.S1", F64),
+    Field("pivotmwoodiemiddle", "Pivot.M.Woodie.Middle", F64),
+    Field("pivotmwoodier1", "Pivot.M.Woodie.R1", F64),
+    Field("pivotmwoodier2", "Pivot.M.Woodie.R2", F64),
+    Field("pivotmwoodier3", "Pivot.M.Woodie.R3", F64),
+    Field("pivotmdemarks1", "Pivot.M.Demark.S1", F64),
+    Field("pivotmdemarkmiddle", "Pivot.M.Demark.Middle", F64),
+    Field("pivotmdemarkr1", "Pivot.M.Demark.R1", F64),
+    Field("open", "open", F64),
+    Field("psar", "P.SAR", F64),
+    Field("bblower", "BB.lower", F64),
+    Field("bbupper", "BB.upper", F64),
+    Field("ao[2]", "AO[2]", F64),
+    Field("volume", "volume", F64),
+    Field("change", "change", F32),
+    Field("low", "low", F64),
+    Field("high", "high", F64),
+]
+
+# Reduced column set of the former bot-side scan; its names stay queryable for old snapshots
+BOT_COLUMNS = [
+    Field("close", "close", F64),
+    Field("rsi", "RSI", F32),
+    Field("adx", "ADX", F32),
+    Field("volume", "volume", F64),
+    Field("ema20", "EMA20", F64),
+    Field("sma50", "SMA50", F64),
+    Field("macd", "MACD.macd", F64),
+    Field("stoch_k", "Stoch.K", F32),
+    Field("stoch_d", "Stoch.D", F32),
+]
+
+
+class ColumnBuffer:
+    """Preallocated NumPy columns for up to `capacity` rows; unfilled values stay NaN"""
+
+    def __init__(self, fields, capacity):
+        self.fields = fields
+        self.symbols = np.empty(capacity, dtype=object)
+        self.columns = [np.full(capacity, np.nan, dtype=field.dtype) for field in fields]
+
+    def fill(self, offset, symbols, values):
+        """Write a block of rows starting at `offset`; None or non-numeric values become NaN"""
+        end = offset + len(symbols)
+        self.symbols[offset:end] = symbols
+        try:
+            block = np.array(values, dtype=np.float64)  # None -> NaN
+        except (TypeError, ValueError):
+            block = np.array([[to_float(value) for value in row] for row in values], dtype=np.float64)
+        for column, j in zip(self.columns, range(block.shape[1])):
+            column[offset:end] = block[:, j]
+
+    def to_frame(self):
+        """DataFrame of the filled rows (symbol first); rows never filled are dropped"""
+        filled = self.symbols != None  # noqa: E711 - elementwise check on an object array
+        keep = slice(None) if filled.all() else filled
+        data = {"symbol": self.symbols[keep]}
+        for field, column in zip(self.fields, self.columns):
+            data[field.name] = column[keep]
+        return pd.DataFrame(data)
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
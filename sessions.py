@@ -0,0 +1,67 @@
+import os
+import time
+from collections import OrderedDict
+
+# --- Configuration --- #
+SESSION_TTL = int(os.getenv('SESSION_TTL', 30 * 60))  # Seconds a paging session survives without use
+MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', 1000))   # Active sessions kept before LRU eviction
+
+
+class SessionStore:
+    """Per-user paging sessions with a TTL and an LRU cap
+
+    Sessions hold a reference to the immutable snapshot and the matching row
+    indices; pages are rendered from those on demand.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()  # user_id -> (last_used, session dict)
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+
+    def expire(self, now=None):
+        """Drop sessions idle for longer than the TTL; oldest are at the front"""
+        now = now or time.monotonic()
+        while self.sessions:
+            user_id, (last_used, _) = next(iter(self.sessions.items()))
+            if now - last_used < self.ttl:
+                break
+            del self.sessions[user_id]
+            self.evicted_ttl += 1
+
+    def __contains__(self, user_id):
+        self.expire()
+        return user_id in self.sessions
+
+    def __getitem__(self, user_id):
+        self.expire()
+        _, session = self.sessions.pop(user_id)
+        self.sessions[user_id] = (time.monotonic(), session)
+        return session
+
+    def __setitem__(self, user_id, session):
+        self.sessions.pop(user_id, None)
+        self.sessions[user_id] = (time.monotonic(), session)
+        self.expire()
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.evicted_lru += 1
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def stats(self):
+        self.expire()
+        return {"active": len(self.sessions), "evicted_ttl": self.evicted_ttl, "evicted_lru": self.evicted_lru}
+
+
+def page_count(session, per_page):
+    return max(1, -(-len(session["rows"]) // per_page))
+
+
+def render_page(session, page, per_page, columns):
+    """Build the DataFrame slice for one page from the stored row indices"""
+    rows = session["rows"][page * per_page:(page + 1) * per_page]
+    return session["snapshot"].iloc[rows][columns]
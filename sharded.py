@@ -0,0 +1,150 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory, resource_tracker
+import pyarrow as pa
+from fetcher import IndicatorFetcher, CHUNK_SIZE, SCAN_URL, merge_coverage, coverage_report, error_reason
+from schema import SCANNER_COLUMNS
+from transport import AsyncTransport
+from ratelimit import Limiters
+import store
+import metrics
+
+# --- Configuration --- #
+WORKERS = int(os.getenv('SCAN_WORKERS', os.cpu_count() or 1))
+
+
+def split(items, parts):
+    """Split items into `parts` contiguous shards of near-equal size"""
+    size, extra = divmod(len(items), parts)
+    shards, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(items[start:end])
+        start = end
+    return [shard for shard in shards if shard]
+
+
+# Per-process state of a pool worker, set up once by init_worker
+worker_loop = None
+worker_transport = None
+
+
+def init_worker(concurrency, rate_scale):
+    """Pool initializer: one event loop and HTTP session for the life of the worker process
+
+    The limiter state (AIMD rate, Retry-After pauses, circuit breaker) then
+    carries over between cycles and timeframes instead of starting fresh on
+    every call, and the process never exceeds its share of the host budget.
+    """
+    global worker_loop, worker_transport
+    worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(worker_loop)
+    # Each worker gets its share of the per-endpoint request rate
+    worker_transport = AsyncTransport(concurrency=concurrency, limiters=Limiters(scale=rate_scale))
+
+
+def fetch_shard(symbols, interval, columns, chunk_size, url):
+    """Worker entry point: fetch one shard on the worker's event loop and HTTP session
+
+    The result is written as an Arrow IPC stream into a shared memory block;
+    only its name and size travel back to the coordinator.
+    """
+    fetcher = IndicatorFetcher(worker_transport, columns=columns, chunk_size=chunk_size, url=url)
+    df = worker_loop.run_until_complete(fetcher.fetch(symbols, interval))
+    table = store.to_table(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    payload = sink.getvalue()
+    block = shared_memory.SharedMemory(create=True, size=max(payload.size, 1))
+    block.buf[:payload.size] = payload.to_pybytes()
+    name = block.name
+    # Ownership moves to the coordinator, which unlinks the block after reading it
+    resource_tracker.unregister(block._name, "shared_memory")
+    block.close()
+    return name, payload.size
+
+
+def read_shard(name, size):
+    """Copy a worker's Arrow table out of shared memory and release the block"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        # One memcpy out of the block; no views may outlive close()
+        payload = bytes(block.buf[:size])
+    finally:
+        block.close()
+        block.unlink()
+    with pa.ipc.open_stream(pa.py_buffer(payload)) as reader:
+        return reader.read_all()
+
+
+class ShardedFetcher:
+    """Split the symbol universe across a process pool and merge the shards into one snapshot"""
+
+    def __init__(self, workers=WORKERS, columns=SCANNER_COLUMNS, chunk_size=CHUNK_SIZE,
+                 concurrency=8, url=SCAN_URL):
+        self.workers = workers
+        self.columns = columns
+        self.chunk_size = chunk_size
+        # The HTTP budget is shared between workers, not multiplied by them
+        self.concurrency = max(1, concurrency // workers)
+        self.url = url
+        self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            # spawn: workers must not inherit the coordinator's running event loop
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=init_worker,
+                                            initargs=(self.concurrency, 1 / self.workers))
+        return self.pool
+
+    async def fetch(self, symbols, interval):
+        """Fetch every shard in the pool; a failed shard is recorded in the coverage like a failed chunk"""
+        loop = asyncio.get_running_loop()
+
+        async def run(shard):
+            args = (fetch_shard, shard, interval, self.columns, self.chunk_size, self.url)
+            try:
+                future = loop.run_in_executor(self.get_pool(), *args)
+            except BrokenProcessPool:
+                # The pool broke while idle (a worker was killed between cycles); replace it
+                self.close(wait=False)
+                future = loop.run_in_executor(self.get_pool(), *args)
+            return await future
+
+        shards = split(list(symbols), self.workers)
+        results = await asyncio.gather(*[run(shard) for shard in shards], return_exceptions=True)
+        tables, errors = [], []
+        # Every shard that finished left a block in /dev/shm that only we can unlink, so all are read
+        for shard, result in zip(shards, results):
+            if not isinstance(result, BaseException):
+                try:
+                    tables.append(read_shard(*result))
+                    continue
+                except Exception as e:
+                    result = e
+            errors.append((shard, result))
+        reports = [store.coverage_of(table) for table in tables]
+        for shard, error in errors:
+            metrics.log(f"{interval} {len(shard)} sembollük parça alınamadı: {error_reason(error)}")
+            reports.append(coverage_report(shard, [], dict.fromkeys(shard, error_reason(error))))
+        if any(isinstance(error, BrokenProcessPool) for _, error in errors):
+            # A worker died and the executor refuses new work; start a fresh pool next cycle
+            self.close(wait=False)
+        if not tables:
+            raise errors[0][1]
+        coverage = merge_coverage(reports)
+        # Empty shards carry untyped columns, leave them out of the merge
+        tables = [table.replace_schema_metadata(None) for table in tables if table.num_rows] or tables[:1]
+        df = pa.concat_tables(tables).to_pandas()
+        df.attrs["coverage"] = coverage
+        return df
+
+    def close(self, wait=True):
+        if self.pool is not None:
+            self.pool.shutdown(wait=wait)
+            self.pool = None
@@ -0,0 +1,89 @@
+import numpy as np
+
+# Numeric columns kept as sorted arrays for threshold range lookups (/sorgu `col <op> const`)
+INDEXED_COLUMNS = [
+    "rsi", "adx", "cci20", "stochk", "stochd", "macd", "mom", "ao", "wr", "uo", "change", "volume",
+]
+
+# Built-in screens: name -> (required columns, function(columns) -> boolean mask)
+SCREENS = {}
+
+
+def screen(name, columns):
+    """Register a built-in screen; it is indexed for every snapshot that has the columns"""
+    def register(fn):
+        SCREENS[name] = (columns, fn)
+        return fn
+    return register
+
+
+@screen("rsi_oversold", ["rsi"])
+def rsi_oversold(col):
+    return col("rsi") <= 30
+
+
+@screen("rsi_overbought", ["rsi"])
+def rsi_overbought(col):
+    return col("rsi") >= 70
+
+
+@screen("adx_strong", ["adx"])
+def adx_strong(col):
+    return col("adx") > 45
+
+
+@screen("stoch_cross_up", ["stochk", "stochd", "stochk[1]", "stochd[1]"])
+def stoch_cross_up(col):
+    return (col("stochk[1]") <= col("stochd[1]")) & (col("stochk") > col("stochd"))
+
+
+@screen("stoch_cross_down", ["stochk", "stochd", "stochk[1]", "stochd[1]"])
+def stoch_cross_down(col):
+    return (col("stochk[1]") >= col("stochd[1]")) & (col("stochk") < col("stochd"))
+
+
+@screen("macd_above_signal", ["macd", "signal"])
+def macd_above_signal(col):
+    return col("macd") > col("signal")
+
+
+@screen("macd_below_signal", ["macd", "signal"])
+def macd_below_signal(col):
+    return col("macd") < col("signal")
+
+
+class SignalIndex:
+    """Sorted column arrays and precomputed screen membership for one immutable snapshot"""
+
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        arrays = {}
+
+        def col(name):
+            if name not in arrays:
+                arrays[name] = df[name].to_numpy(dtype=float, na_value=np.nan)
+            return arrays[name]
+
+        self.sorted = {}  # column -> (sorted values without NaN, row positions in that order)
+        for name in columns:
+            if name in df.columns:
+                values = col(name)
+                order = np.argsort(values, kind="stable")  # NaN sorts last
+                valid = int(np.count_nonzero(~np.isnan(values)))
+                self.sorted[name] = (values[order][:valid], order[:valid])
+
+        self.buckets = {}  # screen name -> row positions in snapshot order
+        with np.errstate(invalid="ignore"):
+            for name, (required, fn) in SCREENS.items():
+                if all(column in df.columns for column in required):
+                    self.buckets[name] = np.flatnonzero(fn(col))
+
+    def bucket(self, name):
+        """Row positions matching a built-in screen, or None if the snapshot lacks its columns"""
+        return self.buckets.get(name)
+
+    def range(self, column, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        """Row positions (snapshot order) with low <= column <= high, found by binary search"""
+        values, order = self.sorted[column]
+        start = 0 if low is None else np.searchsorted(values, low, side="left" if low_inclusive else "right")
+        end = len(values) if high is None else np.searchsorted(values, high, side="right" if high_inclusive else "left")
+        return np.sort(order[start:end])
@@ -1,416 +1,566 @@
-import os
-import asyncio
-import pandas as pd
-import requests
-from datetime import datetime
-from tradingview_ta import TA_Handler, Interval
-from aiogram import Bot, Dispatcher, executor, types
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
-from aiogram.utils.exceptions import MessageNotModified
-
-# --- Configuration --- #
-TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
-ITEMS_PER_PAGE = 10
-TIMEFRAME_MAP = {
-    "5m": Interval.INTERVAL_5_MINUTES,
-    "15m": Interval.INTERVAL_15_MINUTES,
-    "1h": Interval.INTERVAL_1_HOUR,
-    "4h": Interval.INTERVAL_4_HOURS,
-    "1d": Interval.INTERVAL_1_DAY
-}
-DEFAULT_TIMEFRAME = "15m"
-
-# Initialize bot and dispatcher
-bot = Bot(token=TOKEN)
-dp = Dispatcher(bot)
-user_data = {}
-current_timeframes = {}  # Store user's selected timeframes
-
-# --- Helper Functions --- #
-def get_file_path(timeframe):
-    """Get full path to data file for specific timeframe"""
-    return os.path.join(os.getcwd(), f"indicators_{timeframe}.xlsx")
-
-def create_timeframe_keyboard():
-    """Create keyboard for timeframe selection"""
-    keyboard = InlineKeyboardMarkup(row_width=3)
-    buttons = [
-        InlineKeyboardButton("5 Dakika", callback_data="tf_5m"),
-        InlineKeyboardButton("15 Dakika", callback_data="tf_15m"),
-        InlineKeyboardButton("1 Saat", callback_data="tf_1h"),
-        InlineKeyboardButton("4 Saat", callback_data="tf_4h"),
-        InlineKeyboardButton("1 Gün", callback_data="tf_1d")
-    ]
-    keyboard.add(*buttons)
-    return keyboard
-
-def create_pagination_keyboard(current_page, total_pages):
-    """Create navigation buttons for pagination"""
-    keyboard = InlineKeyboardMarkup(row_width=3)
-    buttons = []
-    if current_page > 0:
-        buttons.append(InlineKeyboardButton("⬅️ Önceki", callback_data=f"page_{current_page-1}"))
-    
-    buttons.append(InlineKeyboardButton(f"{current_page+1}/{total_pages}", callback_data="current"))
-    
-    if current_page < total_pages - 1:
-        buttons.append(InlineKeyboardButton("Sonraki ➡️", callback_data=f"page_{current_page+1}"))
-    
-    keyboard.add(*buttons)
-    return keyboard
-
-async def update_data_for_timeframe(timeframe, message):
-    """Update data for specific timeframe"""
-    interval = TIMEFRAME_MAP[timeframe]
-    start_time = datetime.now()
-    msg = await message.answer(f"🔄 *{timeframe} verileri güncelleniyor...*", parse_mode="Markdown")
-    
-    try:
-        # Fetch symbol data from Binance
-        url = "https://fapi.binance.com/fapi/v1/ticker/24hr"
-        response = requests.get(url)
-        response.raise_for_status()
-        symbols = [item['symbol'] for item in response.json()]
-        
-        # Collect technical indicators
-        indicators = []
-        for symbol in symbols[:100]:  # Limit to 100 for performance
-            handler = TA_Handler(
-                symbol=symbol,
-                screener="crypto",
-                exchange="BINANCE",
-                interval=interval
-            )
-            
-            try:
-                ta_data = handler.get_indicators()
-                indicators.append({
-                    "symbol": symbol,
-                    "timeframe": timeframe,
-                    "close": ta_data['close'],
-                    "rsi": ta_data['RSI'],
-                    "adx": ta_data['ADX'],
-                    "volume": ta_data['volume'],
-                    "ema20": ta_data.get('EMA20', None),
-                    "sma50": ta_data.get('SMA50', None),
-                    "macd": ta_data.get('MACD.macd', None),
-                    "stoch_k": ta_data.get('Stoch.K', None),
-                    "stoch_d": ta_data.get('Stoch.D', None)
-                })
-            except Exception as e:
-                continue
-        
-        # Save to Excel
-        df = pd.DataFrame(indicators)
-        df.to_excel(get_file_path(timeframe), index=False)
-        
-        duration = (datetime.now() - start_time).total_seconds()
-        await msg.edit_text(
-            f"✅ *{timeframe} verileri güncellendi!*\n\n"
-            f"• Toplam kayıt: {len(df)}\n"
-            f"• Süre: {duration:.2f} saniye",
-            parse_mode="Markdown"
-        )
-        return df
-        
-    except Exception as e:
-        await msg.edit_text(f"❌ *{timeframe} güncelleme hatası:* {str(e)}", parse_mode="Markdown")
-        return None
-
-# --- Command Handlers --- #
-@dp.message_handler(commands=['start', 'help'])
-async def send_welcome(message: types.Message):
-    """Send welcome message with timeframe selection"""
-    welcome_text = (
-        "📈 **Çoklu Zaman Aralıklı Kripto Analiz Botu**\n\n"
-        "Önce analiz yapmak istediğiniz zaman aralığını seçin:\n\n"
-        "• 5m - Kısa vadeli işlemler\n"
-        "• 15m - Orta vadeli işlemler (Varsayılan)\n"
-        "• 1h - Uzun vadeli işlemler\n"
-        "• 4h/1d - Stratejik analiz"
-    )
-    
-    keyboard = create_timeframe_keyboard()
-    await message.answer(welcome_text, parse_mode="Markdown", reply_markup=keyboard)
-
-@dp.message_handler(commands=['guncelle'])
-async def update_data(message: types.Message):
-    """Update data for selected timeframe"""
-    user_id = message.from_user.id
-    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
-    await update_data_for_timeframe(timeframe, message)
-
-@dp.message_handler(commands=['sorgu'])
-async def custom_query(message: types.Message):
-    """Handle custom data queries"""
-    user_id = message.from_user.id
-    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
-    query = message.get_args()
-    
-    if not query:
-        await message.reply(
-            f"❌ Lütfen bir sorgu koşulu girin.\nÖrnek: `/sorgu rsi < 30`\n\n"
-            f"Şu anki zaman aralığı: **{timeframe}**",
-            parse_mode="Markdown"
-        )
-        return
-    
-    try:
-        # Load and process data
-        file_path = get_file_path(timeframe)
-        if not os.path.exists(file_path):
-            await message.reply(f"❌ {timeframe} verileri bulunamadı. Önce /guncelle komutuyla verileri güncelleyin.")
-            return
-            
-        df = pd.read_excel(file_path)
-        result = df.query(query.lower())
-        
-        if result.empty:
-            await message.reply(f"🔍 {timeframe} zaman aralığında koşullara uygun veri bulunamadı.")
-            return
-        
-        # Prepare pagination
-        pages = [result[i:i+ITEMS_PER_PAGE] for i in range(0, len(result), ITEMS_PER_PAGE)]
-        user_data[user_id] = {
-            "pages": pages,
-            "current_page": 0,
-            "query": query,
-            "timeframe": timeframe,
-            "message_id": message.message_id
-        }
-        
-        # Show first page
-        await show_query_page(user_id, message.chat.id)
-        
-    except Exception as e:
-        await message.reply(
-            f"❌ Sorgu hatası: {str(e)}\n\n"
-            f"Örnek kullanım: `/sorgu rsi > 70`\n"
-            f"Zaman aralığı: **{timeframe}**",
-            parse_mode="Markdown"
-        )
-
-async def show_query_page(user_id, chat_id):
-    """Show paginated query results"""
-    if user_id not in user_data:
-        await bot.send_message(chat_id, "❌ Oturum sona erdi. Lütfen yeni sorgu yapın.")
-        return
-        
-    data = user_data[user_id]
-    page = data["pages"][data["current_page"]]
-    total_pages = len(data["pages"])
-    
-    # Format table
-    table = page[["symbol", "close", "rsi", "adx"]].to_markdown(index=False)
-    text = (
-        f"🔍 **Sorgu Sonuçları**\n"
-        f"• Zaman Aralığı: **{data['timeframe']}**\n"
-        f"• Koşul: `{data['query']}`\n"
-        f"• Sayfa: {data['current_page']+1}/{total_pages}\n\n"
-        f"```\n{table}\n```"
-    )
-    
-    # Create keyboard
-    keyboard = create_pagination_keyboard(data["current_page"], total_pages)
-    
-    # Edit or send message
-    if "response_id" in data:
-        try:
-            await bot.edit_message_text(
-                text, 
-                chat_id, 
-                data["response_id"], 
-                parse_mode="Markdown",
-                reply_markup=keyboard
-            )
-        except MessageNotModified:
-            pass
-    else:
-        msg = await bot.send_message(chat_id, text, parse_mode="Markdown", reply_markup=keyboard)
-        user_data[user_id]["response_id"] = msg.message_id
-
-@dp.callback_query_handler(lambda c: c.data.startswith("page_"))
-async def pagination_callback(callback: CallbackQuery):
-    """Handle pagination navigation"""
-    user_id = callback.from_user.id
-    if user_id not in user_data:
-        await callback.answer("Oturum sona erdi. Lütfen yeni sorgu yapın.")
-        return
-    
-    # Update current page
-    new_page = int(callback.data.split("_")[1])
-    user_data[user_id]["current_page"] = new_page
-    
-    # Update display
-    await show_query_page(user_id, callback.message.chat.id)
-    await callback.answer()
-
-@dp.message_handler(commands=['rsi'])
-async def rsi_command(message: types.Message):
-    """Show RSI signals"""
-    user_id = message.from_user.id
-    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
-    
-    try:
-        # Load data
-        file_path = get_file_path(timeframe)
-        if not os.path.exists(file_path):
-            await message.reply(f"❌ {timeframe} verileri bulunamadı. Önce /guncelle komutuyla verileri güncelleyin.")
-            return
-            
-        df = pd.read_excel(file_path)
-        
-        # Get RSI signals
-        oversold = df[df['rsi'] <= 30][['symbol', 'rsi', 'close']]
-        overbought = df[df['rsi'] >= 70][['symbol', 'rsi', 'close']]
-        
-        # Format response
-        response_text = f"📊 **{timeframe} RSI Sinyalleri**\n\n"
-        
-        if not oversold.empty:
-            response_text += "⬇️ *Aşırı Satım (RSI ≤ 30)*\n"
-            response_text += oversold.to_markdown(index=False) + "\n\n"
-        else:
-            response_text += "⚠️ Aşırı satım sinyali bulunamadı\n\n"
-        
-        if not overbought.empty:
-            response_text += "⬆️ *Aşırı Alım (RSI ≥ 70)*\n"
-            response_text += overbought.to_markdown(index=False)
-        else:
-            response_text += "⚠️ Aşırı alım sinyali bulunamadı"
-        
-        await message.reply(f"```{response_text}```", parse_mode="Markdown")
-        
-    except Exception as e:
-        await message.reply(f"❌ RSI sorgu hatası: {str(e)}")
-
-@dp.message_handler(commands=['adx'])
-async def adx_command(message: types.Message):
-    """Show ADX signals"""
-    user_id = message.from_user.id
-    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
-    
-    try:
-        # Load data
-        file_path = get_file_path(timeframe)
-        if not os.path.exists(file_path):
-            await message.reply(f"❌ {timeframe} verileri bulunamadı. Önce /guncelle komutuyla verileri güncelleyin.")
-            return
-            
-        df = pd.read_excel(file_path)
-        strong_trend = df[df['adx'] > 45][['symbol', 'adx', 'close']]
-        
-        # Format response
-        if not strong_trend.empty:
-            table = strong_trend.to_markdown(index=False)
-            text = (
-                f"📈 **{timeframe} Güçlü Trend Sinyalleri (ADX > 45)**\n\n"
-                f"```\n{table}\n```"
-            )
-            await message.reply(text, parse_mode="Markdown")
-        else:
-            await message.reply(f"⚠️ {timeframe} zaman aralığında ADX > 45 koşulunu sağlayan veri bulunamadı.")
-            
-    except Exception as e:
-        await message.reply(f"❌ ADX sorgu hatası: {str(e)}")
-
-@dp.message_handler(commands=['zaman'])
-async def show_timeframe_menu(message: types.Message):
-    """Show timeframe selection menu"""
-    user_id = message.from_user.id
-    current_tf = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
-    
-    text = (
-        f"⏱️ **Mevcut Zaman Aralığı: {current_tf}**\n\n"
-        "Analiz için kullanılacak zaman aralığını seçin:"
-    )
-    
-    keyboard = create_timeframe_keyboard()
-    await message.answer(text, parse_mode="Markdown", reply_markup=keyboard)
-
-# --- Callback Handlers --- #
-@dp.callback_query_handler(lambda c: c.data.startswith("tf_"))
-async def handle_timeframe_selection(callback: CallbackQuery):
-    """Handle timeframe selection"""
-    user_id = callback.from_user.id
-    timeframe = callback.data.split("_")[1]
-    
-    if timeframe not in TIMEFRAME_MAP:
-        await callback.answer("Geçersiz zaman aralığı seçildi")
-        return
-    
-    # Save user's timeframe preference
-    current_timeframes[user_id] = timeframe
-    await callback.answer(f"Zaman aralığı {timeframe} olarak ayarlandı")
-    
-    # Edit message to show selection
-    await bot.edit_message_text(
-        f"✅ **Zaman Aralığı Ayarlandı**\n\n"
-        f"Artık tüm analizleriniz **{timeframe}** zaman aralığında yapılacaktır.\n\n"
-        "Komutları kullanmaya başlayabilirsiniz:\n"
-        "• /rsi - RSI sinyalleri\n"
-        "• /adx - ADX trend sinyalleri\n"
-        "• /sorgu - Özel sorgu\n"
-        "• /guncelle - Verileri yenile",
-        callback.message.chat.id,
-        callback.message.message_id,
-        parse_mode="Markdown"
-    )
-
-# --- Scanner Module --- #
-class MultiTimeframeScanner:
-    def __init__(self):
-        self.intervals = {
-            "5m": 300,    # 5 minutes in seconds
-            "15m": 900,   # 15 minutes
-            "1h": 3600,   # 1 hour
-            "4h": 14400,  # 4 hours
-            "1d": 86400   # 1 day
-        }
-        self.is_running = False
-        
-    async def run(self):
-        """Run the scanner for all timeframes"""
-        self.is_running = True
-        while self.is_running:
-            try:
-                for timeframe, interval in self.intervals.items():
-                    start_time = datetime.now()
-                    print(f"{timeframe} veri güncellemesi başladı: {start_time}")
-                    
-                    # Create dummy message for update function
-                    class DummyMessage:
-                        def __init__(self, chat_id):
-                            self.chat_id = chat_id
-                            
-                        async def answer(self, text, parse_mode=None):
-                            print(text)
-                            
-                    dummy_msg = DummyMessage(0)
-                    await update_data_for_timeframe(timeframe, dummy_msg)
-                    
-                    # Wait for the next interval
-                    await asyncio.sleep(interval)
-                    
-            except Exception as e:
-                print(f"Scanner hatası: {str(e)}")
-                await asyncio.sleep(60)  # Wait before retrying
-
-    def stop(self):
-        """Stop the scanner"""
-        self.is_running = False
-
-# --- Main Execution --- #
-if __name__ == '__main__':
-    # Start the scanner in the background
-    scanner = MultiTimeframeScanner()
-    loop = asyncio.get_event_loop()
-    scanner_task = loop.create_task(scanner.run())
-    
-    try:
-        # Start the bot
-        executor.start_polling(dp, skip_updates=True)
-    except KeyboardInterrupt:
-        # Stop scanner when bot is stopped
-        scanner.stop()
-        scanner_task.cancel()
+import os
+import re
+import time
+import asyncio
+from datetime import datetime
+from tradingview_ta import Interval
+from aiogram import Bot, Dispatcher, executor, types
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
+from aiogram.utils.exceptions import MessageNotModified, RetryAfter, BotBlocked
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.bot.api import TelegramAPIServer
+from fetcher import coverage_summary
+from scanner import MultiIntervalUpdater
+from query import compile_query
+from sessions import SessionStore, page_count, render_page
+from alerts import AlertDispatcher, SCREEN_LABELS
+import store
+import archive
+import metrics
+
+# --- Configuration --- #
+TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')  # Self-hosted Bot API server (or a local stub), empty for api.telegram.org
+ITEMS_PER_PAGE = 10
+TIMEFRAME_MAP = {
+    "5m": Interval.INTERVAL_5_MINUTES,
+    "15m": Interval.INTERVAL_15_MINUTES,
+    "1h": Interval.INTERVAL_1_HOUR,
+    "4h": Interval.INTERVAL_4_HOURS,
+    "1d": Interval.INTERVAL_1_DAY
+}
+# Candle length per timeframe; the names double as interval names ("5m" == Interval.INTERVAL_5_MINUTES)
+TIMEFRAME_PERIODS = {"5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400}
+DEFAULT_TIMEFRAME = "15m"
+QUERY_COLUMNS = ["symbol", "close", "rsi", "adx"]  # Columns shown for /sorgu results
+AT_RE = re.compile(r"^\s*at=(\S+)\s*")             # /sorgu at=<time> <condition>
+SERIES_COLUMNS = ["close", "rsi", "adx"]
+SERIES_DAYS = 7   # /seri looks back this many days
+SERIES_ROWS = 20  # and shows the most recent cycles
+REFRESH_MIN_AGE = 30   # /guncelle does not rescan a snapshot younger than this (seconds)
+REFRESH_WAIT = 60      # and waits for the scheduled cycle instead when it starts within this
+REFRESH_TIMEOUT = 300  # Longest wait for a cycle to publish
+STALE_AFTER = 2        # Candle periods after which reading a snapshot starts a refresh in the background
+
+# Initialize bot and dispatcher
+bot = Bot(token=TOKEN, server=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else Bot(token=TOKEN)
+dp = Dispatcher(bot)
+user_data = SessionStore()  # Paging sessions with TTL and LRU eviction
+current_timeframes = {}  # Store user's selected timeframes
+alerts = AlertDispatcher(lambda chat_id, text: send_alert(chat_id, text))
+# Versioned latest snapshot per timeframe, published in-process by the scan pipeline; new versions are diffed for alerts
+snapshots = store.SnapshotBus(on_publish=alerts.on_snapshot)
+# The one scan pipeline: full universe and columns, published to the bus, the snapshot files and the archive
+updater = MultiIntervalUpdater(TIMEFRAME_PERIODS, workers=int(os.getenv('SCAN_WORKERS', 1)),
+                               source=os.getenv('INDICATOR_SOURCE', 'tradingview'), bus=snapshots)
+transport = updater.transport  # Shared keep-alive session for Binance and TradingView
+revalidated = {}  # timeframe -> last background refresh started for a stale read
+
+class CommandTimer(BaseMiddleware):
+    """Record how long every handled command and button press takes"""
+
+    async def on_process_message(self, message, data):
+        data["started"] = time.perf_counter()
+
+    async def on_post_process_message(self, message, results, data):
+        if "started" in data:
+            command = message.get_command(pure=True) or "mesaj"
+            metrics.COMMANDS.observe(time.perf_counter() - data["started"], command=command)
+
+    async def on_process_callback_query(self, callback, data):
+        data["started"] = time.perf_counter()
+
+    async def on_post_process_callback_query(self, callback, results, data):
+        if "started" in data:
+            # Buttons are labelled by their prefix (page_3 -> page) to keep the label set small
+            command = (callback.data or "").split("_", 1)[0] or "buton"
+            metrics.COMMANDS.observe(time.perf_counter() - data["started"], command=command)
+
+dp.middleware.setup(CommandTimer())
+
+# --- Helper Functions --- #
+def create_timeframe_keyboard():
+    """Create keyboard for timeframe selection"""
+    keyboard = InlineKeyboardMarkup(row_width=3)
+    buttons = [
+        InlineKeyboardButton("5 Dakika", callback_data="tf_5m"),
+        InlineKeyboardButton("15 Dakika", callback_data="tf_15m"),
+        InlineKeyboardButton("1 Saat", callback_data="tf_1h"),
+        InlineKeyboardButton("4 Saat", callback_data="tf_4h"),
+        InlineKeyboardButton("1 Gün", callback_data="tf_1d")
+    ]
+    keyboard.add(*buttons)
+    return keyboard
+
+def create_pagination_keyboard(current_page, total_pages):
+    """Create navigation buttons for pagination"""
+    keyboard = InlineKeyboardMarkup(row_width=3)
+    buttons = []
+    if current_page > 0:
+        buttons.append(InlineKeyboardButton("⬅️ Önceki", callback_data=f"page_{current_page-1}"))
+    
+    buttons.append(InlineKeyboardButton(f"{current_page+1}/{total_pages}", callback_data="current"))
+    
+    if current_page < total_pages - 1:
+        buttons.append(InlineKeyboardButton("Sonraki ➡️", callback_data=f"page_{current_page+1}"))
+    
+    keyboard.add(*buttons)
+    return keyboard
+
+def latest_snapshot(timeframe):
+    """Current snapshot of a timeframe; a stale one is still returned while it is refreshed in the background"""
+    df = snapshots.get(timeframe)
+    age = snapshots.age(timeframe)
+    scheduler = updater.scheduler
+    stale = age is None or age > STALE_AFTER * TIMEFRAME_PERIODS[timeframe]
+    # While upstream keeps failing, revalidate at most once per REFRESH_MIN_AGE rather than on every command
+    if scheduler.running and stale and time.time() - revalidated.get(timeframe, 0) >= REFRESH_MIN_AGE:
+        revalidated[timeframe] = time.time()
+        scheduler.trigger(timeframe)  # Joins the running cycle if there is one
+    return df
+
+async def refresh_timeframe(timeframe):
+    """Get a newer snapshot without a duplicate scrape; None if no cycle published one
+
+    Joins a running cycle, waits for the scheduled one when it is about to
+    start, and otherwise runs a cycle right away.
+    """
+    version = snapshots.latest_version(timeframe)
+    scheduler = updater.scheduler
+    wait = scheduler.next_run(timeframe) - time.time()
+    if scheduler.running and not scheduler.is_running(timeframe) and wait <= REFRESH_WAIT:
+        try:
+            return await snapshots.wait(timeframe, version, timeout=wait + REFRESH_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+    await scheduler.trigger(timeframe)
+    return snapshots.get(timeframe) if snapshots.latest_version(timeframe) > version else None
+
+async def update_data_for_timeframe(timeframe, message):
+    """Answer at once with the data being served, then edit the answer when the refresh is published"""
+    start_time = datetime.now()
+    age = snapshots.age(timeframe)
+    if age is not None and age < REFRESH_MIN_AGE and not updater.scheduler.is_running(timeframe):
+        await message.answer(f"✅ *{timeframe} verileri zaten güncel* ({age:.0f} sn önce yayınlandı)",
+                             parse_mode="Markdown")
+        return snapshots.get(timeframe)
+    served = (f"Sorgular {age:.0f} sn önceki verilerle yanıtlanmaya devam ediyor" if age is not None
+              else "Henüz yayınlanmış veri yok")
+    msg = await message.answer(f"🔄 *{timeframe} verileri güncelleniyor...*\n• {served}", parse_mode="Markdown")
+    
+    try:
+        df = await refresh_timeframe(timeframe)
+        if df is None:
+            await msg.edit_text(f"❌ *{timeframe} güncellenemedi*, son yayınlanan veriler kullanılıyor.",
+                                parse_mode="Markdown")
+            return None
+        
+        duration = (datetime.now() - start_time).total_seconds()
+        await msg.edit_text(
+            f"✅ *{timeframe} verileri güncellendi!*\n\n"
+            f"• Toplam kayıt: {len(df)}\n"
+            f"• Kapsam: {coverage_summary(df.attrs['coverage'])}\n"
+            f"• Süre: {duration:.2f} saniye",
+            parse_mode="Markdown"
+        )
+        return df
+        
+    except Exception as e:
+        await msg.edit_text(f"❌ *{timeframe} güncelleme hatası:* {str(e)}", parse_mode="Markdown")
+        return None
+
+async def send_alert(chat_id, text):
+    """Send one alert message, honouring Telegram flood control"""
+    try:
+        await bot.send_message(chat_id, text, parse_mode="Markdown")
+    except RetryAfter as e:
+        await asyncio.sleep(e.timeout)
+        await bot.send_message(chat_id, text, parse_mode="Markdown")
+    except BotBlocked:
+        alerts.unsubscribe(chat_id)
+        raise
+
+# --- Command Handlers --- #
+@dp.message_handler(commands=['start', 'help'])
+async def send_welcome(message: types.Message):
+    """Send welcome message with timeframe selection"""
+    welcome_text = (
+        "📈 **Çoklu Zaman Aralıklı Kripto Analiz Botu**\n\n"
+        "Önce analiz yapmak istediğiniz zaman aralığını seçin:\n\n"
+        "• 5m - Kısa vadeli işlemler\n"
+        "• 15m - Orta vadeli işlemler (Varsayılan)\n"
+        "• 1h - Uzun vadeli işlemler\n"
+        "• 4h/1d - Stratejik analiz"
+    )
+    
+    keyboard = create_timeframe_keyboard()
+    await message.answer(welcome_text, parse_mode="Markdown", reply_markup=keyboard)
+
+@dp.message_handler(commands=['guncelle'])
+async def update_data(message: types.Message):
+    """Update data for selected timeframe"""
+    user_id = message.from_user.id
+    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
+    await update_data_for_timeframe(timeframe, message)
+
+@dp.message_handler(commands=['sorgu'])
+async def custom_query(message: types.Message):
+    """Handle custom data queries"""
+    user_id = message.from_user.id
+    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
+    query = message.get_args()
+    # Optional leading at=<time> queries the archived snapshot of that moment
+    at_match = AT_RE.match(query or "")
+    at = at_match.group(1) if at_match else None
+    query = query[at_match.end():] if at_match else query
+    
+    if not query:
+        await message.reply(
+            f"❌ Lütfen bir sorgu koşulu girin.\nÖrnek: `/sorgu rsi < 30`\n"
+            f"Geçmiş için: `/sorgu at=-2h rsi < 30` veya `/sorgu at=2024-05-01T12:00 rsi < 30` (UTC)\n\n"
+            f"Şu anki zaman aralığı: **{timeframe}**",
+            parse_mode="Markdown"
+        )
+        return
+    
+    try:
+        # Parsed once per distinct query text, evaluated as a vectorized mask
+        plan = compile_query(query)
+        published_at = None
+        if at:
+            # Read only the needed columns of the archived cycle; the condition filters inside the scan
+            found = await asyncio.get_running_loop().run_in_executor(
+                None, archive.snapshot_at, timeframe, archive.parse_time(at), QUERY_COLUMNS, plan)
+            if found is None:
+                await message.reply(f"❌ {timeframe} için {at} öncesine ait arşiv bulunamadı.")
+                return
+            published_at, df = found
+        else:
+            df = latest_snapshot(timeframe)
+        if df is None:
+            await message.reply(f"❌ {timeframe} verileri bulunamadı. Önce /guncelle komutuyla verileri güncelleyin.")
+            return
+            
+        # Single-column ranges on the live snapshot are answered by binary search on its index
+        rows = plan.rows(df, None if at else snapshots.index(timeframe))
+        
+        if len(rows) == 0:
+            await message.reply(f"🔍 {timeframe} zaman aralığında koşullara uygun veri bulunamadı.")
+            return
+        
+        # Keep only the snapshot reference and matching row indices; pages are rendered on demand
+        user_data[user_id] = {
+            "snapshot": df,
+            "rows": rows,
+            "current_page": 0,
+            "query": query,
+            "timeframe": timeframe,
+            "published_at": published_at,
+            "message_id": message.message_id
+        }
+        
+        # Show first page
+        await show_query_page(user_id, message.chat.id)
+        
+    except Exception as e:
+        await message.reply(
+            f"❌ Sorgu hatası: {str(e)}\n\n"
+            f"Örnek kullanım: `/sorgu rsi > 70`\n"
+            f"Zaman aralığı: **{timeframe}**",
+            parse_mode="Markdown"
+        )
+
+async def show_query_page(user_id, chat_id):
+    """Show paginated query results"""
+    if user_id not in user_data:
+        await bot.send_message(chat_id, "❌ Oturum sona erdi. Lütfen yeni sorgu yapın.")
+        return
+        
+    data = user_data[user_id]
+    total_pages = page_count(data, ITEMS_PER_PAGE)
+    data["current_page"] = min(max(data["current_page"], 0), total_pages - 1)
+    page = render_page(data, data["current_page"], ITEMS_PER_PAGE, QUERY_COLUMNS)
+    
+    # Format table
+    table = page.to_markdown(index=False)
+    archived = ""
+    if data.get("published_at"):
+        archived = f"• Arşiv: {datetime.utcfromtimestamp(data['published_at'] / 1000):%d-%m-%Y %H:%M} UTC\n"
+    text = (
+        f"🔍 **Sorgu Sonuçları**\n"
+        f"• Zaman Aralığı: **{data['timeframe']}**\n"
+        f"{archived}"
+        f"• Koşul: `{data['query']}`\n"
+        f"• Sayfa: {data['current_page']+1}/{total_pages}\n\n"
+        f"```\n{table}\n```"
+    )
+    
+    # Create keyboard
+    keyboard = create_pagination_keyboard(data["current_page"], total_pages)
+    
+    # Edit or send message
+    if "response_id" in data:
+        try:
+            await bot.edit_message_text(
+                text, 
+                chat_id, 
+                data["response_id"], 
+                parse_mode="Markdown",
+                reply_markup=keyboard
+            )
+        except MessageNotModified:
+            pass
+    else:
+        msg = await bot.send_message(chat_id, text, parse_mode="Markdown", reply_markup=keyboard)
+        user_data[user_id]["response_id"] = msg.message_id
+
+@dp.callback_query_handler(lambda c: c.data.startswith("page_"))
+async def pagination_callback(callback: CallbackQuery):
+    """Handle pagination navigation"""
+    user_id = callback.from_user.id
+    if user_id not in user_data:
+        await callback.answer("Oturum sona erdi. Lütfen yeni sorgu yapın.")
+        return
+    
+    # Update current page
+    new_page = int(callback.data.split("_")[1])
+    user_data[user_id]["current_page"] = new_page
+    
+    # Update display
+    await show_query_page(user_id, callback.message.chat.id)
+    await callback.answer()
+
+@dp.message_handler(commands=['seri'])
+async def series_command(message: types.Message):
+    """Show one symbol's indicator values over the archived cycles"""
+    user_id = message.from_user.id
+    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
+    args = message.get_args().split()
+    
+    if not args:
+        await message.reply(
+            f"❌ Lütfen bir sembol girin.\nÖrnek: `/seri BTCUSDT` veya `/seri BTCUSDT rsi,macd`\n\n"
+            f"Şu anki zaman aralığı: **{timeframe}**",
+            parse_mode="Markdown"
+        )
+        return
+    
+    symbol = args[0].upper()
+    columns = args[1].lower().split(",") if len(args) > 1 else SERIES_COLUMNS
+    try:
+        # Only the day partitions of the last SERIES_DAYS are opened
+        df = await asyncio.get_running_loop().run_in_executor(
+            None, archive.series, timeframe, symbol, columns, archive.parse_time(f"-{SERIES_DAYS}d"))
+        if df.empty:
+            await message.reply(f"🔍 {timeframe} arşivinde {symbol} için kayıt bulunamadı.")
+            return
+        df = df.tail(SERIES_ROWS).copy()
+        df["published_at"] = df["published_at"].dt.strftime("%d-%m %H:%M")
+        await message.reply(
+            f"📈 **{symbol} {timeframe} geçmişi** (son {len(df)} döngü, UTC)\n\n"
+            f"```\n{df.to_markdown(index=False)}\n```",
+            parse_mode="Markdown"
+        )
+    except Exception as e:
+        await message.reply(f"❌ Seri hatası: {str(e)}")
+
+@dp.message_handler(commands=['rsi'])
+async def rsi_command(message: types.Message):
+    """Show RSI signals"""
+    user_id = message.from_user.id
+    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
+    
+    try:
+        # Load data
+        df = latest_snapshot(timeframe)
+        if df is None:
+            await message.reply(f"❌ {timeframe} verileri bulunamadı. Önce /guncelle komutuyla verileri güncelleyin.")
+            return
+            
+        
+        # Get RSI signals from the precomputed index
+        index = snapshots.index(timeframe)
+        oversold = df.iloc[index.bucket("rsi_oversold")][['symbol', 'rsi', 'close']]
+        overbought = df.iloc[index.bucket("rsi_overbought")][['symbol', 'rsi', 'close']]
+        
+        # Format response
+        response_text = f"📊 **{timeframe} RSI Sinyalleri**\n\n"
+        
+        if not oversold.empty:
+            response_text += "⬇️ *Aşırı Satım (RSI ≤ 30)*\n"
+            response_text += oversold.to_markdown(index=False) + "\n\n"
+        else:
+            response_text += "⚠️ Aşırı satım sinyali bulunamadı\n\n"
+        
+        if not overbought.empty:
+            response_text += "⬆️ *Aşırı Alım (RSI ≥ 70)*\n"
+            response_text += overbought.to_markdown(index=False)
+        else:
+            response_text += "⚠️ Aşırı alım sinyali bulunamadı"
+        
+        await message.reply(f"```{response_text}```", parse_mode="Markdown")
+        
+    except Exception as e:
+        await message.reply(f"❌ RSI sorgu hatası: {str(e)}")
+
+@dp.message_handler(commands=['adx'])
+async def adx_command(message: types.Message):
+    """Show ADX signals"""
+    user_id = message.from_user.id
+    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
+    
+    try:
+        # Load data
+        df = latest_snapshot(timeframe)
+        if df is None:
+            await message.reply(f"❌ {timeframe} verileri bulunamadı. Önce /guncelle komutuyla verileri güncelleyin.")
+            return
+            
+        strong_trend = df.iloc[snapshots.index(timeframe).bucket("adx_strong")][['symbol', 'adx', 'close']]
+        
+        # Format response
+        if not strong_trend.empty:
+            table = strong_trend.to_markdown(index=False)
+            text = (
+                f"📈 **{timeframe} Güçlü Trend Sinyalleri (ADX > 45)**\n\n"
+                f"```\n{table}\n```"
+            )
+            await message.reply(text, parse_mode="Markdown")
+        else:
+            await message.reply(f"⚠️ {timeframe} zaman aralığında ADX > 45 koşulunu sağlayan veri bulunamadı.")
+            
+    except Exception as e:
+        await message.reply(f"❌ ADX sorgu hatası: {str(e)}")
+
+@dp.message_handler(commands=['durum'])
+async def status_command(message: types.Message):
+    """Show snapshot cache statistics and data age per timeframe"""
+    lines = ["📦 **Önbellek Durumu**\n"]
+    for timeframe, stat in snapshots.stats().items():
+        age = f"{stat['age']:.0f} sn" if stat['age'] is not None else "-"
+        refreshing = ", 🔄 yenileniyor" if updater.scheduler.is_running(timeframe) else ""
+        lines.append(
+            f"• {timeframe}: v{snapshots.latest_version(timeframe)}, {stat['rows']} kayıt, yaş {age}, "
+            f"isabet {stat['hits']}, ıska {stat['misses']}{refreshing}"
+        )
+        coverage = snapshots.coverage(timeframe)
+        if coverage and coverage["failed"]:
+            lines.append(f"  ⚠️ {coverage_summary(coverage)}")
+    if len(lines) == 1:
+        lines.append("⚠️ Henüz yüklenmiş veri yok")
+    for host, stat in transport.limiters.stats().items():
+        lines.append(
+            f"🌐 {host}: {stat['rate']} istek/sn, {stat['requests']} istek, "
+            f"{stat['throttled']} kısıtlama, {stat['errors']} hata, devre {stat['breaker']}"
+        )
+    session_stats = user_data.stats()
+    lines.append(
+        f"\n🗂 Sorgu oturumları: {session_stats['active']} aktif, "
+        f"{session_stats['evicted_ttl']} süresi doldu, {session_stats['evicted_lru']} kapasiteden çıkarıldı"
+    )
+    await message.reply("\n".join(lines), parse_mode="Markdown")
+
+@dp.message_handler(commands=['alarm'])
+async def alarm_command(message: types.Message):
+    """Subscribe to a signal for the selected timeframe, or list subscriptions"""
+    user_id = message.from_user.id
+    timeframe = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
+    screen = message.get_args().strip().lower()
+    
+    if not screen:
+        available = "\n".join(f"• `{name}` - {label}" for name, label in SCREEN_LABELS.items())
+        current = ", ".join(f"`{name}` ({tf})" for tf, name in alerts.subscriptions_of(message.chat.id)) or "yok"
+        await message.reply(
+            f"🔔 **Sinyal Alarmları**\n\n"
+            f"Kullanım: `/alarm rsi_oversold`\n\n{available}\n\n"
+            f"Aboneliklerin: {current}",
+            parse_mode="Markdown"
+        )
+        return
+    
+    try:
+        alerts.subscribe(message.chat.id, timeframe, screen)
+        await message.reply(
+            f"✅ {timeframe} zaman aralığında `{screen}` sinyali oluştuğunda haber verilecek.\n"
+            f"İptal için: `/alarm_sil {screen}`",
+            parse_mode="Markdown"
+        )
+    except ValueError as e:
+        await message.reply(f"❌ {str(e)}")
+
+@dp.message_handler(commands=['alarm_sil'])
+async def alarm_remove_command(message: types.Message):
+    """Remove a signal subscription (all of them without arguments)"""
+    screen = message.get_args().strip().lower() or None
+    alerts.unsubscribe(message.chat.id, screen=screen)
+    await message.reply("🔕 Alarm aboneliği kaldırıldı.")
+
+@dp.message_handler(commands=['zaman'])
+async def show_timeframe_menu(message: types.Message):
+    """Show timeframe selection menu"""
+    user_id = message.from_user.id
+    current_tf = current_timeframes.get(user_id, DEFAULT_TIMEFRAME)
+    
+    text = (
+        f"⏱️ **Mevcut Zaman Aralığı: {current_tf}**\n\n"
+        "Analiz için kullanılacak zaman aralığını seçin:"
+    )
+    
+    keyboard = create_timeframe_keyboard()
+    await message.answer(text, parse_mode="Markdown", reply_markup=keyboard)
+
+# --- Callback Handlers --- #
+@dp.callback_query_handler(lambda c: c.data.startswith("tf_"))
+async def handle_timeframe_selection(callback: CallbackQuery):
+    """Handle timeframe selection"""
+    user_id = callback.from_user.id
+    timeframe = callback.data.split("_")[1]
+    
+    if timeframe not in TIMEFRAME_MAP:
+        await callback.answer("Geçersiz zaman aralığı seçildi")
+        return
+    
+    # Save user's timeframe preference
+    current_timeframes[user_id] = timeframe
+    await callback.answer(f"Zaman aralığı {timeframe} olarak ayarlandı")
+    
+    # Edit message to show selection
+    await bot.edit_message_text(
+        f"✅ **Zaman Aralığı Ayarlandı**\n\n"
+        f"Artık tüm analizleriniz **{timeframe}** zaman aralığında yapılacaktır.\n\n"
+        "Komutları kullanmaya başlayabilirsiniz:\n"
+        "• /rsi - RSI sinyalleri\n"
+        "• /adx - ADX trend sinyalleri\n"
+        "• /sorgu - Özel sorgu (at=-2h ile geçmişte)\n"
+        "• /seri - Sembolün gösterge geçmişi\n"
+        "• /guncelle - Verileri yenile\n"
+        "• /durum - Veri yaşı ve önbellek durumu\n"
+        "• /alarm - Sinyal alarmları",
+        callback.message.chat.id,
+        callback.message.message_id,
+        parse_mode="Markdown"
+    )
+
+async def on_shutdown(dispatcher):
+    """Stop scheduling scans and close the shared HTTP session"""
+    updater.scheduler.stop()
+    await transport.close()
+
+# --- Main Execution --- #
+if __name__ == '__main__':
+    # Serve the snapshots last written to disk until the first cycle publishes
+    snapshots.load(TIMEFRAME_PERIODS)
+    # The scan pipeline runs in this process and publishes to the bus the handlers read;
+    # it also serves the metrics endpoint, command timings included
+    loop = asyncio.get_event_loop()
+    scanner_task = loop.create_task(updater.run())
+    # Alerts are diffed as each version is published; deliver them in the background
+    loop.create_task(alerts.run())
+    
+    try:
+        # Start the bot
+        executor.start_polling(dp, skip_updates=True, on_shutdown=on_shutdown)
+    except KeyboardInterrupt:
+        # Stop scanner when bot is stopped
+        updater.scheduler.stop()
+        scanner_task.cancel()
@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import asyncio
+import pyarrow as pa
+import pyarrow.feather as feather
+from signals import SignalIndex
+
+# --- Configuration --- #
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.getcwd())
+EXCEL_EXPORT = os.getenv('EXCEL_EXPORT', '0') == '1'  # Optional xlsx sidecar for manual inspection
+
+
+def snapshot_path(timeframe, directory=None):
+    """Path of the Arrow (feather v2) snapshot for a timeframe"""
+    return os.path.join(directory or SNAPSHOT_DIR, f"indicators_{timeframe}.feather")
+
+
+def excel_path(timeframe, directory=None):
+    """Path of the optional Excel sidecar for a timeframe"""
+    return os.path.join(directory or SNAPSHOT_DIR, f"indicators_{timeframe}.xlsx")
+
+
+def atomic_write(path, write):
+    """Call write(tmp_path) and rename the result over path in one step"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def to_table(df):
+    """Arrow table of a snapshot; df.attrs["coverage"] travels in the schema metadata"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    coverage = df.attrs.get("coverage")
+    if coverage is not None:
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"coverage"] = json.dumps(coverage).encode()
+        table = table.replace_schema_metadata(metadata)
+    return table
+
+
+def coverage_of(table):
+    """Coverage report stored in a snapshot table's metadata, None if it has none"""
+    coverage = (table.schema.metadata or {}).get(b"coverage")
+    return json.loads(coverage) if coverage is not None else None
+
+
+def to_frame(table):
+    """DataFrame of a snapshot table with its coverage report restored into attrs"""
+    df = table.to_pandas()
+    coverage = coverage_of(table)
+    if coverage is not None:
+        df.attrs["coverage"] = coverage
+    return df
+
+
+def write_snapshot(df, timeframe, directory=None):
+    """Publish a snapshot; readers see either the old or the new file, never a partial one"""
+    table = to_table(df)
+    # Uncompressed so readers can memory-map it without decoding
+    atomic_write(snapshot_path(timeframe, directory),
+                 lambda tmp: feather.write_feather(table, tmp, compression='uncompressed'))
+
+
+def read_snapshot(timeframe, columns=None, directory=None):
+    """Load a snapshot (optionally only some columns) through a memory map"""
+    table = feather.read_table(snapshot_path(timeframe, directory), columns=columns, memory_map=True)
+    return to_frame(table)
+
+
+def snapshot_exists(timeframe, directory=None):
+    return os.path.exists(snapshot_path(timeframe, directory))
+
+
+def published_at(timeframe, directory=None):
+    """Unix time the snapshot was last published, None if it never was"""
+    try:
+        return os.stat(snapshot_path(timeframe, directory)).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+class SnapshotBus:
+    """In-process snapshots for a service that scans and answers in the same process
+
+    The scan pipeline publishes straight into memory and every publish gets
+    the next version number of its timeframe. Readers get the latest version
+    without touching the disk and never wait for a running scan; wait() lets
+    a caller block until a newer version is out.
+    """
+
+    def __init__(self, directory=None, on_publish=None):
+        """
+        on_publish: optional callback(timeframe, previous, current) called when a newer
+        snapshot replaces a published one; previous/current are (df, SignalIndex) pairs
+        """
+        self.directory = directory
+        self.on_publish = on_publish
+        self.entries = {}  # timeframe -> (version, df, published_at, signal index)
+        self.hits = {}
+        self.misses = {}
+        self.events = {}  # timeframe -> asyncio.Event set by the next publish
+        self.served = {}  # timeframe -> version last returned by get()
+        self.seeded = set()  # timeframes whose current entry was loaded from disk, not published
+
+    def latest_version(self, timeframe):
+        """Version of the current snapshot, 0 if nothing is published yet"""
+        entry = self.entries.get(timeframe)
+        return entry[0] if entry is not None else 0
+
+    def publish(self, timeframe, df, published_at=None):
+        """Make df the current snapshot of the timeframe; returns its version"""
+        entry = self.entries.get(timeframe)
+        version = self.latest_version(timeframe) + 1
+        self.entries[timeframe] = (version, df, published_at or time.time(), SignalIndex(df))
+        # A seed from disk can be days old; diffing against it would report everything since as new
+        seeded = timeframe in self.seeded
+        self.seeded.discard(timeframe)
+        if entry is not None and not seeded and self.on_publish is not None:
+            self.on_publish(timeframe, (entry[1], entry[3]), (df, self.entries[timeframe][3]))
+        event = self.events.pop(timeframe, None)
+        if event is not None:
+            event.set()
+        return version
+
+    def load(self, timeframes):
+        """Seed with the snapshots last written to disk, so there is an answer before the first cycle
+
+        Seeds are served like any snapshot but are not diffed against by on_publish.
+        """
+        for timeframe in timeframes:
+            if timeframe not in self.entries and snapshot_exists(timeframe, self.directory):
+                df = read_snapshot(timeframe, directory=self.directory)
+                published_at = os.stat(snapshot_path(timeframe, self.directory)).st_mtime
+                self.entries[timeframe] = (1, df, published_at, SignalIndex(df))
+                self.seeded.add(timeframe)
+
+    def get(self, timeframe):
+        """Return the current DataFrame (shared, do not modify) or None if nothing is published
+
+        The first read of each new version counts as a miss, later ones as hits.
+        """
+        entry = self.entries.get(timeframe)
+        if entry is None:
+            return None
+        counter = self.misses if self.served.get(timeframe) != entry[0] else self.hits
+        counter[timeframe] = counter.get(timeframe, 0) + 1
+        self.served[timeframe] = entry[0]
+        return entry[1]
+
+    def index(self, timeframe):
+        """SignalIndex of the current snapshot, or None if nothing is published"""
+        entry = self.entries.get(timeframe)
+        return entry[3] if entry is not None else None
+
+    def coverage(self, timeframe):
+        """Coverage report published with the current snapshot, None if it has none"""
+        entry = self.entries.get(timeframe)
+        return entry[1].attrs.get("coverage") if entry is not None else None
+
+    def age(self, timeframe):
+        """Seconds since the current snapshot was published, None if there is none"""
+        entry = self.entries.get(timeframe)
+        if entry is None:
+            return None
+        return time.time() - entry[2]
+
+    def stats(self):
+        """Hit/miss counters, row count and age for every timeframe seen so far"""
+        timeframes = set(self.entries) | set(self.hits) | set(self.misses)
+        return {
+            timeframe: {
+                "hits": self.hits.get(timeframe, 0),
+                "misses": self.misses.get(timeframe, 0),
+                "rows": len(self.entries[timeframe][1]) if timeframe in self.entries else 0,
+                "missing": len(self.coverage(timeframe)["failed"]) if self.coverage(timeframe) else 0,
+                "age": self.age(timeframe),
+            }
+            for timeframe in sorted(timeframes)
+        }
+
+    async def wait(self, timeframe, version, timeout=None):
+        """Wait until a version newer than `version` is published (asyncio.TimeoutError after `timeout`)"""
+        while self.latest_version(timeframe) <= version:
+            event = self.events.setdefault(timeframe, asyncio.Event())
+            await asyncio.wait_for(event.wait(), timeout)
+        return self.entries[timeframe][1]
+
+
+def write_excel(df, timeframe, directory=None):
+    """Write the xlsx sidecar, also through a temporary file"""
+    atomic_write(excel_path(timeframe, directory),
+                 lambda tmp: df.to_excel(tmp, index=False, engine='openpyxl'))
+
+
+# Excel exports still being written; holding them keeps their failures from going unreported
+excel_writes = set()
+
+
+def excel_done(future):
+    excel_writes.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Excel dosyası yazılamadı: {future.exception()}")
+
+
+async def publish(df, timeframe, excel=EXCEL_EXPORT, directory=None):
+    """Write the snapshot off the event loop; the Excel export is not awaited"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, write_snapshot, df, timeframe, directory)
+    if excel:
+        future = loop.run_in_executor(None, write_excel, df, timeframe, directory)
+        excel_writes.add(future)
+        future.add_done_callback(excel_done)
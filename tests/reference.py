@@ -0,0 +1,156 @@
+"""Textbook indicator implementations used to build the reference validation fixture
+
+Written from TradingView's Pine definitions with pandas and plain loops, on
+purpose unlike the vectorized incremental code in indicators.py. Run this
+module to rewrite fixtures/reference_1h.json; the candles are a fixed-seed
+random walk, so the file only changes when these formulas do.
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+
+BARS = 260      # SMA200 plus room for the windows that look back further
+SYMBOLS = 8
+DAYS = 62
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "reference_1h.json")
+
+
+def rma(values, length):
+    """Wilder average, seeded with the SMA of the first `length` valid values"""
+    out = np.full(len(values), np.nan)
+    valid = [i for i, value in enumerate(values) if not np.isnan(value)]
+    if len(valid) < length:
+        return out
+    seed = valid[length - 1]
+    out[seed] = np.mean([values[i] for i in valid[:length]])
+    for i in range(seed + 1, len(values)):
+        out[i] = out[i - 1] + (values[i] - out[i - 1]) / length
+    return out
+
+
+def ema(series, length):
+    return series.ewm(span=length, adjust=False).mean()
+
+
+def wma(series, length):
+    weights = np.arange(1, length + 1)
+    return series.rolling(length).apply(lambda x: np.dot(x, weights) / weights.sum(), raw=True)
+
+
+def stoch(close, high, low, length):
+    return 100 * (close - low.rolling(length).min()) / (high.rolling(length).max() - low.rolling(length).min())
+
+
+def indicators(candles, daily):
+    """TradingView key -> value on the last candle"""
+    o, h, l, c, v = (candles[name] for name in ("open", "high", "low", "close", "volume"))
+    out = {"open": o.iloc[-1], "close": c.iloc[-1]}
+    for n in (5, 10, 20, 30, 50, 100, 200):
+        out[f"SMA{n}"] = c.rolling(n).mean().iloc[-1]
+        out[f"EMA{n}"] = ema(c, n).iloc[-1]
+
+    change = c.diff()
+    up = rma(change.clip(lower=0).to_numpy(), 14)
+    down = rma((-change).clip(lower=0).to_numpy(), 14)
+    rsi = pd.Series(100 - 100 / (1 + up / down))
+    out["RSI"], out["RSI[1]"] = rsi.iloc[-1], rsi.iloc[-2]
+
+    macd = ema(c, 12) - ema(c, 26)
+    out["MACD.macd"], out["MACD.signal"] = macd.iloc[-1], ema(macd, 9).iloc[-1]
+
+    k = stoch(c, h, l, 14).rolling(3).mean()
+    d = k.rolling(3).mean()
+    out["Stoch.K"], out["Stoch.K[1]"], out["Stoch.D"], out["Stoch.D[1]"] = k.iloc[-1], k.iloc[-2], d.iloc[-1], d.iloc[-2]
+    out["Stoch.RSI.K"] = stoch(rsi, rsi, rsi, 14).rolling(3).mean().iloc[-1]
+
+    tp = (h + l + c) / 3
+    mean_deviation = tp.rolling(20).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True)
+    cci = (tp - tp.rolling(20).mean()) / (0.015 * mean_deviation)
+    out["CCI20"], out["CCI20[1]"] = cci.iloc[-1], cci.iloc[-2]
+
+    mom = c - c.shift(10)
+    out["Mom"], out["Mom[1]"] = mom.iloc[-1], mom.iloc[-2]
+    hl2 = (h + l) / 2
+    ao = hl2.rolling(5).mean() - hl2.rolling(34).mean()
+    out["AO"], out["AO[1]"] = ao.iloc[-1], ao.iloc[-2]
+
+    highest, lowest = h.rolling(14).max(), l.rolling(14).min()
+    out["W.R"] = (-100 * (highest - c) / (highest - lowest)).iloc[-1]
+
+    basis, deviation = c.rolling(20).mean(), c.rolling(20).std(ddof=0)
+    out["BB.upper"], out["BB.lower"] = (basis + 2 * deviation).iloc[-1], (basis - 2 * deviation).iloc[-1]
+    ema13 = ema(c, 13)
+    out["BBPower"] = (h.iloc[-1] - ema13.iloc[-1]) + (l.iloc[-1] - ema13.iloc[-1])
+
+    prev_close = c.shift(1)
+    buying = c - pd.concat([l, prev_close], axis=1).min(axis=1)
+    ranges = pd.concat([h, prev_close], axis=1).max(axis=1) - pd.concat([l, prev_close], axis=1).min(axis=1)
+    average = {n: buying.rolling(n).sum() / ranges.rolling(n).sum() for n in (7, 14, 28)}
+    out["UO"] = (100 * (4 * average[7] + 2 * average[14] + average[28]) / 7).iloc[-1]
+
+    out["VWMA"] = ((c * v).rolling(20).sum() / v.rolling(20).sum()).iloc[-1]
+    out["HullMA9"] = wma(2 * wma(c, 4) - wma(c, 9), 3).iloc[-1]
+    out["Ichimoku.BLine"] = ((h.rolling(26).max() + l.rolling(26).min()) / 2).iloc[-1]
+
+    true_range = pd.concat([h - l, (h - prev_close).abs(), (l - prev_close).abs()], axis=1).max(axis=1)
+    true_range[prev_close.isna()] = np.nan
+    move_up, move_down = h.diff(), -l.diff()
+    plus_dm = np.where((move_up > move_down) & (move_up > 0), move_up, 0.0)
+    minus_dm = np.where((move_down > move_up) & (move_down > 0), move_down, 0.0)
+    plus_dm[0] = minus_dm[0] = np.nan
+    smoothed = rma(true_range.to_numpy(), 14)
+    plus = 100 * rma(plus_dm, 14) / smoothed
+    minus = 100 * rma(minus_dm, 14) / smoothed
+    total = plus + minus
+    adx = rma(100 * np.abs(plus - minus) / np.where(total == 0, 1, total), 14)
+    out["ADX"], out["ADX+DI"], out["ADX-DI"] = adx[-1], plus[-1], minus[-1]
+    out["ADX+DI[1]"], out["ADX-DI[1]"] = plus[-2], minus[-2]
+
+    # Classic monthly pivots from the previous calendar month of daily candles
+    months = pd.to_datetime(daily["open_time"], unit="ms").dt.to_period("M")
+    month = daily[months == months.iloc[-1] - 1]
+    ph, pl, pc = month["high"].max(), month["low"].min(), month["close"].iloc[-1]
+    p = (ph + pl + pc) / 3
+    out["Pivot.M.Classic.Middle"] = p
+    out["Pivot.M.Classic.R1"], out["Pivot.M.Classic.S1"] = 2 * p - pl, 2 * p - ph
+    out["Pivot.M.Classic.R2"], out["Pivot.M.Classic.S2"] = p + (ph - pl), p - (ph - pl)
+    out["Pivot.M.Classic.R3"], out["Pivot.M.Classic.S3"] = p + 2 * (ph - pl), p - 2 * (ph - pl)
+    return {key: float(value) for key, value in out.items()}
+
+
+def random_walk(rng, bars, price, period_ms, start_ms):
+    """OHLCV rows rounded to 8 significant digits, as Binance reports them"""
+    closes = price * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    opens = np.concatenate([[price], closes[:-1]])
+    spread = np.abs(rng.normal(0, 0.006, (2, bars)))
+    highs = np.maximum(opens, closes) * (1 + spread[0])
+    lows = np.minimum(opens, closes) * (1 - spread[1])
+    volumes = rng.lognormal(10, 1, bars)
+    rows = np.column_stack([opens, highs, lows, closes, volumes])
+    rows = np.array([[float(f"{x:.8g}") for x in row] for row in rows])
+    return [[start_ms + i * period_ms, *row] for i, row in enumerate(rows.tolist())]
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=["open_time", "open", "high", "low", "close", "volume"])
+
+
+def build(seed=0):
+    rng = np.random.default_rng(seed)
+    hour, day = 3600 * 1000, 86400 * 1000
+    end = int(pd.Timestamp("2024-05-14", tz="UTC").timestamp() * 1000)
+    symbols = {}
+    for i, price in enumerate(np.geomspace(0.0005, 60000, SYMBOLS)):
+        klines = random_walk(rng, BARS, price, hour, end - BARS * hour)
+        daily = random_walk(rng, DAYS, price, day, end - DAYS * day)
+        symbols[f"REF{i}USDT"] = {"klines": klines, "daily": daily,
+                                  "indicators": indicators(frame(klines), frame(daily))}
+    return {"timeframe": "1h", "source": "reference", "symbols": symbols}
+
+
+if __name__ == "__main__":
+    os.makedirs(os.path.dirname(PATH), exist_ok=True)
+    with open(PATH, "w") as f:
+        json.dump(build(), f)
+    print(PATH)
@@ -0,0 +1,91 @@
+import time
+import asyncio
+import pandas as pd
+import pytest
+import store
+from alerts import AlertDispatcher, detect_changes
+from signals import SignalIndex
+
+
+def snapshot(rows):
+    """(df, SignalIndex) from {symbol: (rsi, adx)}"""
+    df = pd.DataFrame([(symbol, rsi, adx) for symbol, (rsi, adx) in rows.items()],
+                      columns=["symbol", "rsi", "adx"])
+    return df, SignalIndex(df)
+
+
+def test_detect_changes_reports_symbols_entering_a_screen():
+    previous = snapshot({"AUSDT": (50, 20), "BUSDT": (25, 50), "CUSDT": (40, 40)})
+    current = snapshot({"AUSDT": (25, 20), "BUSDT": (20, 50), "CUSDT": (75, 46), "DUSDT": (10, 60)})
+    # BUSDT was already oversold and DUSDT was not in the previous snapshot
+    assert detect_changes(previous, current) == {
+        "rsi_oversold": ["AUSDT"], "rsi_overbought": ["CUSDT"], "adx_strong": ["CUSDT"],
+    }
+    assert detect_changes(current, current) == {}
+
+
+def test_detect_changes_skips_screens_the_previous_snapshot_lacks():
+    previous_df = pd.DataFrame({"symbol": ["AUSDT"], "rsi": [50.0]})
+    current = snapshot({"AUSDT": (25, 50)})
+    assert detect_changes((previous_df, SignalIndex(previous_df)), current) == {"rsi_oversold": ["AUSDT"]}
+
+
+def test_on_snapshot_batches_one_message_per_chat():
+    dispatcher = AlertDispatcher(send=None)
+    dispatcher.subscribe(1, "1h", "rsi_oversold")
+    dispatcher.subscribe(1, "1h", "adx_strong")
+    dispatcher.subscribe(2, "1h", "rsi_overbought")
+    dispatcher.subscribe(3, "4h", "rsi_oversold")
+    with pytest.raises(ValueError):
+        dispatcher.subscribe(1, "1h", "unknown")
+
+    previous = snapshot({"AUSDT": (50, 20), "BUSDT": (50, 20)})
+    dispatcher.on_snapshot("1h", previous, snapshot({"AUSDT": (25, 50), "BUSDT": (50, 20)}))
+    queue = dispatcher.get_queue()
+    assert queue.qsize() == 1
+    chat_id, text = queue.get_nowait()
+    assert chat_id == 1 and "RSI 30'un altına indi" in text and "ADX 45'i aştı" in text
+
+    dispatcher.unsubscribe(1, "1h")
+    assert dispatcher.subscriptions_of(1) == []
+
+
+def test_run_paces_sends_and_survives_failures():
+    rate, count = 50, 10
+    sent = []
+
+    async def send(chat_id, text):
+        sent.append(time.monotonic())
+        if chat_id == 0:
+            raise RuntimeError("blocked")
+
+    async def run():
+        dispatcher = AlertDispatcher(send, rate=rate)
+        for chat_id in range(count):
+            dispatcher.get_queue().put_nowait((chat_id, "text"))
+        task = asyncio.create_task(dispatcher.run())
+        while len(sent) < count:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert dispatcher.sent == count - 1 and dispatcher.failed == 1
+    gaps = [b - a for a, b in zip(sent, sent[1:])]
+    assert min(gaps) >= 0.9 / rate
+
+
+def test_bus_does_not_diff_against_a_seed_from_disk(tmp_path):
+    calls = []
+    old, _ = snapshot({"AUSDT": (50, 20)})
+    store.write_snapshot(old, "1h", str(tmp_path))
+    bus = store.SnapshotBus(str(tmp_path), on_publish=lambda *args: calls.append(args))
+    bus.load(["1h", "4h"])
+    assert bus.latest_version("1h") == 1 and bus.latest_version("4h") == 0
+
+    first, _ = snapshot({"AUSDT": (25, 20)})
+    assert bus.publish("1h", first) == 2
+    assert calls == []
+    second, _ = snapshot({"AUSDT": (20, 20)})
+    bus.publish("1h", second)
+    assert len(calls) == 1 and calls[0][1][0] is first and calls[0][2][0] is second
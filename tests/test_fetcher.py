@@ -0,0 +1,93 @@
+import json
+import asyncio
+import numpy as np
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from transport import AsyncTransport
+from ratelimit import Limiters
+from fetcher import IndicatorFetcher, coverage_summary
+from schema import SCANNER_COLUMNS
+
+COLUMNS = SCANNER_COLUMNS[:4]  # recommendother, recommendall, recommendma, rsi
+
+
+def scanner_app(requests):
+    """TradingView scanner stub: a row per ticker, shaped by the ticker's name
+
+    FAIL* makes the whole request fail, SHORT* and EMPTY* get a malformed
+    `d`, NULL* gets None and a non-numeric value; the rest get full rows.
+    """
+    async def handle(request):
+        payload = json.loads(await request.text())
+        tickers = payload["symbols"]["tickers"]
+        requests.append((tickers, payload["columns"]))
+        if any(":FAIL" in ticker for ticker in tickers):
+            return web.Response(status=400)
+        data = []
+        for i, ticker in enumerate(tickers):
+            name = ticker.split(":", 1)[1]
+            if name.startswith("SHORT"):
+                row = [0.1, 0.2]
+            elif name.startswith("EMPTY"):
+                row = []
+            elif name.startswith("NULL"):
+                row = [None, 0.5, "n/a", 40]
+            else:
+                row = [0.1, 0.2, 0.3, float(i)]
+            data.append({"s": ticker, "d": row})
+        return web.json_response({"totalCount": len(data), "data": data})
+
+    app = web.Application()
+    app.router.add_post("/scan", handle)
+    return app
+
+
+def fetch(symbols, chunk_size, requests, interval="1h"):
+    async def run():
+        server = TestServer(scanner_app(requests))
+        await server.start_server()
+        client = AsyncTransport(retries=1, limiters=Limiters(default=(1000, 1000)))
+        try:
+            fetcher = IndicatorFetcher(client, columns=COLUMNS, chunk_size=chunk_size,
+                                       url=str(server.make_url("/scan")))
+            return await fetcher.fetch(symbols, interval)
+        finally:
+            await client.close()
+            await server.close()
+    return asyncio.run(run())
+
+
+def test_symbols_are_split_into_chunks():
+    requests = []
+    symbols = [f"S{i}USDT" for i in range(25)]
+    df = fetch(symbols, 10, requests, interval="4h")
+    assert sorted(len(tickers) for tickers, _ in requests) == [5, 10, 10]
+    assert sorted(ticker for tickers, _ in requests for ticker in tickers) == sorted(f"BINANCE:{s}" for s in symbols)
+    assert requests[0][1] == ["Recommend.Other|240", "Recommend.All|240", "Recommend.MA|240", "RSI|240"]
+    # Chunks land in their own slice, so the snapshot keeps the request order
+    assert list(df["symbol"]) == symbols
+    assert df.attrs["coverage"] == {"requested": 25, "received": 25, "failed": {}}
+
+
+def test_failed_chunk_is_reported_and_the_rest_still_load():
+    requests = []
+    symbols = [f"S{i}USDT" for i in range(8)] + ["FAILUSDT"] + [f"T{i}USDT" for i in range(3)]
+    df = fetch(symbols, 4, requests)
+    assert len(requests) == 3
+    assert list(df["symbol"]) == symbols[:8]
+    coverage = df.attrs["coverage"]
+    assert coverage["requested"] == 12 and coverage["received"] == 8
+    assert set(coverage["failed"]) == {"FAILUSDT", "T0USDT", "T1USDT", "T2USDT"}
+    assert coverage_summary(coverage) == "8/12 sembol, eksik: HTTP 400 x4"
+
+
+def test_malformed_rows_are_dropped_and_nulls_become_nan():
+    requests = []
+    df = fetch(["AUSDT", "SHORTUSDT", "EMPTYUSDT", "NULLUSDT", "BUSDT"], 10, requests)
+    assert list(df["symbol"]) == ["AUSDT", "NULLUSDT", "BUSDT"]
+    assert df.attrs["coverage"]["failed"] == {"SHORTUSDT": "veri yok", "EMPTYUSDT": "veri yok"}
+    row = df.set_index("symbol").loc["NULLUSDT"]
+    assert np.isnan(row["recommendother"]) and np.isnan(row["recommendma"])
+    assert row["recommendall"] == 0.5 and row["rsi"] == 40
+    # Typed columns keep their dtype; missing values are NaN, not None/object
+    assert [df[field.name].dtype for field in COLUMNS] == [field.dtype for field in COLUMNS]
@@ -0,0 +1,132 @@
+import os
+import glob
+import json
+import asyncio
+import functools
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import replay
+from indicators import IndicatorEngine, validate_fixture, compare, SCANNER_NAMES
+from klines import BinanceKlineSource
+from fetcher import IndicatorFetcher, INTERVAL_SUFFIX
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REFERENCE = os.path.join(FIXTURES, "reference_1h.json")
+
+
+def failures(report):
+    return report[~report["ok"]].to_string(index=False)
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(FIXTURES, "*.json"))),
+                         ids=os.path.basename)
+def test_fixture_agrees_within_tolerance(path):
+    report = validate_fixture(path)
+    assert (report["compared"] > 0).sum() >= 40
+    assert report["ok"].all(), failures(report)
+
+
+def engine_snapshot():
+    with open(REFERENCE) as f:
+        fixture = json.load(f)
+    symbols = list(fixture["symbols"])
+    klines = [fixture["symbols"][s]["klines"] for s in symbols]
+    engine = IndicatorEngine(symbols)
+    for t in range(len(klines[0])):
+        engine.update(*([row[t][i] for row in klines] for i in range(1, 6)), open_time=klines[0][t][0])
+    return engine.snapshot()
+
+
+def test_rating_tolerances():
+    computed = engine_snapshot()
+    reference = computed.copy()
+    # One flipped vote per symbol moves Recommend.Other by 1/11 and stays in its band
+    reference["recommendother"] += 1 / 11
+    # Rec.* must match exactly, but a few disagreeing symbols are tolerated
+    reference.loc[0, "recuo"] = reference.loc[0, "recuo"] + 1
+    report = compare(computed, reference).set_index("column")
+    assert report.loc["recommendother", "ok"]
+    assert report.loc["recuo", "ok"] and report.loc["recuo", "matched"] == len(computed) - 1
+
+    reference["recommendother"] += 2 / 11
+    reference.loc[:2, "recuo"] = reference.loc[:2, "recuo"] + 1
+    report = compare(computed, reference).set_index("column")
+    assert not report.loc["recommendother", "ok"]
+    assert not report.loc["recuo", "ok"]
+
+
+def test_price_oscillators_compare_relative_to_close():
+    computed = engine_snapshot()
+    reference = computed.copy()
+    # MACD near zero: an error tiny next to the price is not a mismatch
+    reference["macd"] = computed["macd"] + computed["close"] * 1e-4
+    report = compare(computed, reference).set_index("column")
+    assert report.loc["macd", "ok"]
+    reference["macd"] = computed["macd"] + computed["close"] * 1e-2
+    assert not compare(computed, reference).set_index("column").loc["macd", "ok"]
+
+
+def upstream_app(fixture, timeframe):
+    """Binance and scanner stub answering from a fixture, as record-tv sees them live"""
+    symbols = fixture["symbols"]
+    suffix = INTERVAL_SUFFIX[timeframe]
+
+    async def ticker(request):
+        return web.json_response([{"symbol": s, "quoteVolume": str(1e9 - i)} for i, s in enumerate(symbols)])
+
+    async def exchange_info(request):
+        return web.json_response({"symbols": [{"symbol": s, "quoteAsset": "USDT", "status": "TRADING",
+                                               "contractType": "PERPETUAL"} for s in symbols]})
+
+    async def klines(request):
+        query = request.query
+        rows = symbols[query["symbol"]]["daily" if query["interval"] == "1d" else "klines"]
+        start, end = int(query["startTime"]), int(query["endTime"])
+        return web.json_response([[t, *map(str, values)] for t, *values in rows if start <= t <= end])
+
+    async def scan(request):
+        payload = json.loads(await request.text())
+        columns = [column[:-len(suffix)] if suffix else column for column in payload["columns"]]
+        return web.json_response({"data": [
+            {"s": ticker, "d": [symbols[ticker.split(":")[1][:-len(".P")]]["indicators"].get(c) for c in columns]}
+            for ticker in payload["symbols"]["tickers"]
+        ]})
+
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_get("/ticker", ticker)
+    app.router.add_get("/exchangeInfo", exchange_info)
+    app.router.add_get("/klines", klines)
+    app.router.add_post("/scan", scan)
+    return app
+
+
+def test_recorder_writes_a_valid_fixture(tmp_path, monkeypatch):
+    with open(REFERENCE) as f:
+        fixture = json.load(f)
+    # Only the last HISTORY candles reach the recording, so the reference values cover that window
+    last = next(iter(fixture["symbols"].values()))["klines"][-1][0]
+    path = tmp_path / "tradingview_1h.json"
+
+    async def run():
+        server = TestServer(upstream_app(fixture, "1h"))
+        await server.start_server()
+        url = lambda route: str(server.make_url(route))
+        monkeypatch.setattr(replay, "TICKER_URL", url("/ticker"))
+        monkeypatch.setattr(replay, "EXCHANGE_INFO_URL", url("/exchangeInfo"))
+        monkeypatch.setattr(replay, "BinanceKlineSource", functools.partial(BinanceKlineSource, url=url("/klines")))
+        monkeypatch.setattr(replay, "IndicatorFetcher", functools.partial(IndicatorFetcher, url=url("/scan")))
+        monkeypatch.setattr(replay, "HISTORY", len(next(iter(fixture["symbols"].values()))["klines"]))
+        try:
+            await replay.record_validation(str(path), "1h", now=(last + 10 * 60 * 1000) / 1000)
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+    with open(path) as f:
+        recorded = json.load(f)
+    assert sorted(recorded["symbols"]) == sorted(fixture["symbols"])
+    assert set(recorded["symbols"]["REF0USDT"]["indicators"]) == set(SCANNER_NAMES)
+    report = validate_fixture(path)
+    assert (report["compared"] > 0).sum() >= 40
+    assert report["ok"].all(), failures(report)
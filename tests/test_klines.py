@@ -0,0 +1,126 @@
+import os
+import json
+import asyncio
+import numpy as np
+import klines
+from klines import (RECORD, PERIOD_MS, CandleStore, FixtureKlineSource, BinanceKlineSource,
+                    find_gaps, resample, kline_source)
+
+M5, H1 = PERIOD_MS["5m"], PERIOD_MS["1h"]
+START = 1_700_000_000_000 // H1 * H1
+
+
+def candles(times):
+    """One candle per open time; prices follow the candle's index so aggregates are easy to check"""
+    records = np.zeros(len(times), dtype=RECORD)
+    records["open_time"] = times
+    records["open"] = np.arange(len(times))
+    records["high"] = np.arange(len(times)) + 0.5
+    records["low"] = np.arange(len(times)) - 0.5
+    records["close"] = np.arange(len(times)) + 0.25
+    records["volume"] = 1.0
+    return records
+
+
+def series(start, count, period=M5):
+    return start + period * np.arange(count)
+
+
+def write_fixture(directory, symbol, interval, records):
+    rows = [[int(r["open_time"]), *(str(float(r[name])) for name in RECORD.names[1:])] for r in records]
+    with open(os.path.join(directory, f"{symbol}_{interval}.json"), "w") as f:
+        json.dump(rows, f)
+
+
+def test_resample_drops_partial_buckets_at_both_ends():
+    # 00:10 .. 02:25: the first and last hour are incomplete
+    records = candles(series(START + 2 * M5, 26))
+    out = resample(records, H1, M5)
+    assert list(out["open_time"]) == [START + H1]
+    first = 10  # index of the 01:00 candle
+    assert out["open"][0] == records["open"][first]
+    assert out["close"][0] == records["close"][first + 11]
+    assert out["high"][0] == records["high"][first:first + 12].max()
+    assert out["low"][0] == records["low"][first:first + 12].min()
+    assert out["volume"][0] == 12
+
+
+def test_resample_keeps_complete_buckets():
+    out = resample(candles(series(START, 36)), H1, M5)
+    assert list(out["open_time"]) == [START, START + H1, START + 2 * H1]
+    assert len(resample(candles(series(START + M5, 5)), H1, M5)) == 0
+    assert len(resample(candles([]), H1, M5)) == 0
+
+
+def test_find_gaps():
+    times = np.r_[series(START, 3), series(START + 5 * M5, 2), series(START + 10 * M5, 1)]
+    assert find_gaps(times, M5) == [(START + 3 * M5, START + 4 * M5), (START + 7 * M5, START + 9 * M5)]
+    assert find_gaps(series(START, 10), M5) == []
+
+
+def test_append_rewrites_down_to_the_window(tmp_path):
+    store = CandleStore(None, directory=str(tmp_path), series={"5m": 10})
+    store.append("BTCUSDT", "5m", candles(series(START, 20)))
+    assert len(store.read("BTCUSDT", "5m")) == 20
+    store.append("BTCUSDT", "5m", candles(series(START + 20 * M5, 1)))
+    stored = store.read("BTCUSDT", "5m")
+    assert list(stored["open_time"]) == list(series(START + 11 * M5, 10))
+    assert os.path.getsize(store.path("BTCUSDT", "5m")) == 10 * RECORD.itemsize
+
+
+def test_read_ignores_a_partial_trailing_record(tmp_path):
+    store = CandleStore(None, directory=str(tmp_path))
+    store.append("BTCUSDT", "5m", candles(series(START, 3)))
+    with open(store.path("BTCUSDT", "5m"), "ab") as f:
+        f.write(b"\0" * (RECORD.itemsize // 2))
+    assert list(store.read("BTCUSDT", "5m")["open_time"]) == list(series(START, 3))
+    assert store.last_time("BTCUSDT", "5m") == START + 2 * M5
+
+
+def test_repair_fills_gaps_and_remembers_unfillable_ones(tmp_path):
+    fixtures = tmp_path / "fixtures"
+    fixtures.mkdir()
+    # The source is itself missing candles 12..14
+    full = series(START, 20)
+    write_fixture(str(fixtures), "BTCUSDT", "5m", candles(np.r_[full[:12], full[15:]]))
+    source = FixtureKlineSource(str(fixtures))
+    store = CandleStore(source, directory=str(tmp_path / "klines"))
+    # Stored copy is missing 4..5 (fillable) and 12..14 (not)
+    store.append("BTCUSDT", "5m", candles(np.r_[full[:4], full[6:12], full[15:]]))
+
+    asyncio.run(store.repair("BTCUSDT", "5m"))
+    assert store.gaps("BTCUSDT", "5m") == [(int(full[12]), int(full[14]))]
+    assert store.unfillable == {("BTCUSDT", "5m", int(full[12]))}
+    requests = source.requests
+
+    asyncio.run(store.repair("BTCUSDT", "5m"))
+    assert source.requests == requests
+
+
+def test_roll_up_builds_1h_from_stored_5m(tmp_path):
+    store = CandleStore(None, directory=str(tmp_path), series={"5m": 100, "1h": 10})
+    store.append("BTCUSDT", "5m", candles(series(START, 36)))
+    store.append("BTCUSDT", "1h", resample(candles(series(START, 12)), H1, M5))
+    now = START + 3 * H1 + M5
+
+    assert store.roll_up("BTCUSDT", "1h", now) is None
+    assert list(store.read("BTCUSDT", "1h")["open_time"]) == [START, START + H1, START + 2 * H1]
+    # Up to date: nothing to roll up or download
+    assert store.roll_up("BTCUSDT", "1h", now) is None
+    # The next hour is not in the base series yet, so it has to be downloaded
+    assert store.roll_up("BTCUSDT", "1h", now + H1) == START + 3 * H1
+
+
+def test_roll_up_downloads_the_window_when_nothing_is_stored(tmp_path):
+    store = CandleStore(None, directory=str(tmp_path), series={"5m": 100, "1h": 10})
+    now = START + 20 * H1 + M5
+    assert store.roll_up("BTCUSDT", "1h", now) == START + 10 * H1
+    assert store.roll_up("BTCUSDT", "5m", now) == START + 20 * H1 - 99 * M5
+
+
+def test_kline_fixtures_setting_selects_the_source(tmp_path, monkeypatch):
+    monkeypatch.setattr(klines, "KLINE_FIXTURES", None)
+    assert isinstance(kline_source(None), BinanceKlineSource)
+    monkeypatch.setattr(klines, "KLINE_FIXTURES", str(tmp_path))
+    source = kline_source(None)
+    assert isinstance(source, FixtureKlineSource) and source.directory == str(tmp_path)
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+from query import compile_query, QueryError, MAX_LENGTH, MAX_NODES, MAX_DEPTH
+from signals import SignalIndex
+
+NAN = np.nan
+
+
+@pytest.fixture
+def snapshot():
+    return pd.DataFrame({
+        "symbol": ["BTCUSDT", "ETHUSDT", "XRPUSDT", "SOLUSDT", "ADAUSDT", "DOGEUSDT"],
+        "timeframe": ["1h"] * 6,
+        "rsi": [25.0, 30.0, 45.0, NAN, 70.0, 80.0],
+        "rsi[1]": [35.0, 28.0, 45.0, 50.0, NAN, 75.0],
+        "adx": [20.0, 50.0, 30.0, 10.0, NAN, 46.0],
+        "adx+di": [30.0, 10.0, 25.0, NAN, 20.0, 40.0],
+        "adx-di": [10.0, 30.0, 25.0, 15.0, 20.0, 5.0],
+        "close": [100.0, 50.0, 0.5, 20.0, 0.3, 0.1],
+        "ema20": [90.0, 55.0, 0.4, NAN, 0.35, 0.1],
+    })
+
+
+def matching(text, df):
+    return list(df["symbol"].iloc[compile_query(text).rows(df)])
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("rsi < 30", ["BTCUSDT"]),
+    ("rsi <= 30", ["BTCUSDT", "ETHUSDT"]),
+    ("RSI >= 70", ["ADAUSDT", "DOGEUSDT"]),
+    ("rsi < rsi[1]", ["BTCUSDT"]),
+    ("rsi[1] = 45", ["XRPUSDT"]),
+    ("adx+di > adx-di", ["BTCUSDT", "DOGEUSDT"]),
+    ("adx+di>adx-di and adx > 25", ["DOGEUSDT"]),
+    ("20 < rsi <= 45", ["BTCUSDT", "ETHUSDT", "XRPUSDT"]),
+    ("25 < rsi <= 45 < rsi[1]", []),
+    ("rsi < 30 or adx > 45", ["BTCUSDT", "ETHUSDT", "DOGEUSDT"]),
+    ("not rsi < 50", ["SOLUSDT", "ADAUSDT", "DOGEUSDT"]),
+    ("~(rsi < 50) && adx > 40", ["DOGEUSDT"]),
+    ("symbol == 'ETHUSDT'", ["ETHUSDT"]),
+    ("symbol != \"ETHUSDT\" and timeframe = '1h' and rsi > 75", ["DOGEUSDT"]),
+    ("close > ema20 * 1.1", ["BTCUSDT", "XRPUSDT"]),
+    ("(close - ema20) / ema20 > 0.2", ["XRPUSDT"]),
+    ("-adx < -45", ["ETHUSDT", "DOGEUSDT"]),
+    ("rsi + rsi[1] - 2 * adx >= 50", ["DOGEUSDT"]),
+])
+def test_grammar(snapshot, text, expected):
+    assert matching(text, snapshot) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "rsi < 30", "RSI  <  30", "rsi<30.0", "rsi < 3e1",
+])
+def test_equivalent_queries_share_a_plan(text):
+    assert compile_query(text) is compile_query("rsi < 30")
+
+
+@pytest.mark.parametrize("text, message", [
+    ("rsii < 30", "Bilinmeyen sütun"),
+    ("foo > 1", "Bilinmeyen sütun"),
+    ("rsi < 30 $", "Beklenmeyen karakter"),
+    ("", "Boş sorgu"),
+    ("rsi", "koşul olmalı"),
+    ("rsi <", "eksik"),
+    ("(rsi < 30", "Kapanmayan parantez"),
+    ("symbol < 'A'", "yalnızca == veya !="),
+    ("symbol == 1", "Metin ve sayı"),
+    ("rsi and adx < 3", "yalnızca koşulları"),
+    ("symbol + 1 > 2", "Aritmetik"),
+])
+def test_rejects_invalid_queries(text, message):
+    with pytest.raises(QueryError, match=message):
+        compile_query(text)
+
+
+def test_rejects_queries_over_the_limits():
+    too_long = "rsi < 30 and " * (MAX_LENGTH // 13) + "rsi < 30"
+    assert len(too_long) > MAX_LENGTH
+    with pytest.raises(QueryError, match="çok uzun"):
+        compile_query(too_long)
+
+    # Short enough to tokenize, but each `+ 1` adds two nodes
+    too_many = "rsi" + " + 1" * (MAX_NODES // 2) + " > 0"
+    assert len(too_many) <= MAX_LENGTH
+    with pytest.raises(QueryError, match="çok karmaşık"):
+        compile_query(too_many)
+
+    too_deep = "(" * (MAX_DEPTH + 1) + "rsi < 30" + ")" * (MAX_DEPTH + 1)
+    with pytest.raises(QueryError, match="çok iç içe"):
+        compile_query(too_deep)
+    nested = "(" * MAX_DEPTH + "rsi < 30" + ")" * MAX_DEPTH
+    compile_query(nested)
+
+
+def test_missing_column_in_snapshot(snapshot):
+    with pytest.raises(QueryError, match="olmayan sütun: macd"):
+        compile_query("macd > 0").mask(snapshot)
+
+
+@pytest.mark.parametrize("text", [
+    "rsi < 100", "rsi >= 0", "rsi == rsi", "rsi != 45", "adx+di > 0",
+])
+def test_nan_never_matches_a_comparison(snapshot, text):
+    plan = compile_query(text)
+    assert not snapshot.iloc[plan.rows(snapshot)][sorted(plan.columns)].isna().any().any()
+
+
+def test_not_keeps_rows_with_missing_values(snapshot):
+    # A NaN rsi fails `rsi < 50`, so `not` selects it
+    assert "SOLUSDT" in matching("not rsi < 50", snapshot)
+    assert "SOLUSDT" not in matching("rsi >= 50", snapshot)
+
+
+@pytest.mark.parametrize("text", [
+    "rsi < 30", "20 < rsi <= 45", "rsi < rsi[1]", "adx+di > adx-di and adx > 25",
+    "not rsi < 50", "not (rsi < 50 or adx > 40)", "rsi != 45", "symbol == 'ETHUSDT' or rsi > 75",
+    "symbol != 'ETHUSDT'", "close > ema20 * 1.1", "-adx < -45", "(close - ema20) / ema20 > 0.2",
+])
+def test_arrow_expression_selects_the_same_rows(snapshot, text):
+    plan = compile_query(text)
+    table = pa.Table.from_pandas(snapshot.assign(row=np.arange(len(snapshot))), preserve_index=False)
+    scanned = ds.dataset(table).to_table(filter=plan.expression())
+    assert scanned.column("row").to_pylist() == list(plan.rows(snapshot))
+
+
+@pytest.mark.parametrize("text", [
+    "rsi < 30", "rsi <= 30", "rsi > 70", "rsi >= 70.5", "rsi == 50", "rsi = 50",
+    "30 > rsi", "30 >= rsi", "50 == rsi", "-5 < mom", "mom <= -5",
+    "20 < rsi <= 40", "20 <= rsi < 40", "-10 < mom <= 10",
+])
+def test_routed_range_matches_the_mask(text):
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "rsi": rng.integers(0, 101, 500).astype(float),
+        "mom": rng.normal(0, 10, 500).round(1),
+    })
+    df.loc[rng.random(500) < 0.1, "rsi"] = NAN
+    df.loc[rng.random(500) < 0.1, "mom"] = NAN
+    plan = compile_query(text)
+    assert plan.range is not None
+    expected = np.flatnonzero(plan.mask(df))
+    assert len(expected) > 0
+    np.testing.assert_array_equal(plan.rows(df, SignalIndex(df)), expected)
@@ -0,0 +1,66 @@
+import asyncio
+import pandas as pd
+import pytest
+from store import SnapshotBus
+
+
+def frame(rsi):
+    return pd.DataFrame({"symbol": ["AUSDT", "BUSDT"], "rsi": [rsi, rsi + 1.0]})
+
+
+def test_versions_count_up_per_timeframe():
+    bus = SnapshotBus()
+    assert bus.latest_version("1h") == 0 and bus.get("1h") is None and bus.index("1h") is None
+    assert bus.publish("1h", frame(10)) == 1
+    assert bus.publish("1h", frame(20)) == 2
+    assert bus.publish("4h", frame(30)) == 1
+    assert bus.latest_version("1h") == 2
+    assert bus.get("1h")["rsi"].iloc[0] == 20
+    assert list(bus.index("1h").range("rsi", high=20)) == [0]
+
+
+def test_first_read_of_each_version_is_a_miss():
+    bus = SnapshotBus()
+    bus.publish("1h", frame(10))
+    for _ in range(3):
+        bus.get("1h")
+    bus.publish("1h", frame(20))
+    bus.publish("1h", frame(30))  # never read
+    bus.get("1h")
+    bus.get("1h")
+    stat = bus.stats()["1h"]
+    assert (stat["misses"], stat["hits"], stat["rows"]) == (2, 3, 2)
+
+
+def test_wait_returns_the_next_version():
+    async def run():
+        bus = SnapshotBus()
+        bus.publish("1h", frame(10))
+        waiter = asyncio.create_task(bus.wait("1h", bus.latest_version("1h"), timeout=1))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        bus.publish("4h", frame(99))  # other timeframes do not wake it
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        bus.publish("1h", frame(20))
+        df = await waiter
+        # Already newer than the version asked about: no waiting
+        older = await bus.wait("1h", 1, timeout=0)
+        return df, older
+
+    df, older = asyncio.run(run())
+    assert df["rsi"].iloc[0] == 20 and older is df
+
+
+def test_wait_times_out():
+    async def run():
+        bus = SnapshotBus()
+        with pytest.raises(asyncio.TimeoutError):
+            await bus.wait("1h", 0, timeout=0.05)
+        # A timed-out waiter does not break the next one
+        waiter = asyncio.create_task(bus.wait("1h", 0, timeout=1))
+        await asyncio.sleep(0)
+        bus.publish("1h", frame(10))
+        return await waiter
+
+    assert len(asyncio.run(run())) == 2
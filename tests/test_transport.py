@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import transport
+from transport import AsyncTransport
+from ratelimit import Limiters, CircuitOpenError, BREAKER_THRESHOLD
+from fetcher import IndicatorFetcher
+from benchmark import throttled_app
+
+COOLDOWN = 0.2
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(transport, "backoff", lambda attempt: 0)
+
+
+def scripted_app(statuses, hits, delay=0.0):
+    """Answer with the next status of `statuses` (200 once they run out) and count the hits"""
+    async def handle(request):
+        hits.append(request.path)
+        await asyncio.sleep(delay)
+        status = statuses.pop(0) if statuses else 200
+        if status == 200:
+            return web.json_response({"ok": True})
+        return web.Response(status=status, headers={"Retry-After": "0"})
+
+    app = web.Application()
+    app.router.add_get("/api", handle)
+    return app
+
+
+async def open_circuit(client, url, statuses):
+    """Fail BREAKER_THRESHOLD requests so the circuit opens, then wait out the cooldown"""
+    endpoint = client.limiters.get(url)
+    endpoint.breaker.cooldown = COOLDOWN
+    for _ in range(BREAKER_THRESHOLD):
+        with pytest.raises(transport.UpstreamError):
+            await client.get_json(url)
+    assert endpoint.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await client.get_json(url)
+    await asyncio.sleep(COOLDOWN)
+    assert endpoint.breaker.state == "half-open"
+    return endpoint
+
+
+def run_against(app, scenario):
+    async def run():
+        server = TestServer(app)
+        await server.start_server()
+        client = AsyncTransport(retries=1, limiters=Limiters(default=(1000, 1000)))
+        try:
+            return await scenario(client, str(server.make_url("/api")))
+        finally:
+            await client.close()
+            await server.close()
+    return asyncio.run(run())
+
+
+def test_throttled_probe_does_not_strand_the_circuit():
+    hits = []
+    statuses = [503] * BREAKER_THRESHOLD + [429]
+
+    async def scenario(client, url):
+        endpoint = await open_circuit(client, url, statuses)
+        with pytest.raises(transport.UpstreamError):
+            await client.get_json(url)  # The probe is throttled
+        assert not endpoint.breaker.probing
+        assert await client.get_json(url) == {"ok": True}
+        assert endpoint.breaker.state == "closed"
+
+    run_against(scripted_app(statuses, hits), scenario)
+    assert len(hits) == BREAKER_THRESHOLD + 2
+
+
+def test_cancelled_probe_releases_the_circuit():
+    hits = []
+    statuses = [503] * BREAKER_THRESHOLD
+
+    async def scenario(client, url):
+        endpoint = await open_circuit(client, url, statuses)
+        probe = asyncio.create_task(client.get_json(url))
+        await asyncio.sleep(0.05)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert not endpoint.breaker.probing
+        assert await client.get_json(url) == {"ok": True}
+
+    run_against(scripted_app(statuses, hits, delay=0.2), scenario)
+
+
+def test_half_open_callers_wait_for_the_probe():
+    hits = []
+    statuses = [503] * BREAKER_THRESHOLD
+
+    async def scenario(client, url):
+        await open_circuit(client, url, statuses)
+        hits.clear()
+        results = await asyncio.gather(*[client.get_json(url) for _ in range(4)])
+        assert results == [{"ok": True}] * 4
+
+    run_against(scripted_app(statuses, hits, delay=0.05), scenario)
+    assert len(hits) == 4
+
+
+def test_failed_probe_reopens_for_every_waiter():
+    hits = []
+    statuses = [503] * (BREAKER_THRESHOLD + 1)
+
+    async def scenario(client, url):
+        endpoint = await open_circuit(client, url, statuses)
+        hits.clear()
+        results = await asyncio.gather(*[client.get_json(url) for _ in range(4)], return_exceptions=True)
+        assert type(results[0]) is transport.UpstreamError
+        assert all(isinstance(result, CircuitOpenError) for result in results[1:])
+        assert endpoint.breaker.state == "open"
+
+    run_against(scripted_app(statuses, hits, delay=0.05), scenario)
+    assert len(hits) == 1
+
+
+def test_limiter_finds_the_server_limit():
+    limit, rows, chunk_size = 8, 120, 10
+
+    async def run():
+        server = TestServer(throttled_app(limit=limit, retry_after=1))
+        await server.start_server()
+        url = str(server.make_url("/scan"))
+        host = f"{server.host}:{server.port}"
+        # Start well above the stub's limit so the limiter has to find it
+        client = AsyncTransport(limiters=Limiters(rates={host: (limit * 3, limit * 4)}))
+        try:
+            symbols = [f"SYM{i}USDT" for i in range(rows)]
+            df = await IndicatorFetcher(client, chunk_size=chunk_size, url=url).fetch(symbols, "1h")
+            return df, client.limiters.stats()[host]
+        finally:
+            await client.close()
+            await server.close()
+
+    df, stat = asyncio.run(run())
+    assert df.attrs["coverage"]["received"] == rows
+    assert stat["throttled"] > 0
+    assert stat["rate"] < limit * 3
+    assert stat["breaker"] == "closed"
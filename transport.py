@@ -0,0 +1,106 @@
+import asyncio
+import aiohttp
+from ratelimit import Limiters, UpstreamError, CircuitOpenError, backoff, THROTTLE_STATUSES, RETRY_STATUSES
+
+# --- Configuration --- #
+CONCURRENCY = 8
+TIMEOUT = 15
+RETRIES = 4
+USER_AGENT = "tgscanner/1.0"
+
+
+def retry_after(response):
+    """Seconds from a Retry-After header, None if absent or not a number"""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+class AsyncTransport:
+    """Shared keep-alive HTTP session with a bounded number of in-flight requests"""
+
+    def __init__(self, concurrency=CONCURRENCY, timeout=TIMEOUT, retries=RETRIES, limiters=None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.limiters = limiters or Limiters()
+        self.session = None
+        self.semaphore = None
+
+    async def get_session(self):
+        """Create the pooled session lazily, inside the running event loop"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": USER_AGENT},
+            )
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self.session
+
+    async def request_json(self, method, url, **kwargs):
+        """Send one request and return the decoded JSON body
+
+        Every attempt waits for the endpoint's token bucket and circuit breaker.
+        Throttling (418/429), 5xx and network errors are retried with jittered
+        exponential backoff; other errors, or running out of attempts, raise
+        UpstreamError with a short reason.
+        """
+        session = await self.get_session()
+        endpoint = self.limiters.get(url)
+        reason, status = None, None
+        for attempt in range(self.retries):
+            if attempt:
+                await asyncio.sleep(backoff(attempt))
+            if not await endpoint.breaker.admit():
+                raise CircuitOpenError(endpoint.host)
+            # Admitted while a probe is out means this request is the probe
+            probe = endpoint.breaker.probe_done if endpoint.breaker.probing else None
+            try:
+                await endpoint.bucket.acquire()
+                endpoint.requests += 1
+                async with self.semaphore:
+                    async with session.request(method, url, **kwargs) as response:
+                        status = response.status
+                        if status in THROTTLE_STATUSES:
+                            # The endpoint is up but wants us slower: adapt the rate, and the
+                            # breaker counts it as an answer
+                            endpoint.throttled += 1
+                            endpoint.bucket.penalize(retry_after(response))
+                            endpoint.breaker.success()
+                            reason = f"HTTP {status}"
+                            continue
+                        if status in RETRY_STATUSES:
+                            endpoint.errors += 1
+                            endpoint.breaker.failure()
+                            reason = f"HTTP {status}"
+                            continue
+                        if status >= 400:
+                            endpoint.breaker.success()
+                            raise UpstreamError(f"HTTP {status}", status)
+                        data = await response.json(content_type=None)
+                endpoint.bucket.reward()
+                endpoint.breaker.success()
+                return data
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                endpoint.errors += 1
+                endpoint.breaker.failure()
+                reason, status = ("zaman aşımı" if isinstance(e, asyncio.TimeoutError) else type(e).__name__), None
+                continue
+            finally:
+                if probe is not None:
+                    # Also on cancellation or an unexpected error, so the endpoint is never stranded
+                    endpoint.breaker.settle(probe)
+        raise UpstreamError(reason, status)
+
+    async def get_json(self, url, params=None):
+        return await self.request_json("GET", url, params=params)
+
+    async def post_json(self, url, data):
+        return await self.request_json("POST", url, data=data)
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
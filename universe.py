@@ -0,0 +1,68 @@
+import os
+import time
+import asyncio
+import metrics
+
+# --- Configuration --- #
+TICKER_URL = os.getenv('BINANCE_TICKER_URL', 'https://fapi.binance.com/fapi/v1/ticker/24hr')
+EXCHANGE_INFO_URL = os.getenv('BINANCE_EXCHANGE_INFO_URL', 'https://fapi.binance.com/fapi/v1/exchangeInfo')
+UNIVERSE_TTL = int(os.getenv('UNIVERSE_TTL', 15 * 60))
+MIN_QUOTE_VOLUME = float(os.getenv('MIN_QUOTE_VOLUME', 0))
+
+
+class SymbolUniverse:
+    """Filtered Binance futures symbol list, refreshed on its own TTL and shared by all timeframes"""
+
+    def __init__(self, transport, ttl=UNIVERSE_TTL, quote_asset="USDT", status="TRADING",
+                 contract_type="PERPETUAL", min_quote_volume=MIN_QUOTE_VOLUME):
+        self.transport = transport
+        self.ttl = ttl
+        self.quote_asset = quote_asset
+        self.status = status
+        self.contract_type = contract_type
+        self.min_quote_volume = min_quote_volume
+        self.cached = []
+        self.refreshed_at = 0
+        self.lock = None
+
+    def is_fresh(self):
+        return bool(self.cached) and time.monotonic() - self.refreshed_at < self.ttl
+
+    def select(self, tickers, exchange_info):
+        """Apply the filters and order symbols by 24h quote volume, most liquid first"""
+        allowed = {
+            item['symbol'] for item in exchange_info.get('symbols', [])
+            if (self.quote_asset is None or item.get('quoteAsset') == self.quote_asset)
+            and (self.status is None or item.get('status') == self.status)
+            and (self.contract_type is None or item.get('contractType') == self.contract_type)
+        }
+        volumes = {}
+        for item in tickers:
+            volume = float(item.get('quoteVolume') or 0)
+            if item['symbol'] in allowed and volume >= self.min_quote_volume:
+                volumes[item['symbol']] = volume
+        return sorted(volumes, key=volumes.get, reverse=True)
+
+    async def refresh(self):
+        with metrics.span("universe"):
+            tickers, exchange_info = await asyncio.gather(
+                self.transport.get_json(TICKER_URL),
+                self.transport.get_json(EXCHANGE_INFO_URL),
+            )
+            self.cached = self.select(tickers, exchange_info)
+        self.refreshed_at = time.monotonic()
+        metrics.log(f"Sembol evreni yenilendi: {len(self.cached)} sembol")
+
+    async def symbols(self):
+        """Return the current universe; concurrent callers share a single refresh"""
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            if not self.is_fresh():
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    if not self.cached:
+                        raise
+                    print(f"Sembol evreni yenilenemedi, eski liste kullanılıyor: {e}")
+        return list(self.cached)